@@ -0,0 +1,240 @@
+import hashlib
+import os
+import sqlite3
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_qdrant.sparse_embeddings import SparseEmbeddings, SparseVector
+from loguru import logger
+
+from app.core import metrics
+
+# Grow vector files in steps so appends don't resize the file every batch
+GROW_ROWS = 4096
+# Keep IN (...) lists under SQLite's variable limit
+LOOKUP_BATCH = 500
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Local cache of chunk embeddings keyed by (model name, text hash).
+    Dense vectors live in one memory-mapped float32 file per model and sparse
+    vectors as packed int32/float32 blobs; a SQLite index maps keys to rows and
+    serializes row allocation between RQ workers.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self._conn: Optional[sqlite3.Connection] = None
+        self._memmaps: Dict[str, np.memmap] = {}
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._conn = sqlite3.connect(
+                os.path.join(self.cache_dir, "index.sqlite3"), timeout=30, isolation_level=None
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS dense_models ("
+                "model TEXT PRIMARY KEY, dim INTEGER NOT NULL, next_row INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS dense_index ("
+                "model TEXT NOT NULL, key TEXT NOT NULL, row INTEGER NOT NULL, PRIMARY KEY (model, key))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sparse_index ("
+                "model TEXT NOT NULL, key TEXT NOT NULL, indices BLOB NOT NULL, "
+                "vals BLOB NOT NULL, PRIMARY KEY (model, key))"
+            )
+        return self._conn
+
+    # -----------------------------
+    # Dense vectors
+    # -----------------------------
+
+    def _vectors_path(self, model: str) -> str:
+        return os.path.join(self.cache_dir, f"{model.replace('/', '__')}.f32")
+
+    def _memmap(self, model: str, dim: int, min_rows: int) -> np.memmap:
+        """Map the model's vector file, remapping when another process has grown it."""
+        memmap = self._memmaps.get(model)
+        if memmap is None or memmap.shape[0] < min_rows:
+            rows = os.path.getsize(self._vectors_path(model)) // (dim * 4)
+            memmap = np.memmap(self._vectors_path(model), dtype=np.float32, mode="r+", shape=(rows, dim))
+            self._memmaps[model] = memmap
+        return memmap
+
+    def get_dense(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        found: List[Optional[List[float]]] = [None] * len(texts)
+        model_row = self.conn.execute("SELECT dim FROM dense_models WHERE model = ?", (model,)).fetchone()
+        if model_row is None:
+            return found
+
+        rows = self._lookup(
+            "SELECT key, row FROM dense_index WHERE model = ? AND key IN ({})", model, texts
+        )
+        if rows:
+            memmap = self._memmap(model, model_row[0], max(rows.values()) + 1)
+            for i, text in enumerate(texts):
+                row = rows.get(text_key(text))
+                if row is not None:
+                    found[i] = memmap[row].tolist()
+        return found
+
+    def put_dense(self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]):
+        if not texts:
+            return
+        array = np.asarray(vectors, dtype=np.float32)
+        count, dim = array.shape
+
+        # Allocate rows and grow the file inside one write transaction
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            model_row = self.conn.execute(
+                "SELECT dim, next_row FROM dense_models WHERE model = ?", (model,)
+            ).fetchone()
+            start = model_row[1] if model_row else 0
+            self.conn.execute(
+                "INSERT OR REPLACE INTO dense_models (model, dim, next_row) VALUES (?, ?, ?)",
+                (model, dim, start + count)
+            )
+
+            path = self._vectors_path(model)
+            needed = (start + count) * dim * 4
+            if not os.path.exists(path) or os.path.getsize(path) < needed:
+                with open(path, "ab") as f:
+                    f.truncate(((start + count) // GROW_ROWS + 1) * GROW_ROWS * dim * 4)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        memmap = self._memmap(model, dim, start + count)
+        memmap[start:start + count] = array
+        memmap.flush()
+
+        # Index rows only once the vectors are on disk
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO dense_index (model, key, row) VALUES (?, ?, ?)",
+            [(model, text_key(text), start + i) for i, text in enumerate(texts)]
+        )
+
+    # -----------------------------
+    # Sparse vectors
+    # -----------------------------
+
+    def get_sparse(self, model: str, texts: Sequence[str]) -> List[Optional[SparseVector]]:
+        rows = self._lookup(
+            "SELECT key, indices, vals FROM sparse_index WHERE model = ? AND key IN ({})", model, texts
+        )
+        found: List[Optional[SparseVector]] = []
+        for text in texts:
+            row = rows.get(text_key(text))
+            found.append(SparseVector(
+                indices=np.frombuffer(row[0], dtype=np.int32).tolist(),
+                values=np.frombuffer(row[1], dtype=np.float32).tolist(),
+            ) if row else None)
+        return found
+
+    def put_sparse(self, model: str, texts: Sequence[str], vectors: Sequence[SparseVector]):
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO sparse_index (model, key, indices, vals) VALUES (?, ?, ?, ?)",
+            [
+                (
+                    model,
+                    text_key(text),
+                    np.asarray(vector.indices, dtype=np.int32).tobytes(),
+                    np.asarray(vector.values, dtype=np.float32).tobytes(),
+                )
+                for text, vector in zip(texts, vectors)
+            ]
+        )
+
+    def _lookup(self, query: str, model: str, texts: Sequence[str]) -> dict:
+        keys = list({text_key(text) for text in texts})
+        rows = {}
+        for i in range(0, len(keys), LOOKUP_BATCH):
+            batch = keys[i:i + LOOKUP_BATCH]
+            for key, *values in self.conn.execute(
+                query.format(",".join("?" * len(batch))), (model, *batch)
+            ):
+                rows[key] = values[0] if len(values) == 1 else values
+        return rows
+
+
+class CachedEmbeddings(Embeddings):
+    """Dense embeddings that only run the model for texts missing from the cache."""
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model_name: str):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        try:
+            vectors = self.cache.get_dense(self.model_name, texts)
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed: {e}")
+            vectors = [None] * len(texts)
+
+        misses = [i for i, vector in enumerate(vectors) if vector is None]
+        metrics.incr("embedding_cache_hits", len(texts) - len(misses))
+        metrics.incr("embedding_cache_misses", len(misses))
+
+        if misses:
+            miss_texts = [texts[i] for i in misses]
+            embedded = self.embeddings.embed_documents(miss_texts)
+            for i, vector in zip(misses, embedded):
+                vectors[i] = vector
+            try:
+                self.cache.put_dense(self.model_name, miss_texts, embedded)
+            except Exception as e:
+                logger.warning(f"Embedding cache write failed: {e}")
+
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+
+class CachedSparseEmbeddings(SparseEmbeddings):
+    """Sparse embeddings that only run the model for texts missing from the cache."""
+
+    def __init__(self, embeddings: SparseEmbeddings, cache: EmbeddingCache, model_name: str):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name
+
+    def embed_documents(self, texts: List[str]) -> List[SparseVector]:
+        try:
+            vectors = self.cache.get_sparse(self.model_name, texts)
+        except Exception as e:
+            logger.warning(f"Sparse embedding cache lookup failed: {e}")
+            vectors = [None] * len(texts)
+
+        misses = [i for i, vector in enumerate(vectors) if vector is None]
+        metrics.incr("sparse_embedding_cache_hits", len(texts) - len(misses))
+        metrics.incr("sparse_embedding_cache_misses", len(misses))
+
+        if misses:
+            miss_texts = [texts[i] for i in misses]
+            embedded = self.embeddings.embed_documents(miss_texts)
+            for i, vector in zip(misses, embedded):
+                vectors[i] = vector
+            try:
+                self.cache.put_sparse(self.model_name, miss_texts, embedded)
+            except Exception as e:
+                logger.warning(f"Sparse embedding cache write failed: {e}")
+
+        return vectors
+
+    def embed_query(self, text: str) -> SparseVector:
+        return self.embeddings.embed_query(text)
@@ -0,0 +1,69 @@
+from typing import Dict
+from loguru import logger
+
+from app.core.redis import async_redis_conn, redis_conn
+
+METRICS_KEY = "askdocs:metrics"
+
+
+def incr(name: str, amount: float = 1):
+    """Increment a counter shared by the API and every RQ worker."""
+    try:
+        redis_conn.hincrbyfloat(METRICS_KEY, name, amount)
+    except Exception as e:
+        # Metrics are best effort and must never fail the caller
+        logger.debug(f"Could not record metric {name}: {e}")
+
+
+def incr_many(counters: Dict[str, float]):
+    """Increment several counters in one round trip."""
+    if not counters:
+        return
+    try:
+        pipe = redis_conn.pipeline(transaction=False)
+        for name, amount in counters.items():
+            pipe.hincrbyfloat(METRICS_KEY, name, amount)
+        pipe.execute()
+    except Exception as e:
+        logger.debug(f"Could not record metrics {', '.join(counters)}: {e}")
+
+
+async def aincr(name: str, amount: float = 1):
+    """Async incr for the chat path, so a slow Redis doesn't block the event loop."""
+    try:
+        await async_redis_conn.hincrbyfloat(METRICS_KEY, name, amount)
+    except Exception as e:
+        logger.debug(f"Could not record metric {name}: {e}")
+
+
+async def aincr_many(counters: Dict[str, float]):
+    if not counters:
+        return
+    try:
+        async with async_redis_conn.pipeline(transaction=False) as pipe:
+            for name, amount in counters.items():
+                pipe.hincrbyfloat(METRICS_KEY, name, amount)
+            await pipe.execute()
+    except Exception as e:
+        logger.debug(f"Could not record metrics {', '.join(counters)}: {e}")
+
+
+def get_metrics() -> Dict[str, float]:
+    """Return all counters, plus a hit rate for every *_hits / *_misses pair."""
+    metrics = {
+        name.decode(): float(value)
+        for name, value in redis_conn.hgetall(METRICS_KEY).items()
+    }
+
+    for name in list(metrics):
+        if name.endswith("_hits"):
+            prefix = name[:-len("_hits")]
+            total = metrics[name] + metrics.get(f"{prefix}_misses", 0)
+            metrics[f"{prefix}_hit_rate"] = metrics[name] / total if total else 0.0
+
+    return metrics
+
+
+def reset_metrics():
+    """Drop all counters."""
+    redis_conn.delete(METRICS_KEY)
@@ -0,0 +1,142 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+from loguru import logger
+
+from app.core import metrics
+
+
+class OcrCache:
+    """
+    On-disk OCR cache keyed by image content hash and OCR engine/lang/config.
+    Size-bounded with LRU eviction; SQLite in WAL mode lets every RQ job and
+    PDF worker process share the same file. Each thread gets its own connection,
+    since pooled OCR engines read and write the cache from worker threads.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            try:
+                self._create_schema(conn)
+            except sqlite3.Error:
+                conn.close()
+                raise
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _create_schema(conn: sqlite3.Connection):
+        # One transaction, so no entry lands between the stats row and its triggers
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_cache ("
+            "key TEXT PRIMARY KEY, text TEXT NOT NULL, "
+            "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_ocr_cache_last_access ON ocr_cache(last_access)"
+        )
+        # Running total of the entry sizes, kept by triggers in the writing statement
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_cache_stats ("
+            "id INTEGER PRIMARY KEY CHECK (id = 0), total_size INTEGER NOT NULL)"
+        )
+        conn.execute(
+            "INSERT INTO ocr_cache_stats (id, total_size) "
+            "SELECT 0, (SELECT COALESCE(SUM(size), 0) FROM ocr_cache) "
+            "WHERE NOT EXISTS (SELECT 1 FROM ocr_cache_stats)"
+        )
+        conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS ocr_cache_size_insert AFTER INSERT ON ocr_cache BEGIN "
+            "UPDATE ocr_cache_stats SET total_size = total_size + NEW.size; END"
+        )
+        conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS ocr_cache_size_update AFTER UPDATE OF size ON ocr_cache BEGIN "
+            "UPDATE ocr_cache_stats SET total_size = total_size + NEW.size - OLD.size; END"
+        )
+        conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS ocr_cache_size_delete AFTER DELETE ON ocr_cache BEGIN "
+            "UPDATE ocr_cache_stats SET total_size = total_size - OLD.size; END"
+        )
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def make_key(image_bytes: bytes, engine: str, lang: str, config: str) -> str:
+        return f"{hashlib.sha256(image_bytes).hexdigest()}:{engine}:{lang}:{config}"
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached text for key, or None on a miss."""
+        try:
+            row = self.conn.execute("SELECT text FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self.conn.execute(
+                    "UPDATE ocr_cache SET last_access = ? WHERE key = ?", (time.time(), key)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"OCR cache lookup failed: {e}")
+            row = None
+
+        if row is None:
+            self.misses += 1
+            metrics.incr("ocr_cache_misses")
+            return None
+
+        self.hits += 1
+        metrics.incr("ocr_cache_hits")
+        return row[0]
+
+    def put(self, key: str, text: str):
+        """Store text for key and evict old entries if the cache is over budget."""
+        try:
+            # An upsert rather than INSERT OR REPLACE: REPLACE deletes without firing the delete trigger
+            self.conn.execute(
+                "INSERT INTO ocr_cache (key, text, size, last_access) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET text = excluded.text, size = excluded.size, "
+                "last_access = excluded.last_access",
+                (key, text, len(key) + len(text.encode()), time.time())
+            )
+            self._evict()
+        except sqlite3.Error as e:
+            logger.warning(f"OCR cache write failed: {e}")
+
+    def _total_size(self) -> int:
+        return self.conn.execute("SELECT total_size FROM ocr_cache_stats").fetchone()[0]
+
+    def _evict(self):
+        total = self._total_size()
+        while total > self.max_bytes:
+            rows = self.conn.execute(
+                "SELECT key, size FROM ocr_cache ORDER BY last_access LIMIT 100"
+            ).fetchall()
+            if not rows:
+                break
+            self.conn.executemany("DELETE FROM ocr_cache WHERE key = ?", [(key,) for key, _ in rows])
+            total -= sum(size for _, size in rows)
+
+    def stats(self) -> Dict[str, int]:
+        entries = self.conn.execute("SELECT COUNT(*) FROM ocr_cache").fetchone()[0]
+        return {"entries": entries, "bytes": self._total_size(), "hits": self.hits, "misses": self.misses}
@@ -1,25 +1,201 @@
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
-from typing import Dict, List, Optional
-from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import batched
+import asyncio
+import hashlib
+import threading
+import uuid
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
 from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.runnables import ConfigurableField, Runnable
 from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_qdrant import FastEmbedSparse, QdrantVectorStore, RetrievalMode
+from langchain_qdrant import FastEmbedSparse
 from loguru import logger
-from cachetools import TTLCache
+from cachetools import LRUCache
 
 from app.core.settings import settings
+from app.core.embedding_cache import CachedEmbeddings, CachedSparseEmbeddings, EmbeddingCache
+from app.core.retrieval_cache import RetrievalCache
+from app.core.vector_backends import create_async_vector_client, create_vector_client
 
-class Qdrant:
-    def __init__(self):
-        self.client = QdrantClient(
-            url=settings.qdrant.url,
+DENSE_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+SPARSE_MODEL_NAME = "Qdrant/bm25"
+
+# Payload fields chat retrieval, deletes and re-indexing filter on
+PAYLOAD_INDEXES = {
+    "metadata.source": models.PayloadSchemaType.KEYWORD,
+    "metadata.user_id": models.PayloadSchemaType.KEYWORD,
+    "metadata.document_id": models.PayloadSchemaType.KEYWORD,
+}
+
+# Payload the chat prompt and citations need, everything else stays on the server
+PROMPT_PAYLOAD = ["page_content", "metadata.source", "metadata.page_number", "metadata.chunk_index"]
+
+# Payload field that partitions the shared collection by user
+TENANT_FIELD = "metadata.user_id"
+
+# Namespace for deterministic point IDs, never change it or existing points get orphaned
+POINT_ID_NAMESPACE = uuid.UUID("6f1c1f3e-3b9a-4c2e-9d57-2a4b8e0f7c11")
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of a chunk's text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_point_id(document_id: str, page_number: int, chunk_index: int, chunk_hash: str) -> str:
+    """Stable point ID, so re-ingesting the same chunk overwrites instead of duplicating it."""
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{document_id}:{page_number}:{chunk_index}:{chunk_hash}"))
+
+
+def get_collection_profile(name: Optional[str] = None) -> dict:
+    """Storage profile from settings.qdrant.profiles, the configured one by default."""
+    name = name or settings.qdrant.profile
+    if name not in settings.qdrant.profiles:
+        raise ValueError(f"Unknown Qdrant collection profile: {name}")
+    return dict(settings.qdrant.profiles[name])
+
+
+def quantization_config_for(profile: dict) -> Optional[models.QuantizationConfig]:
+    """Dense vector quantization of a profile, None when it keeps plain float32."""
+    quantization = profile.get("quantization", "none")
+    if quantization == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=profile.get("quantile"),
+                always_ram=profile.get("always_ram", True),
+            )
+        )
+    if quantization == "binary":
+        return models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=profile.get("always_ram", True))
+        )
+    if quantization != "none":
+        raise ValueError(f"Unknown quantization: {quantization}")
+    return None
+
+
+def search_params_for(profile: dict) -> Optional[models.SearchParams]:
+    """Search over the quantized vectors, rescoring oversampled candidates with the originals."""
+    if quantization_config_for(profile) is None:
+        return None
+    return models.SearchParams(
+        quantization=models.QuantizationSearchParams(
+            rescore=profile.get("rescore", True),
+            oversampling=profile.get("oversampling"),
         )
-        self.dense_embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-        self.sparse_embeddings = FastEmbedSparse(model_name="Qdrant/bm25")
+    )
+
+
+def apply_collection_profile(client: QdrantClient, collection_name: str, profile: dict):
+    """Switch an existing collection to a profile in place; Qdrant rebuilds the segments in the background."""
+    client.update_collection(
+        collection_name=collection_name,
+        vectors_config={"dense": models.VectorParamsDiff(on_disk=profile.get("on_disk_vectors", False))},
+        sparse_vectors_config={
+            "sparse": models.SparseVectorParams(
+                index=models.SparseIndexParams(on_disk=profile.get("sparse_on_disk", False))
+            )
+        },
+        quantization_config=quantization_config_for(profile) or models.Disabled.DISABLED,
+    )
+
+
+def ensure_payload_indexes(client: QdrantClient, collection_name: str, shared: bool = False) -> List[str]:
+    """Create the missing keyword payload indexes of a collection, returning the fields indexed."""
+    existing = client.get_collection(collection_name).payload_schema or {}
+    created = []
+    for field_name, field_schema in PAYLOAD_INDEXES.items():
+        if field_name in existing:
+            continue
+        if shared and field_name == TENANT_FIELD:
+            # Co-locates each user's points and lets Qdrant build per-tenant HNSW graphs
+            field_schema = models.KeywordIndexParams(type=models.KeywordIndexType.KEYWORD, is_tenant=True)
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=field_schema,
+            wait=True,
+        )
+        created.append(field_name)
+    return created
+
+
+def create_collection(client: QdrantClient, collection_name: str, profile: dict, shared: bool = False):
+    """Create a hybrid dense + sparse chunk collection with the given storage profile."""
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config={
+            "dense": models.VectorParams(
+                size=384,
+                distance=models.Distance.COSINE,
+                on_disk=profile.get("on_disk_vectors", False)
+            ),
+        },
+        sparse_vectors_config={
+            "sparse": models.SparseVectorParams(
+                index=models.SparseIndexParams(on_disk=profile.get("sparse_on_disk", False))
+            )
+        },
+        quantization_config=quantization_config_for(profile),
+        # A shared collection is always searched per tenant: skip the global graph, build one per user
+        hnsw_config=models.HnswConfigDiff(payload_m=16, m=0) if shared else None,
+        on_disk_payload=True
+    )
+    # Index filtered fields up front, so filters don't fall back to scanning payloads
+    ensure_payload_indexes(client, collection_name, shared=shared)
+
+
+class Qdrant:
+    def __init__(self, backend: Optional[str] = None):
+        # remote Qdrant server, embedded qdrant-client, or NumPy brute force (see vector_backends)
+        if backend is None and settings.qdrant.backend == "local":
+            # The API and every worker open a client, the embedded one locks its folder to one process
+            raise ValueError(
+                "qdrant.backend 'local' is for benchmarks and tests only, "
+                "use 'numpy' or 'remote' for the app"
+            )
+        self.backend = backend or settings.qdrant.backend
+        self.client = create_vector_client(self.backend)
+        self.dense_embeddings = HuggingFaceEmbeddings(model_name=DENSE_MODEL_NAME)
+        self.sparse_embeddings = FastEmbedSparse(model_name=SPARSE_MODEL_NAME)
+
+        # Chunks seen before (retries, re-uploads, rebuilt collections) skip the models
+        if settings.embedding_cache.enabled:
+            embedding_cache = EmbeddingCache(settings.embedding_cache.path)
+            self.dense_embeddings = CachedEmbeddings(self.dense_embeddings, embedding_cache, DENSE_MODEL_NAME)
+            self.sparse_embeddings = CachedSparseEmbeddings(self.sparse_embeddings, embedding_cache, SPARSE_MODEL_NAME)
+
         self.search_limit = settings.qdrant.search_limit
         self.scroll_limit = settings.qdrant.scroll_limit
-        self._vectorstore_cache = TTLCache(maxsize=100, ttl=3600)
+        self.upsert_batch_size = settings.qdrant.upsert_batch_size
+        self.profile = get_collection_profile()
+        self.search_params = search_params_for(self.profile)
+        # per_user: one collection per user, shared: one collection partitioned by metadata.user_id
+        self.storage_mode = settings.qdrant.storage_mode
+        self.shared_collection = settings.qdrant.shared_collection
+        self._async_client = None
+        # Query embedding is CPU bound, async callers run it here instead of on the event loop
+        self._embedding_executor = ThreadPoolExecutor(
+            max_workers=settings.qdrant.embedding_workers, thread_name_prefix="query-embedding"
+        )
+        # The answer cache and retrieval both need the dense vector of a question
+        self._query_vectors = LRUCache(maxsize=1024)
+        self._query_vectors_lock = threading.Lock()
+        self.retrieval_cache = (
+            RetrievalCache(ttl=settings.retrieval_cache.ttl) if settings.retrieval_cache.enabled else None
+        )
+
+    @property
+    def async_client(self):
+        """Async client, created on first use so RQ workers never open one."""
+        if self._async_client is None:
+            self._async_client = create_async_vector_client(self.backend, self.client)
+        return self._async_client
     
     # def _get_dense_embedding(self, text: str) -> List[float]:
     #     """Get dense embedding for text"""
@@ -29,90 +205,349 @@ class Qdrant:
     #     """Get bm25 embedding for text"""
     #     return self.sparse_embeddings.embed_query(text)
 
-    def _get_vector_store(self, collection_name: str):
-        """Get vector store for collection"""
-        if collection_name in self._vectorstore_cache:
-            return self._vectorstore_cache[collection_name]
+    def _collection(self, collection_name: str) -> str:
+        """Qdrant collection that holds the points of a user's collection."""
+        return self.shared_collection if self.storage_mode == "shared" else collection_name
 
-        vectorstore = QdrantVectorStore(
-            client=self.client,
-            collection_name=collection_name,
-            embedding=self.dense_embeddings,
-            sparse_embedding=self.sparse_embeddings,
-            retrieval_mode=RetrievalMode.HYBRID,
-            vector_name="dense",
-            sparse_vector_name="sparse",
+    def _tenant_filter(self, collection_name: str, *conditions: models.Condition) -> models.Filter:
+        """Filter on conditions, restricted to the user's points when the collection is shared."""
+        must = list(conditions)
+        if self.storage_mode == "shared":
+            must.append(models.FieldCondition(key=TENANT_FIELD, match=models.MatchValue(value=collection_name)))
+        return models.Filter(must=must)
+
+    def document_filter(self, collection_name: str, documents: List[str]) -> models.Filter:
+        """Filter matching the chunks of the given documents (by source) of a user."""
+        return self._tenant_filter(
+            collection_name,
+            models.FieldCondition(
+                key="metadata.source",
+                match=models.MatchAny(any=documents)
+            )
+        )
+
+    def _invalidate_results(self, collection_name: str):
+        """Bump the collection's retrieval cache version after a write."""
+        if self.retrieval_cache is not None:
+            self.retrieval_cache.bump(collection_name)
+
+    def _upsert_documents(self, collection_name: str, documents: List[Document], ids: List[str]):
+        """Embed documents with both models and upsert them as hybrid points."""
+        texts = [document.page_content for document in documents]
+        dense_vectors = self.dense_embeddings.embed_documents(texts)
+        sparse_vectors = self.sparse_embeddings.embed_documents(texts)
+
+        self.client.upsert(
+            collection_name=self._collection(collection_name),
+            points=[
+                models.PointStruct(
+                    id=point_id,
+                    vector={
+                        "dense": dense,
+                        "sparse": models.SparseVector(indices=sparse.indices, values=sparse.values),
+                    },
+                    payload={"page_content": document.page_content, "metadata": document.metadata},
+                )
+                for document, point_id, dense, sparse in zip(documents, ids, dense_vectors, sparse_vectors)
+            ],
         )
-        self._vectorstore_cache[collection_name] = vectorstore
-        return vectorstore
 
     def _ensure_collection(self, collection_name: str):
         """Ensure the specified collection exists"""
+        collection_name = self._collection(collection_name)
         try:
             self.client.get_collection(collection_name)
         except:
-            self.client.create_collection(
-                collection_name=collection_name,
-                vectors_config={
-                    "dense": models.VectorParams(
-                        size=384,
-                        distance=models.Distance.COSINE
-                    ),
-                },
-                sparse_vectors_config={
-                    "sparse": models.SparseVectorParams(index=models.SparseIndexParams(on_disk=False))
-                },
-                on_disk_payload=True
+            create_collection(
+                self.client, collection_name, self.profile, shared=self.storage_mode == "shared"
             )
 
-    def add_document(self, text_chunks: List[Document], collection_name: str, file_path: str):
-        """Add a single chunk to the collection."""
+    def prepare_chunk(
+        self, chunk: Document, collection_name: str, source: str, document_id: str
+    ) -> Tuple[Document, str]:
+        """Attach the document metadata to a chunk and derive its point ID."""
+        page_number = chunk.metadata.get("page_number", 1)
+        chunk_index = chunk.metadata.get("chunk_index", 0)
+        chunk_hash = content_hash(chunk.page_content)
+
+        # Merge existing metadata with new metadata
+        doc_metadata = chunk.metadata.copy()
+        doc_metadata.update({
+            "source": source,
+            "user_id": collection_name,
+            "document_id": document_id,
+            "content_hash": chunk_hash,
+        })
+
+        document = Document(
+            page_content=chunk.page_content,
+            metadata=doc_metadata
+        )
+        return document, make_point_id(document_id, page_number, chunk_index, chunk_hash)
+
+    def add_document(
+        self,
+        text_chunks: Iterable[Document],
+        collection_name: str,
+        source: str,
+        document_id: str,
+        batch_size: Optional[int] = None,
+        on_batch_upserted: Optional[Callable[[List[Document]], None]] = None
+    ):
+        """
+        Embed and upsert chunks in fixed-size batches, consuming text_chunks lazily.
+        Point IDs are derived from the document, page, chunk index and content, so
+        a retried job overwrites the points of a failed attempt.
+        """
+        prepared_chunks = (
+            self.prepare_chunk(chunk, collection_name, source, document_id)
+            for chunk in text_chunks
+        )
+        total = self.upsert_chunks(prepared_chunks, collection_name, batch_size, on_batch_upserted)
+
+        if not total:
+            logger.warning(f"No documents generated for {source}, skipping Qdrant upsert")
+            return
+
+        logger.info(f"Upserted {total} points for {source}")
+
+    def upsert_chunks(
+        self,
+        prepared_chunks: Iterable[Tuple[Document, str]],
+        collection_name: str,
+        batch_size: Optional[int] = None,
+        on_batch_upserted: Optional[Callable[[List[Document]], None]] = None
+    ) -> int:
+        """
+        Embed and upsert (document, point_id) pairs from prepare_chunk in batches.
+        Chunks of different files can share a batch, and so a single forward pass.
+        """
         self._ensure_collection(collection_name)
+        batch_size = batch_size or self.upsert_batch_size
 
-        documents = []
-        for chunk in text_chunks:
-            # Merge existing metadata with new metadata
-            doc_metadata = chunk.metadata.copy()
-            doc_metadata.update({
-                "source": Path(file_path).name,
-                "user_id": collection_name,
-            })
-            
-            document = Document(
-                page_content=chunk.page_content,
-                metadata=doc_metadata
+        total = 0
+        for batch in batched(prepared_chunks, batch_size):
+            documents = [document for document, _ in batch]
+            ids = [point_id for _, point_id in batch]
+
+            self._upsert_documents(collection_name, documents, ids)
+            total += len(documents)
+            self._invalidate_results(collection_name)
+
+            if on_batch_upserted:
+                on_batch_upserted(documents)
+
+        return total
+
+    def get_document_points(self, collection_name: str, document_id: str) -> Dict[str, str]:
+        """Map point ID -> content hash for every stored chunk of a document."""
+        points = {}
+        offset = None
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=self._collection(collection_name),
+                scroll_filter=self._tenant_filter(
+                    collection_name,
+                    models.FieldCondition(
+                        key="metadata.document_id",
+                        match=models.MatchValue(value=document_id)
+                    )
+                ),
+                limit=self.scroll_limit,
+                offset=offset,
+                with_payload=["metadata.content_hash"],
+                with_vectors=False,
             )
-            documents.append(document)
+            for record in records:
+                points[str(record.id)] = (record.payload or {}).get("metadata", {}).get("content_hash")
+            if offset is None:
+                return points
 
-        if not documents:
-            logger.warning(f"No documents generated for {file_path}, skipping Qdrant upsert")
-            return
+    def _copy_points(self, collection_name: str, copies: List[Tuple[str, str, Document]]):
+        """Upsert documents under new IDs, reusing the stored vectors of existing points."""
+        records = self.client.retrieve(
+            collection_name=self._collection(collection_name),
+            ids=[old_id for _, old_id, _ in copies],
+            with_payload=False,
+            with_vectors=True,
+        )
+        vectors = {str(record.id): record.vector for record in records}
 
-        vector_store = self._get_vector_store(collection_name)
-        vector_store.add_documents(documents)
+        self.client.upsert(
+            collection_name=self._collection(collection_name),
+            points=[
+                models.PointStruct(
+                    id=new_id,
+                    vector=vectors[old_id],
+                    payload={"page_content": document.page_content, "metadata": document.metadata},
+                )
+                for new_id, old_id, document in copies
+                if old_id in vectors
+            ],
+        )
 
-        logger.info(f"Upserted {len(documents)} points for {file_path}")
+    def copy_document(
+        self,
+        source_collection: str,
+        source_document_id: str,
+        collection_name: str,
+        source: str,
+        document_id: str,
+        batch_size: Optional[int] = None
+    ) -> int:
+        """
+        Copy the stored points of an identical, already indexed document, rewriting
+        their payload for the new owner. No chunk goes through the embedding models.
+        """
+        self._ensure_collection(collection_name)
+        batch_size = batch_size or self.upsert_batch_size
 
-    def delete_document(self, doc_name: str, collection_name: str):
-        """Delete document from Qdrant"""
-        filter_to_delete = models.Filter(
-            must=[
+        copied = 0
+        offset = None
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=self._collection(source_collection),
+                scroll_filter=self._tenant_filter(
+                    source_collection,
+                    models.FieldCondition(
+                        key="metadata.document_id",
+                        match=models.MatchValue(value=source_document_id)
+                    )
+                ),
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+
+            points = []
+            for record in records:
+                metadata = dict(record.payload.get("metadata", {}))
+                metadata.update({
+                    "source": source,
+                    "user_id": collection_name,
+                    "document_id": document_id,
+                })
+                points.append(models.PointStruct(
+                    id=make_point_id(
+                        document_id,
+                        metadata.get("page_number", 1),
+                        metadata.get("chunk_index", 0),
+                        metadata.get("content_hash", ""),
+                    ),
+                    vector=record.vector,
+                    payload={"page_content": record.payload.get("page_content"), "metadata": metadata},
+                ))
+
+            if points:
+                self.client.upsert(collection_name=self._collection(collection_name), points=points)
+                copied += len(points)
+            if offset is None:
+                break
+
+        self._invalidate_results(collection_name)
+        logger.info(f"Copied {copied} points of document {source_document_id} for {source}")
+        return copied
+
+    def replace_document(
+        self,
+        text_chunks: Iterable[Document],
+        collection_name: str,
+        source: str,
+        document_id: str,
+        batch_size: Optional[int] = None
+    ) -> Dict[str, int]:
+        """
+        Re-index a changed document by diffing chunk content hashes against the stored points.
+        Only new chunks are embedded; moved chunks reuse their stored vectors and
+        chunks that disappeared are deleted.
+        """
+        self._ensure_collection(collection_name)
+        batch_size = batch_size or self.upsert_batch_size
+
+        existing = self.get_document_points(collection_name, document_id)
+        id_by_hash = {chunk_hash: point_id for point_id, chunk_hash in existing.items() if chunk_hash}
+        current_ids = set()
+        stats = {"unchanged": 0, "moved": 0, "embedded": 0, "deleted": 0}
+
+        for batch in batched(text_chunks, batch_size):
+            to_embed, to_embed_ids, to_copy = [], [], []
+            for chunk in batch:
+                document, point_id = self.prepare_chunk(chunk, collection_name, source, document_id)
+                if point_id in current_ids:
+                    continue
+                current_ids.add(point_id)
+
+                if point_id in existing:
+                    stats["unchanged"] += 1
+                elif document.metadata["content_hash"] in id_by_hash:
+                    # Same text at a new page / position: keep the vectors, rewrite the payload
+                    to_copy.append((point_id, id_by_hash[document.metadata["content_hash"]], document))
+                else:
+                    to_embed.append(document)
+                    to_embed_ids.append(point_id)
+
+            if to_copy:
+                self._copy_points(collection_name, to_copy)
+                stats["moved"] += len(to_copy)
+            if to_embed:
+                self._upsert_documents(collection_name, to_embed, to_embed_ids)
+                stats["embedded"] += len(to_embed)
+
+        stale_ids = [point_id for point_id in existing if point_id not in current_ids]
+        for stale_batch in batched(stale_ids, batch_size):
+            self.client.delete(
+                collection_name=self._collection(collection_name),
+                points_selector=models.PointIdsList(points=list(stale_batch))
+            )
+        stats["deleted"] = len(stale_ids)
+
+        # Points written before chunks carried a document_id can't be diffed, drop them
+        self.client.delete(
+            collection_name=self._collection(collection_name),
+            points_selector=models.FilterSelector(filter=self._tenant_filter(
+                collection_name,
                 models.FieldCondition(
                     key="metadata.source",
-                    match=models.MatchValue(value=doc_name)
-                )
-            ]
+                    match=models.MatchValue(value=source)
+                ),
+                models.IsEmptyCondition(is_empty=models.PayloadField(key="metadata.document_id")),
+            ))
+        )
+
+        self._invalidate_results(collection_name)
+        logger.info(f"Re-indexed {source}: {stats}")
+        return stats
+
+    def delete_document(self, doc_name: str, collection_name: str):
+        """Delete document from Qdrant"""
+        filter_to_delete = self._tenant_filter(
+            collection_name,
+            models.FieldCondition(
+                key="metadata.source",
+                match=models.MatchValue(value=doc_name)
+            )
         )
 
         response = self.client.delete(
-            collection_name=collection_name,
+            collection_name=self._collection(collection_name),
             points_selector=models.FilterSelector(filter=filter_to_delete)
         )
 
+        self._invalidate_results(collection_name)
         logger.info(f"Deletion response: {response}")
 
     def delete_collection(self, collection_name: str):
         """Delete collection from Qdrant"""
+        self._invalidate_results(collection_name)
+        if self.storage_mode == "shared":
+            # Only the user's partition of the shared collection goes
+            if self.client.collection_exists(self.shared_collection):
+                self.client.delete(
+                    collection_name=self.shared_collection,
+                    points_selector=models.FilterSelector(filter=self._tenant_filter(collection_name))
+                )
+            return
         self.client.delete_collection(collection_name=collection_name)
 
     def search(
@@ -126,24 +561,143 @@ class Qdrant:
         if limit is None:
             limit = self.search_limit
         
-        vector_store = self._get_vector_store(collection_name=collection_name)
+        results = self.search_documents(query, collection_name, documents, limit)
+        return [hit.page_content for hit in results]
 
-        results = vector_store.similarity_search(
-            query=query,
-            k=limit,
-            filter=models.Filter(
-                must=[
-                    models.FieldCondition(
-                        key="metadata.source",
-                        match=models.MatchAny(
-                            any=documents
-                        ),
-                    ),
-                ]
-            ),
+    def _hybrid_query(
+        self,
+        dense: List[float],
+        sparse: models.SparseVector,
+        collection_name: str,
+        documents: List[str],
+        limit: int
+    ) -> dict:
+        """
+        query_points arguments for a single-request hybrid search: dense and sparse
+        prefetches fused with RRF on the server, returning only the prompt payload.
+        """
+        query_filter = self.document_filter(collection_name, documents)
+        return dict(
+            collection_name=self._collection(collection_name),
+            prefetch=[
+                models.Prefetch(
+                    query=dense, using="dense", filter=query_filter, limit=limit, params=self.search_params
+                ),
+                models.Prefetch(query=sparse, using="sparse", filter=query_filter, limit=limit),
+            ],
+            query=models.FusionQuery(fusion=models.Fusion.RRF),
+            limit=limit,
+            with_payload=models.PayloadSelectorInclude(include=PROMPT_PAYLOAD),
+            with_vectors=False,
+        )
+
+    @staticmethod
+    def _to_documents(points: List[models.ScoredPoint]) -> List[Document]:
+        return [
+            Document(
+                page_content=point.payload.get("page_content", ""),
+                metadata=point.payload.get("metadata", {})
+            )
+            for point in points
+        ]
+
+    def embed_dense_query(self, query: str) -> List[float]:
+        """Dense embedding of a question, memoized so each question is embedded once."""
+        with self._query_vectors_lock:
+            vector = self._query_vectors.get(query)
+        if vector is None:
+            vector = self.dense_embeddings.embed_query(query)
+            with self._query_vectors_lock:
+                self._query_vectors[query] = vector
+        return vector
+
+    async def aembed_dense_query(self, query: str) -> List[float]:
+        """embed_dense_query in the embedding thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._embedding_executor, self.embed_dense_query, query)
+
+    def search_documents(
+        self,
+        query: str,
+        collection_name: str,
+        documents: List[str],
+        limit: Optional[int] = None
+    ) -> List[Document]:
+        """Hybrid dense + sparse search fused with RRF in one Query API request."""
+        limit = limit or self.search_limit
+        cache_key = None
+        if self.retrieval_cache is not None:
+            cached, cache_key = self.retrieval_cache.get(collection_name, query, documents, limit)
+            if cached is not None:
+                return cached
+
+        dense = self.embed_dense_query(query)
+        sparse = self.sparse_embeddings.embed_query(query)
+
+        response = self.client.query_points(**self._hybrid_query(
+            dense,
+            models.SparseVector(indices=sparse.indices, values=sparse.values),
+            collection_name,
+            documents,
+            limit
+        ))
+        results = self._to_documents(response.points)
+        if self.retrieval_cache is not None:
+            self.retrieval_cache.put(cache_key, results)
+        return results
+
+    async def _aembed_query(self, query: str) -> Tuple[List[float], models.SparseVector]:
+        """Dense and sparse query embeddings, computed in the embedding thread pool."""
+        loop = asyncio.get_running_loop()
+        dense, sparse = await asyncio.gather(
+            loop.run_in_executor(self._embedding_executor, self.embed_dense_query, query),
+            loop.run_in_executor(self._embedding_executor, self.sparse_embeddings.embed_query, query),
+        )
+        return dense, models.SparseVector(indices=sparse.indices, values=sparse.values)
+
+    async def asearch_documents(
+        self,
+        query: str,
+        collection_name: str,
+        documents: List[str],
+        limit: Optional[int] = None
+    ) -> List[Document]:
+        """Async search_documents that doesn't block the event loop."""
+        limit = limit or self.search_limit
+        cache_key = None
+        if self.retrieval_cache is not None:
+            cached, cache_key = await self.retrieval_cache.aget(collection_name, query, documents, limit)
+            if cached is not None:
+                return cached
+
+        dense, sparse = await self._aembed_query(query)
+
+        response = await self.async_client.query_points(
+            **self._hybrid_query(dense, sparse, collection_name, documents, limit)
+        )
+        results = self._to_documents(response.points)
+        if self.retrieval_cache is not None:
+            await self.retrieval_cache.aput(cache_key, results)
+        return results
+
+    def as_retriever(
+        self, collection_name: str, documents: List[str], k: Optional[int] = None
+    ) -> "QdrantHybridRetriever":
+        """LangChain retriever over the given documents of a user."""
+        return QdrantHybridRetriever(
+            qdrant=self, collection_name=collection_name, documents=documents, k=k or self.search_limit
+        )
+
+    def configurable_retriever(self) -> Runnable:
+        """
+        Retriever for chains built once per process: the user collection, documents
+        and k are bound per call through config["configurable"].
+        """
+        return self.as_retriever("", []).configurable_fields(
+            collection_name=ConfigurableField(id="collection_name", name="Collection"),
+            documents=ConfigurableField(id="documents", name="Documents"),
+            k=ConfigurableField(id="k", name="Number of chunks"),
         )
-        
-        return [hit.page_content for hit in results]
 
 
 
@@ -206,6 +760,25 @@ class Qdrant:
     #         raise
 
 
+class QdrantHybridRetriever(BaseRetriever):
+    """Retriever over Qdrant.search_documents / asearch_documents, usable in LangChain chains."""
+
+    qdrant: Any
+    collection_name: str
+    documents: List[str]
+    k: int
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.qdrant.search_documents(query, self.collection_name, self.documents, self.k)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return await self.qdrant.asearch_documents(query, self.collection_name, self.documents, self.k)
+
+
 # -----------------------------
 # ✅ Singleton instance helper
 # -----------------------------
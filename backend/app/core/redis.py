@@ -1,9 +1,13 @@
 from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
 from rq import Queue
 from app.core.settings import settings
 
 # Connect to Redis
 redis_conn = Redis(host=settings.redis.host, port=settings.redis.port)
 
+# For caches read on the async chat path
+async_redis_conn = AsyncRedis(host=settings.redis.host, port=settings.redis.port)
+
 # Create queue
 queue = Queue(connection=redis_conn)
\ No newline at end of file
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import re
+from typing import List, Optional
+
+from langchain_core.documents import Document
+from loguru import logger
+
+from app.core import metrics
+from app.core.redis import async_redis_conn, redis_conn
+
+VERSION_KEY = "askdocs:retrieval:version:{collection}"
+RESULT_KEY = "askdocs:retrieval:{collection}:{version}:{key}"
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    return re.sub(r"\s+", " ", query).strip().lower().rstrip("?!. ")
+
+
+class RetrievalCache:
+    """
+    Search results in Redis keyed by (collection, documents, normalized query, k).
+    Every write to a collection bumps its version counter, which is part of the key,
+    so stale results are never read and simply expire.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(collection_name: str, version: int, query: str, documents: List[str], limit: int) -> str:
+        digest = hashlib.sha256(
+            json.dumps([sorted(documents), normalize_query(query), limit]).encode("utf-8")
+        ).hexdigest()
+        return RESULT_KEY.format(collection=collection_name, version=version, key=digest)
+
+    @staticmethod
+    def _decode(raw: bytes) -> List[Document]:
+        return [Document(page_content=item["page_content"], metadata=item["metadata"]) for item in json.loads(raw)]
+
+    @staticmethod
+    def _encode(results: List[Document]) -> str:
+        return json.dumps([{"page_content": doc.page_content, "metadata": doc.metadata} for doc in results])
+
+    def bump(self, collection_name: str):
+        """Invalidate every cached result of a collection."""
+        try:
+            redis_conn.incr(VERSION_KEY.format(collection=collection_name))
+        except Exception as e:
+            logger.warning(f"Could not bump retrieval cache version of {collection_name}: {e}")
+
+    def get(self, collection_name: str, query: str, documents: List[str], limit: int) -> tuple:
+        """Return (cached results or None, key to store fresh results under)."""
+        try:
+            version = int(redis_conn.get(VERSION_KEY.format(collection=collection_name)) or 0)
+            key = self._key(collection_name, version, query, documents, limit)
+            raw = redis_conn.get(key)
+        except Exception as e:
+            logger.warning(f"Retrieval cache lookup failed: {e}")
+            return None, None
+        metrics.incr("retrieval_cache_hits" if raw is not None else "retrieval_cache_misses")
+        return (self._decode(raw) if raw is not None else None), key
+
+    def put(self, key: Optional[str], results: List[Document]):
+        if key is None:
+            return
+        try:
+            redis_conn.set(key, self._encode(results), ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"Retrieval cache write failed: {e}")
+
+    async def aget(self, collection_name: str, query: str, documents: List[str], limit: int) -> tuple:
+        try:
+            version = int(await async_redis_conn.get(VERSION_KEY.format(collection=collection_name)) or 0)
+            key = self._key(collection_name, version, query, documents, limit)
+            raw = await async_redis_conn.get(key)
+        except Exception as e:
+            logger.warning(f"Retrieval cache lookup failed: {e}")
+            return None, None
+        await metrics.aincr("retrieval_cache_hits" if raw is not None else "retrieval_cache_misses")
+        return (self._decode(raw) if raw is not None else None), key
+
+    async def aput(self, key: Optional[str], results: List[Document]):
+        if key is None:
+            return
+        try:
+            await async_redis_conn.set(key, self._encode(results), ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"Retrieval cache write failed: {e}")
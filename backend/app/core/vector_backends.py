@@ -0,0 +1,477 @@
+"""
+Vector store backends behind the Qdrant class, selected by settings.qdrant.backend:
+
+- remote: a Qdrant server at settings.qdrant.url
+- local:  qdrant-client's embedded mode, persisted at settings.qdrant.local_path
+          (':memory:' keeps it in the process)
+- numpy:  NumpyVectorClient, exact brute-force search over memory-mapped vectors
+          at settings.qdrant.numpy_path
+
+Neither needs a server. The embedded client locks its folder to one process, and the
+API and the RQ worker each open a client, so local is only for benchmarks and tests
+(passed explicitly as Qdrant(backend="local")). numpy keeps points in SQLite and
+re-reads them when another process writes, so the API and workers can share it on a
+single box.
+"""
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from bisect import bisect_left
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http import models
+
+from app.core.settings import settings
+
+# Grow vector files in steps so appends don't resize the file every batch
+GROW_ROWS = 1024
+# Qdrant's default reciprocal rank fusion constant: score = sum(1 / (RRF_K + rank))
+RRF_K = 2
+
+
+def create_vector_client(backend: str):
+    """Synchronous client for a backend."""
+    if backend == "remote":
+        return QdrantClient(url=settings.qdrant.url)
+    if backend == "local":
+        # Holds an exclusive lock on path: one process only
+        path = settings.qdrant.local_path
+        return QdrantClient(location=":memory:") if path == ":memory:" else QdrantClient(path=path)
+    if backend == "numpy":
+        return NumpyVectorClient(settings.qdrant.numpy_path)
+    raise ValueError(f"Unknown vector store backend: {backend}")
+
+
+def create_async_vector_client(backend: str, client):
+    """
+    Async client for a backend. Embedded backends hold files another client can't
+    open, so they share the synchronous client through a thread.
+    """
+    if backend == "remote":
+        return AsyncQdrantClient(url=settings.qdrant.url)
+    return ThreadedAsyncClient(client)
+
+
+class ThreadedAsyncClient:
+    """Awaitable facade over a synchronous client, running each call in a thread."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name: str):
+        method = getattr(self._client, name)
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+
+        return call
+
+
+# -----------------------------
+# Filters and payloads
+# -----------------------------
+
+def _payload_value(payload: dict, key: str):
+    value = payload
+    for part in key.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _condition_matches(payload: dict, condition) -> bool:
+    if isinstance(condition, models.Filter):
+        return _filter_matches(payload, condition)
+    if isinstance(condition, models.IsEmptyCondition):
+        value = _payload_value(payload, condition.is_empty.key)
+        return value is None or value == []
+    if isinstance(condition, models.FieldCondition) and condition.match is not None:
+        value = _payload_value(payload, condition.key)
+        values = value if isinstance(value, list) else [value]
+        if isinstance(condition.match, models.MatchValue):
+            return condition.match.value in values
+        if isinstance(condition.match, models.MatchAny):
+            return any(item in condition.match.any for item in values)
+    raise NotImplementedError(f"Unsupported filter condition: {condition!r}")
+
+
+def _conditions(conditions) -> list:
+    if conditions is None:
+        return []
+    return conditions if isinstance(conditions, list) else [conditions]
+
+
+def _filter_matches(payload: dict, query_filter: Optional[models.Filter]) -> bool:
+    if query_filter is None:
+        return True
+    if not all(_condition_matches(payload, condition) for condition in _conditions(query_filter.must)):
+        return False
+    if any(_condition_matches(payload, condition) for condition in _conditions(query_filter.must_not)):
+        return False
+    should = _conditions(query_filter.should)
+    if should and not any(_condition_matches(payload, condition) for condition in should):
+        return False
+    return True
+
+
+def _select_payload(payload: dict, with_payload) -> Optional[dict]:
+    if with_payload is True:
+        return payload
+    if not with_payload:
+        return None
+    include = with_payload.include if isinstance(with_payload, models.PayloadSelectorInclude) else with_payload
+    selected = {}
+    for key in include:
+        value = _payload_value(payload, key)
+        if value is None:
+            continue
+        target = selected
+        *parents, leaf = key.split(".")
+        for part in parents:
+            target = target.setdefault(part, {})
+        target[leaf] = value
+    return selected
+
+
+def _point_id(point_id: str):
+    """Point IDs are stored as text; integer IDs come back as integers, like from Qdrant."""
+    return int(point_id) if point_id.isdigit() else point_id
+
+
+def _normalize(vector) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array, axis=-1, keepdims=True)
+    return array / np.where(norm == 0, 1, norm)
+
+
+# -----------------------------
+# NumPy brute-force backend
+# -----------------------------
+
+class _NumpyCollection:
+    """
+    One collection: unit-length dense vectors in a float32 memmap, payloads and sparse
+    vectors in SQLite. Payloads are kept in memory and reloaded when another process
+    (an RQ worker) commits, which SQLite's data_version reports.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(
+            os.path.join(path, "points.sqlite3"), timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS config (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS points ("
+            "id TEXT PRIMARY KEY, row INTEGER NOT NULL, payload TEXT NOT NULL, "
+            "sparse_indices BLOB NOT NULL, sparse_values BLOB NOT NULL)"
+        )
+        self._data_version = None
+        self._memmap: Optional[np.memmap] = None
+        self.points: Dict[str, Tuple[int, dict, np.ndarray, np.ndarray]] = {}
+
+    @property
+    def vectors_path(self) -> str:
+        return os.path.join(self.path, "dense.f32")
+
+    def get_config(self, key: str, default=None):
+        row = self.conn.execute("SELECT value FROM config WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_config(self, key: str, value):
+        self.conn.execute("INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    @property
+    def dim(self) -> int:
+        return self.get_config("dim")
+
+    def refresh(self):
+        """Reload points if another connection has committed since the last load."""
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return
+        self.points = {
+            point_id: (
+                row,
+                json.loads(payload),
+                np.frombuffer(sparse_indices, dtype=np.int32),
+                np.frombuffer(sparse_values, dtype=np.float32),
+            )
+            for point_id, row, payload, sparse_indices, sparse_values in self.conn.execute(
+                "SELECT id, row, payload, sparse_indices, sparse_values FROM points"
+            )
+        }
+        self._memmap = None
+        self._data_version = data_version
+
+    def vectors(self, min_rows: int = 0) -> np.memmap:
+        """Map the vector file, remapping when it has grown."""
+        if self._memmap is None or self._memmap.shape[0] < min_rows:
+            rows = os.path.getsize(self.vectors_path) // (self.dim * 4) if os.path.exists(self.vectors_path) else 0
+            self._memmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(rows, self.dim)) \
+                if rows else np.zeros((0, self.dim), dtype=np.float32)
+        return self._memmap
+
+    def vector(self, point_id: str) -> dict:
+        row, _, sparse_indices, sparse_values = self.points[point_id]
+        return {
+            "dense": self.vectors(row + 1)[row].tolist(),
+            "sparse": models.SparseVector(indices=sparse_indices.tolist(), values=sparse_values.tolist()),
+        }
+
+    def filter_ids(self, query_filter: Optional[models.Filter]) -> List[str]:
+        return [
+            point_id for point_id, (_, payload, _, _) in self.points.items()
+            if _filter_matches(payload, query_filter)
+        ]
+
+    def upsert(self, points: List[models.PointStruct]):
+        # Allocate rows and grow the file inside one write transaction, like the embedding cache
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            next_row = self.get_config("next_row", 0)
+            written = []
+            for point in points:
+                point_id = str(point.id)
+                existing = self.conn.execute("SELECT row FROM points WHERE id = ?", (point_id,)).fetchone()
+                if existing:
+                    row = existing[0]
+                else:
+                    row, next_row = next_row, next_row + 1
+
+                sparse = point.vector.get("sparse") or models.SparseVector(indices=[], values=[])
+                written.append((
+                    point_id,
+                    row,
+                    point.payload or {},
+                    np.asarray(sparse.indices, dtype=np.int32),
+                    np.asarray(sparse.values, dtype=np.float32),
+                    point.vector["dense"],
+                ))
+
+            needed = next_row * self.dim * 4
+            if not os.path.exists(self.vectors_path) or os.path.getsize(self.vectors_path) < needed:
+                with open(self.vectors_path, "ab") as f:
+                    f.truncate((next_row // GROW_ROWS + 1) * GROW_ROWS * self.dim * 4)
+
+            vectors = self.vectors(next_row)
+            for _, row, _, _, _, dense in written:
+                vectors[row] = _normalize(dense)
+            vectors.flush()
+
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO points (id, row, payload, sparse_indices, sparse_values) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (point_id, row, json.dumps(payload), sparse_indices.tobytes(), sparse_values.tobytes())
+                    for point_id, row, payload, sparse_indices, sparse_values, _ in written
+                ]
+            )
+            self.set_config("next_row", next_row)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        # Our own commits don't change data_version, apply them in memory
+        for point_id, row, payload, sparse_indices, sparse_values, _ in written:
+            self.points[point_id] = (row, payload, sparse_indices, sparse_values)
+
+    def delete(self, point_ids: List[str]):
+        # Rows of deleted points are not reused; this backend is meant for small collections
+        self.conn.executemany("DELETE FROM points WHERE id = ?", [(point_id,) for point_id in point_ids])
+        for point_id in point_ids:
+            self.points.pop(point_id, None)
+
+    def search_dense(self, vector: List[float], candidates: List[str], limit: int) -> List[Tuple[str, float]]:
+        if not candidates:
+            return []
+        rows = np.fromiter((self.points[point_id][0] for point_id in candidates), dtype=np.int64, count=len(candidates))
+        scores = self.vectors(int(rows.max()) + 1)[rows] @ _normalize(vector)
+        top = np.argsort(-scores, kind="stable")[:limit]
+        return [(candidates[i], float(scores[i])) for i in top]
+
+    def search_sparse(self, vector: models.SparseVector, candidates: List[str], limit: int) -> List[Tuple[str, float]]:
+        weights = dict(zip(vector.indices, vector.values))
+        scored = []
+        for point_id in candidates:
+            _, _, sparse_indices, sparse_values = self.points[point_id]
+            overlap = [(index, value) for index, value in zip(sparse_indices.tolist(), sparse_values.tolist()) if index in weights]
+            if overlap:
+                scored.append((point_id, sum(weights[index] * value for index, value in overlap)))
+        scored.sort(key=lambda hit: hit[1], reverse=True)
+        return scored[:limit]
+
+
+class NumpyVectorClient:
+    """
+    Exact brute-force stand-in for QdrantClient over local files, implementing the
+    subset of its API AskDocs uses. For tenants small enough that scanning every
+    vector is cheaper than a network hop; quantization and HNSW settings are ignored.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._collections: Dict[str, _NumpyCollection] = {}
+        self._lock = threading.RLock()
+
+    def _collection_path(self, collection_name: str) -> str:
+        return os.path.join(self.path, collection_name)
+
+    def _get(self, collection_name: str) -> _NumpyCollection:
+        if collection_name not in self._collections:
+            if not self.collection_exists(collection_name):
+                raise ValueError(f"Collection {collection_name} not found")
+            self._collections[collection_name] = _NumpyCollection(self._collection_path(collection_name))
+        collection = self._collections[collection_name]
+        collection.refresh()
+        return collection
+
+    # Collections
+
+    def collection_exists(self, collection_name: str) -> bool:
+        return os.path.exists(os.path.join(self._collection_path(collection_name), "points.sqlite3"))
+
+    def get_collections(self):
+        with self._lock:
+            return SimpleNamespace(collections=[
+                SimpleNamespace(name=name) for name in sorted(os.listdir(self.path)) if self.collection_exists(name)
+            ])
+
+    def get_collection(self, collection_name: str):
+        with self._lock:
+            collection = self._get(collection_name)
+            return SimpleNamespace(
+                status=models.CollectionStatus.GREEN,
+                points_count=len(collection.points),
+                payload_schema=collection.get_config("payload_schema", {}),
+                config=SimpleNamespace(
+                    params=SimpleNamespace(vectors={"dense": SimpleNamespace(size=collection.dim, on_disk=True)}),
+                    quantization_config=None,
+                ),
+            )
+
+    def create_collection(self, collection_name: str, vectors_config: dict, **kwargs) -> bool:
+        with self._lock:
+            if self.collection_exists(collection_name):
+                raise ValueError(f"Collection {collection_name} already exists")
+            os.makedirs(self._collection_path(collection_name), exist_ok=True)
+            collection = _NumpyCollection(self._collection_path(collection_name))
+            collection.set_config("dim", vectors_config["dense"].size)
+            self._collections[collection_name] = collection
+            return True
+
+    def delete_collection(self, collection_name: str, **kwargs) -> bool:
+        with self._lock:
+            collection = self._collections.pop(collection_name, None)
+            if collection is not None:
+                collection.conn.close()
+            shutil.rmtree(self._collection_path(collection_name), ignore_errors=True)
+            return True
+
+    def create_payload_index(self, collection_name: str, field_name: str, field_schema=None, **kwargs):
+        # Filters scan the in-memory payloads; only record the index so callers see it exists
+        with self._lock:
+            collection = self._get(collection_name)
+            schema = collection.get_config("payload_schema", {})
+            schema[field_name] = str(field_schema)
+            collection.set_config("payload_schema", schema)
+
+    def update_collection(self, collection_name: str, **kwargs) -> bool:
+        return True
+
+    # Points
+
+    def upsert(self, collection_name: str, points: List[models.PointStruct], **kwargs):
+        with self._lock:
+            self._get(collection_name).upsert(points)
+            return models.UpdateResult(operation_id=0, status=models.UpdateStatus.COMPLETED)
+
+    def delete(self, collection_name: str, points_selector, **kwargs):
+        with self._lock:
+            collection = self._get(collection_name)
+            if isinstance(points_selector, models.PointIdsList):
+                point_ids = [str(point_id) for point_id in points_selector.points]
+            elif isinstance(points_selector, models.FilterSelector):
+                point_ids = collection.filter_ids(points_selector.filter)
+            else:
+                raise NotImplementedError(f"Unsupported points selector: {points_selector!r}")
+            collection.delete(point_ids)
+            return models.UpdateResult(operation_id=0, status=models.UpdateStatus.COMPLETED)
+
+    def _record(self, collection: _NumpyCollection, point_id: str, with_payload, with_vectors) -> models.Record:
+        return models.Record(
+            id=_point_id(point_id),
+            payload=_select_payload(collection.points[point_id][1], with_payload),
+            vector=collection.vector(point_id) if with_vectors else None,
+        )
+
+    def retrieve(self, collection_name: str, ids: list, with_payload=True, with_vectors=False, **kwargs):
+        with self._lock:
+            collection = self._get(collection_name)
+            return [
+                self._record(collection, str(point_id), with_payload, with_vectors)
+                for point_id in ids if str(point_id) in collection.points
+            ]
+
+    def scroll(self, collection_name: str, scroll_filter=None, limit: int = 10, offset=None,
+               with_payload=True, with_vectors=False, **kwargs):
+        with self._lock:
+            collection = self._get(collection_name)
+            point_ids = sorted(collection.filter_ids(scroll_filter))
+            start = bisect_left(point_ids, str(offset)) if offset is not None else 0
+            page = point_ids[start:start + limit]
+            next_offset = _point_id(point_ids[start + limit]) if start + limit < len(point_ids) else None
+            return [self._record(collection, point_id, with_payload, with_vectors) for point_id in page], next_offset
+
+    def count(self, collection_name: str, count_filter=None, **kwargs):
+        with self._lock:
+            return models.CountResult(count=len(self._get(collection_name).filter_ids(count_filter)))
+
+    def _search(self, collection: _NumpyCollection, query, using: Optional[str],
+                query_filter: Optional[models.Filter], limit: int) -> List[Tuple[str, float]]:
+        candidates = collection.filter_ids(query_filter)
+        if isinstance(query, models.SparseVector) or using == "sparse":
+            return collection.search_sparse(query, candidates, limit)
+        return collection.search_dense(query, candidates, limit)
+
+    def query_points(self, collection_name: str, query=None, using: Optional[str] = None, prefetch=None,
+                     query_filter: Optional[models.Filter] = None, limit: int = 10, with_payload=True,
+                     with_vectors=False, **kwargs):
+        with self._lock:
+            collection = self._get(collection_name)
+            if prefetch:
+                if not (isinstance(query, models.FusionQuery) and query.fusion == models.Fusion.RRF):
+                    raise NotImplementedError("Only RRF fusion of prefetches is supported")
+                fused: Dict[str, float] = {}
+                for item in prefetch if isinstance(prefetch, list) else [prefetch]:
+                    hits = self._search(collection, item.query, item.using, item.filter, item.limit or limit)
+                    for rank, (point_id, _) in enumerate(hits):
+                        fused[point_id] = fused.get(point_id, 0.0) + 1 / (RRF_K + rank)
+                allowed = set(collection.filter_ids(query_filter)) if query_filter else None
+                hits = sorted(
+                    ((point_id, score) for point_id, score in fused.items() if allowed is None or point_id in allowed),
+                    key=lambda hit: hit[1],
+                    reverse=True,
+                )[:limit]
+            else:
+                hits = self._search(collection, query, using, query_filter, limit)
+
+            return models.QueryResponse(points=[
+                models.ScoredPoint(
+                    id=_point_id(point_id),
+                    version=0,
+                    score=score,
+                    payload=_select_payload(collection.points[point_id][1], with_payload),
+                    vector=collection.vector(point_id) if with_vectors else None,
+                )
+                for point_id, score in hits
+            ])
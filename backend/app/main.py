@@ -5,6 +5,7 @@ from app.routes.chat import chat_router
 from app.routes.documents import document_router
 from app.routes.users import user_router
 from app.routes.sessions import session_router
+from app.routes.metrics import metrics_router
 from app.dependencies.auth import get_current_user
 import os
 
@@ -32,3 +33,4 @@ app.include_router(user_router, dependencies=[Depends(get_current_user)])
 app.include_router(document_router, dependencies=[Depends(get_current_user)])
 app.include_router(session_router, dependencies=[Depends(get_current_user)])
 app.include_router(chat_router, dependencies=[Depends(get_current_user)])
+app.include_router(metrics_router, dependencies=[Depends(get_current_user)])
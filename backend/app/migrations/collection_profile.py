@@ -0,0 +1,48 @@
+"""
+Switch existing Qdrant collections to a storage profile from settings.qdrant.profiles
+(quantization, on-disk dense vectors, on-disk sparse index). The change is applied
+in place with update_collection; Qdrant rebuilds segments in the background and
+keeps serving searches meanwhile.
+
+Usage:
+    python -m app.migrations.collection_profile [--profile NAME] [--dry-run] [collection ...]
+"""
+import argparse
+
+from loguru import logger
+from qdrant_client import QdrantClient
+
+from app.core.qdrant import apply_collection_profile, get_collection_profile
+from app.core.settings import settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply a storage profile to existing Qdrant collections")
+    parser.add_argument("collections", nargs="*", help="Collections to migrate (default: all)")
+    parser.add_argument("--profile", default=settings.qdrant.profile)
+    parser.add_argument("--dry-run", action="store_true", help="Only report the current configuration")
+    args = parser.parse_args()
+
+    profile = get_collection_profile(args.profile)
+    client = QdrantClient(url=settings.qdrant.url)
+    collections = args.collections or [collection.name for collection in client.get_collections().collections]
+
+    for collection_name in collections:
+        if args.dry_run:
+            params = client.get_collection(collection_name).config
+            logger.info(
+                f"{collection_name}: quantization={params.quantization_config} "
+                f"dense on_disk={params.params.vectors['dense'].on_disk}"
+            )
+            continue
+
+        try:
+            apply_collection_profile(client, collection_name, profile)
+        except Exception as e:
+            logger.error(f"Failed to apply profile {args.profile} to {collection_name}: {e}")
+            continue
+        logger.info(f"{collection_name}: applied profile {args.profile}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Add the keyword payload indexes (metadata.source, metadata.user_id,
+metadata.document_id) to Qdrant collections created before collections
+declared them. Safe to re-run: fields that are already indexed are skipped.
+
+Usage:
+    python -m app.migrations.payload_indexes [--dry-run] [collection ...]
+"""
+import argparse
+
+from loguru import logger
+from qdrant_client import QdrantClient
+
+from app.core.qdrant import PAYLOAD_INDEXES, ensure_payload_indexes
+from app.core.settings import settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add payload indexes to existing Qdrant collections")
+    parser.add_argument("collections", nargs="*", help="Collections to migrate (default: all)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report the missing indexes")
+    args = parser.parse_args()
+
+    # A bare client, the migration doesn't need the embedding models
+    client = QdrantClient(url=settings.qdrant.url)
+    collections = args.collections or [collection.name for collection in client.get_collections().collections]
+
+    for collection_name in collections:
+        if args.dry_run:
+            existing = client.get_collection(collection_name).payload_schema or {}
+            missing = [field_name for field_name in PAYLOAD_INDEXES if field_name not in existing]
+            logger.info(f"{collection_name}: missing {missing or 'nothing'}")
+            continue
+
+        try:
+            created = ensure_payload_indexes(
+                client, collection_name, shared=collection_name == settings.qdrant.shared_collection
+            )
+        except Exception as e:
+            logger.error(f"Failed to index {collection_name}: {e}")
+            continue
+        logger.info(f"{collection_name}: created {created or 'nothing, already indexed'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Move per-user Qdrant collections into the shared multi-tenant collection
+(settings.qdrant.shared_collection). Points keep their IDs, vectors and payload;
+metadata.user_id is set to the source collection name so the tenant filter finds
+them. Re-running a collection is safe, points are upserted by ID.
+
+Switch settings.qdrant.storage_mode to 'shared' once every collection is moved.
+
+Usage:
+    python -m app.migrations.shared_collection [--enqueue] [--delete-source] [collection ...]
+"""
+import argparse
+import uuid
+
+from loguru import logger
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from rq import Retry
+
+from app.core.qdrant import TENANT_FIELD, create_collection, get_collection_profile
+from app.core.redis import queue
+from app.core.settings import settings
+
+
+def _is_user_collection(collection_name: str) -> bool:
+    """Per-user collections are named after the user ID."""
+    try:
+        uuid.UUID(collection_name)
+        return True
+    except ValueError:
+        return False
+
+
+def _ensure_shared_collection(client: QdrantClient, shared_collection: str):
+    if client.collection_exists(shared_collection):
+        return
+    try:
+        create_collection(client, shared_collection, get_collection_profile(), shared=True)
+    except Exception:
+        # Another migration job created it first
+        if not client.collection_exists(shared_collection):
+            raise
+
+
+def migrate_collection(collection_name: str, delete_source: bool = False) -> int:
+    """Copy every point of a per-user collection into the shared collection, returning the count."""
+    client = QdrantClient(url=settings.qdrant.url)
+    shared_collection = settings.qdrant.shared_collection
+    _ensure_shared_collection(client, shared_collection)
+
+    moved = 0
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=collection_name,
+            limit=settings.qdrant.scroll_limit,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+
+        points = []
+        for record in records:
+            payload = dict(record.payload or {})
+            payload["metadata"] = {**payload.get("metadata", {}), "user_id": collection_name}
+            points.append(models.PointStruct(id=record.id, vector=record.vector, payload=payload))
+
+        if points:
+            client.upsert(collection_name=shared_collection, points=points)
+            moved += len(points)
+        if offset is None:
+            break
+
+    logger.info(f"Moved {moved} points of {collection_name} into {shared_collection}")
+
+    if delete_source:
+        migrated = client.count(
+            collection_name=shared_collection,
+            count_filter=models.Filter(must=[
+                models.FieldCondition(key=TENANT_FIELD, match=models.MatchValue(value=collection_name))
+            ]),
+            exact=True,
+        ).count
+        if migrated < client.count(collection_name=collection_name, exact=True).count:
+            raise RuntimeError(f"Shared collection is missing points of {collection_name}, keeping it")
+        client.delete_collection(collection_name=collection_name)
+        logger.info(f"Deleted migrated collection {collection_name}")
+
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move per-user Qdrant collections into the shared collection")
+    parser.add_argument("collections", nargs="*", help="Collections to move (default: every per-user collection)")
+    parser.add_argument("--enqueue", action="store_true", help="Run one RQ job per collection instead of inline")
+    parser.add_argument("--delete-source", action="store_true", help="Delete each collection once moved")
+    args = parser.parse_args()
+
+    client = QdrantClient(url=settings.qdrant.url)
+    collections = args.collections or [
+        collection.name
+        for collection in client.get_collections().collections
+        if _is_user_collection(collection.name)
+    ]
+
+    for collection_name in collections:
+        if args.enqueue:
+            job = queue.enqueue(
+                migrate_collection,
+                args=(collection_name, args.delete_source),
+                retry=Retry(max=3, interval=[10, 30, 60]),
+            )
+            logger.info(f"{collection_name}: enqueued job {job.id}")
+            continue
+
+        try:
+            migrate_collection(collection_name, args.delete_source)
+        except Exception as e:
+            logger.error(f"Failed to move {collection_name}: {e}")
+
+
+if __name__ == "__main__":
+    main()
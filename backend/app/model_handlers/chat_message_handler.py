@@ -12,6 +12,7 @@ class ChatMessageCreate(BaseModel):
     session_id: str = Field(..., description="ID of the chat session")
     query: str = Field(..., description="The user's query message")
     response: Optional[str] = Field(None, description="The AI's response message")
+    truncated: bool = Field(False, description="Whether the response was cut short by a client disconnect")
 
 
 class ChatMessageUpdate(BaseModel):
@@ -27,6 +28,7 @@ class ChatMessageResponse(BaseModel):
     session_id: UUID = Field(..., description="ID of the chat session")
     query: str = Field(..., description="The user's query message")
     response: Optional[str] = Field(None, description="The AI's response message")
+    truncated: bool = Field(False, description="Whether the response was cut short by a client disconnect")
     created_at: datetime = Field(..., description="Timestamp when the message was created")
 
     @field_serializer("id")
@@ -85,18 +87,32 @@ class ChatMessageHandler(CRUDManager[ChatMessage, ChatMessageCreate, ChatMessage
     def list_all(self) -> List[ChatMessageResponse]:
         return super().list_all()
 
-    def get_by_session(self, session_id: str) -> List[ChatMessageResponse]:
-        """Get recent messages in a chat session (latest 5, ascending order)."""
+    def get_by_session(self, session_id: str, limit: int = 5) -> List[ChatMessageResponse]:
+        """Get recent messages in a chat session (latest `limit`, ascending order)."""
         messages = (
             self._db.query(ChatMessage)
             .filter(ChatMessage.session_id == session_id)
             .order_by(ChatMessage.created_at.desc())
-            .limit(5)
+            .limit(limit)
             .all()
         )
         messages.reverse()
         return [self._response_schema.model_validate(msg) for msg in messages]
 
+    def get_unsummarized(
+        self, session_id: str, summarized_until: Optional[datetime], keep_recent: int
+    ) -> List[ChatMessageResponse]:
+        """
+        Messages newer than summarized_until, minus the latest keep_recent that the
+        prompt includes verbatim (ascending order).
+        """
+        query = self._db.query(ChatMessage).filter(ChatMessage.session_id == session_id)
+        if summarized_until is not None:
+            query = query.filter(ChatMessage.created_at > summarized_until)
+        messages = query.order_by(ChatMessage.created_at.desc()).offset(keep_recent).all()
+        messages.reverse()
+        return [self._response_schema.model_validate(msg) for msg in messages]
+
     def get_paginated(
         self,
         session_id: str,
@@ -135,6 +151,7 @@ class ChatMessageHandler(CRUDManager[ChatMessage, ChatMessageCreate, ChatMessage
                     "id": f"{msg.id}-a",
                     "role": "assistant",
                     "content": msg.response,
+                    "truncated": msg.truncated,
                     "created_at": msg.created_at.isoformat(),
                 })
             elif msg.query:
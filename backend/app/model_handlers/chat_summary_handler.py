@@ -0,0 +1,73 @@
+from datetime import datetime
+from typing import Optional, List
+from pydantic import BaseModel, Field, ConfigDict, field_serializer
+from sqlalchemy.orm import Session
+from uuid import UUID
+from . import CRUDManager
+from app.models.chat_summary import ChatSummary
+
+
+class ChatSummaryCreate(BaseModel):
+    session_id: str = Field(..., description="ID of the chat session")
+    summary: str = Field(..., description="Rolling summary of the earlier conversation")
+    summarized_until: datetime = Field(..., description="Creation time of the newest summarized message")
+    message_count: int = Field(0, description="Number of messages folded into the summary")
+
+
+class ChatSummaryUpdate(BaseModel):
+    summary: Optional[str] = Field(None, description="Rolling summary of the earlier conversation")
+    summarized_until: Optional[datetime] = Field(None, description="Creation time of the newest summarized message")
+    message_count: Optional[int] = Field(None, description="Number of messages folded into the summary")
+
+
+class ChatSummaryResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID = Field(..., description="Unique identifier for the summary")
+    session_id: UUID = Field(..., description="ID of the chat session")
+    summary: str = Field(..., description="Rolling summary of the earlier conversation")
+    summarized_until: datetime = Field(..., description="Creation time of the newest summarized message")
+    message_count: int = Field(..., description="Number of messages folded into the summary")
+    updated_at: Optional[datetime] = Field(None, description="Timestamp when the summary was last updated")
+
+    @field_serializer("id")
+    def serialize_id(self, v: UUID) -> str:
+        return str(v)
+
+    @field_serializer("session_id")
+    def serialize_session_id(self, v: UUID) -> str:
+        return str(v)
+
+
+class ChatSummaryHandler(CRUDManager[ChatSummary, ChatSummaryCreate, ChatSummaryUpdate, ChatSummaryResponse]):
+    def __init__(self, db: Session):
+        super().__init__(db=db, model=ChatSummary, response_schema=ChatSummaryResponse)
+
+    def read(self, id: str) -> ChatSummaryResponse:
+        return super().read(id)
+
+    def delete(self, id: str) -> dict:
+        return super().delete(id)
+
+    def list_all(self) -> List[ChatSummaryResponse]:
+        return super().list_all()
+
+    def get_by_session(self, session_id: str) -> Optional[ChatSummaryResponse]:
+        """Get the rolling summary of a chat session, if one was written yet."""
+        summary = self._db.query(ChatSummary).filter(ChatSummary.session_id == session_id).first()
+        return self._response_schema.model_validate(summary) if summary else None
+
+    def upsert(self, obj_in: ChatSummaryCreate) -> ChatSummaryResponse:
+        """Create or replace the summary of a chat session."""
+        summary = self._db.query(ChatSummary).filter(ChatSummary.session_id == obj_in.session_id).first()
+        if summary is None:
+            summary = ChatSummary(**obj_in.model_dump())
+            self._db.add(summary)
+        else:
+            for field, value in obj_in.model_dump(exclude={"session_id"}).items():
+                setattr(summary, field, value)
+
+        self._db.commit()
+        self._db.refresh(summary)
+
+        return self._response_schema.model_validate(summary)
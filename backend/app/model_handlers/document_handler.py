@@ -14,6 +14,7 @@ class DocumentCreate(BaseModel):
     file_path: str = Field(..., description="Path to the document file")
     vector_collection: str = Field(..., description="Vector collection for the document")
     status: str = Field(..., description="Status of the document")
+    content_hash: Optional[str] = Field(None, description="SHA-256 of the uploaded file")
 
 class DocumentUpdate(BaseModel):
     filename: Optional[str] = Field(None, description="Name of the document file")
@@ -22,6 +23,11 @@ class DocumentUpdate(BaseModel):
     job_id: Optional[str] = Field(None, description="ID of the job processing the document")
     error_message: Optional[str] = Field(None, description="Error message if processing failed")
 
+class DocumentContentUpdate(DocumentUpdate):
+    """Server-computed fields set when a document's file is replaced; never accepted from clients."""
+    file_path: Optional[str] = Field(None, description="Path to the document file")
+    content_hash: Optional[str] = Field(None, description="SHA-256 of the uploaded file")
+
 class DocumentResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     
@@ -29,6 +35,7 @@ class DocumentResponse(BaseModel):
     filename: str = Field(..., description="Name of the document file")
     vector_collection: str = Field(..., description="Vector collection for the document")
     status: str = Field(..., description="Status of the document")
+    content_hash: Optional[str] = Field(None, description="SHA-256 of the uploaded file")
     job_id: Optional[str] = Field(None, description="ID of the job processing the document")
     error_message: Optional[str] = Field(None, description="Error message if processing failed")
     created_at: datetime = Field(..., description="Timestamp when the document was created")
@@ -72,3 +79,14 @@ class DocumentHandler(CRUDManager[Document, DocumentCreate, DocumentUpdate, Docu
         """Get all documents in a vector collection."""
         documents = self._db.query(Document).filter(Document.vector_collection == collection).all()
         return [self._response_schema.model_validate(doc) for doc in documents]
+
+    def get_completed_by_content_hash(self, content_hash: str, exclude_id: str = None) -> Optional[DocumentResponse]:
+        """Get the most recent fully indexed document with the same file content."""
+        query = self._db.query(Document).filter(
+            Document.content_hash == content_hash,
+            Document.status == "completed"
+        )
+        if exclude_id:
+            query = query.filter(Document.id != exclude_id)
+        document = query.order_by(Document.updated_at.desc()).first()
+        return self._response_schema.model_validate(document) if document else None
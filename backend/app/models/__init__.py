@@ -2,6 +2,7 @@ from app.models.user import User
 from app.models.document import Document
 from app.models.chat_session import ChatSession
 from app.models.chat_message import ChatMessage
+from app.models.chat_summary import ChatSummary
 from app.models.chat_session_documents import ChatSessionDocument
 
 __all__ = [
@@ -9,5 +10,6 @@ __all__ = [
     "Document",
     "ChatSession",
     "ChatMessage",
+    "ChatSummary",
     "ChatSessionDocument"
 ]
\ No newline at end of file
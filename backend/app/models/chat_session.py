@@ -17,6 +17,7 @@ class ChatSession(Base):
     user = relationship("User", back_populates="chat_sessions")
     messages = relationship("ChatMessage", back_populates="session", cascade="all, delete-orphan", passive_deletes=True)
     session_documents = relationship("ChatSessionDocument", back_populates="session", cascade="all, delete-orphan")
+    summary = relationship("ChatSummary", back_populates="session", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
 
     __table_args__ = (
         Index("idx_chat_sessions_user_name", "user_id", "name"),
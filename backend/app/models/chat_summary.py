@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Text, DateTime, ForeignKey, Integer
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.core.base import Base
+import uuid
+
+class ChatSummary(Base):
+    __tablename__ = "chat_summaries"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    session_id = Column(UUID(as_uuid=True), ForeignKey("chat_sessions.id", ondelete="CASCADE"), nullable=False, unique=True)
+    summary = Column(Text, nullable=False)
+    # created_at of the newest message folded into the summary
+    summarized_until = Column(DateTime(timezone=True), nullable=False)
+    message_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    session = relationship("ChatSession", back_populates="summary")
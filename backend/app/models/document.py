@@ -13,6 +13,7 @@ class Document(Base):
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     filename = Column(String, nullable=False, index=True)
     file_path = Column(String, nullable=False)
+    content_hash = Column(String, nullable=True, index=True)
     vector_collection = Column(String, nullable=False)
     status = Column(String, nullable=False, default="processing", index=True)
     job_id = Column(String, nullable=True, index=True)
@@ -1,30 +1,71 @@
-from fastapi import Depends, APIRouter
+from fastapi import Depends, APIRouter, Request
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
+from rq import Retry
+from contextlib import aclosing
+from loguru import logger
+import asyncio
 import time
 
 from app.dependencies.auth import get_current_user
-from app.services.chat_service import Chat
+from app.services.chat_service import get_chat_service
+from app.services.conversation_summary import get_conversation_summarizer
+from app.services.context_assembly import get_token_counter
 from app.routes import AppResponse
 from app.model_handlers.chat_message_handler import (
     ChatMessageHandler,
     ChatMessageCreate,
 )
 from app.core.db import get_global_db_session
+from app.core import metrics
+from app.core.redis import queue
+from app.core.settings import settings
 from app.model_handlers.user_handler import UserResponse
 
 
 chat_router = APIRouter(prefix="/chat", tags=["chat"])
 
+def summarize_session_task(session_id: str):
+    summarizer = get_conversation_summarizer()
+    return summarizer.summarize(session_id)
+
 class ChatRequest(BaseModel):
     session_id: str
     query: str
 
 
+async def watch_disconnect(http_request: Request, task: asyncio.Task):
+    """Cancel the generation task as soon as the client goes away."""
+    while not task.done():
+        if await http_request.is_disconnected():
+            task.cancel()
+            return
+        await asyncio.sleep(settings.chat_stream.disconnect_poll_interval)
+
+
+async def record_cancellation(session_id: str, streamed: str):
+    """Count the answer tokens an early cancellation saved, estimated from the average completed answer."""
+    streamed_tokens = get_token_counter()(streamed) if streamed else 0
+    try:
+        completed = await asyncio.to_thread(metrics.get_metrics)
+    except Exception as e:
+        logger.debug(f"Could not read answer length metrics: {e}")
+        completed = {}
+    answers = completed.get("chat_answers_completed", 0)
+    average = completed.get("chat_answer_tokens", 0) / answers if answers else 0
+    saved = max(average - streamed_tokens, 0)
+
+    logger.info(f"Session {session_id} client disconnected after {streamed_tokens} tokens, ~{saved:.0f} saved")
+    await metrics.aincr("chat_streams_cancelled")
+    await metrics.aincr("chat_cancelled_tokens_streamed", streamed_tokens)
+    await metrics.aincr("chat_tokens_saved", saved)
+
+
 @chat_router.post("/")
 async def chat(
     request: ChatRequest,
+    http_request: Request,
     db: Session = Depends(get_global_db_session),
     current_user: UserResponse = Depends(get_current_user),
 ):
@@ -34,26 +75,70 @@ async def chat(
     session_id = request.session_id
     query = request.query
 
-    async def generate_response():
-        full_response = ""
+    async def persist(full_response: str, truncated: bool):
+        # Save message after streaming; a disconnected client's partial answer is flagged
+        chat_message = ChatMessageCreate(
+            session_id=session_id,
+            query=query,
+            response=full_response,
+            truncated=truncated,
+        )
+        await asyncio.to_thread(ChatMessageHandler(db).create, chat_message)
+
+        # Fold turns that left the recent window into the session summary, off the request path
+        await asyncio.to_thread(
+            queue.enqueue,
+            summarize_session_task,
+            args=(session_id,),
+            retry=Retry(max=3, interval=[10, 30, 60]),
+        )
+
+    async def finish(full_response: str, truncated: bool):
+        if truncated:
+            await record_cancellation(session_id, full_response)
+        else:
+            await metrics.aincr("chat_answers_completed")
+            await metrics.aincr("chat_answer_tokens", get_token_counter()(full_response))
+        await persist(full_response, truncated)
+
+    async def produce(chunks: asyncio.Queue):
+        """Run the chat pipeline into the queue; cancelled when the client disconnects."""
+        full_response, truncated = "", False
         try:
-            for chunk in Chat().stream_chat_response(
+            # aclosing, so cancelling also closes the LLM stream and any pending retrieval
+            async with aclosing(get_chat_service().astream_chat_response(
                 user_id=user_id,
                 session_id=session_id,
                 query=query,
-            ):
-                full_response += chunk
-                yield chunk
-            
-            # Save message after streaming
-            chat_message = ChatMessageCreate(
-                session_id=session_id,
-                query=query,
-                response=full_response
-            )
-            ChatMessageHandler(db).create(chat_message)
-            
+            )) as stream:
+                async for chunk in stream:
+                    full_response += chunk
+                    await chunks.put(chunk)
+
+        except asyncio.CancelledError:
+            truncated = True
         except Exception as e:
-            yield f"Error: {str(e)}"
+            await chunks.put(f"Error: {str(e)}")
+            await chunks.put(None)
+            return
+
+        try:
+            # Shielded, so the message is saved even if the request is cancelled meanwhile
+            await asyncio.shield(finish(full_response, truncated))
+        finally:
+            await chunks.put(None)
+
+    async def generate_response():
+        chunks: asyncio.Queue = asyncio.Queue()
+        # Its own task, so it can be cancelled on disconnect and still save what it has
+        producer = asyncio.create_task(produce(chunks))
+        watcher = asyncio.create_task(watch_disconnect(http_request, producer))
+        try:
+            while (chunk := await chunks.get()) is not None:
+                yield chunk
+        finally:
+            watcher.cancel()
+            if not producer.done():
+                producer.cancel()
 
-    return StreamingResponse(generate_response(), media_type="text/plain")
\ No newline at end of file
+    return StreamingResponse(generate_response(), media_type="text/plain")
@@ -4,26 +4,40 @@ from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, status
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from rq import Retry
+from typing import List, Tuple
 import os
-from typing import List
-import aiofiles
 
 from app.routes import AppResponse
 from app.dependencies.auth import get_current_user
-from app.services.document_processor import DocumentProcessor
+from app.services.document_processor import get_document_processor
 from app.core.settings import settings
 from app.core.qdrant import get_qdrant_client
-from app.model_handlers.document_handler import DocumentCreate, DocumentHandler, DocumentUpdate
+from app.model_handlers.document_handler import (
+    DocumentContentUpdate,
+    DocumentCreate,
+    DocumentHandler,
+    DocumentUpdate,
+)
 from app.model_handlers.user_handler import UserResponse
 from app.core.db import get_global_db_session
 from app.core.redis import queue
+from app.utils.storage import save_upload
+from app.services.answer_cache import get_answer_cache
 
 document_router = APIRouter(prefix="/documents", tags=["documents"])
 
 def process_document_task(file_path: str, user_id: str, document_id: str):
-    processor = DocumentProcessor()
+    processor = get_document_processor()
     return processor.process_document(file_path, user_id, document_id)
 
+def reindex_document_task(file_path: str, user_id: str, document_id: str):
+    processor = get_document_processor()
+    return processor.reindex_document(file_path, user_id, document_id)
+
+def process_document_batch_task(items: List[Tuple[str, str]], user_id: str):
+    processor = get_document_processor()
+    return processor.process_document_batch(items, user_id)
+
 def delete_document_task(doc_name: str, collection_name: str):
     qdrant_client = get_qdrant_client()
     return qdrant_client.delete_document(doc_name, collection_name)
@@ -38,17 +52,49 @@ async def upload_document(
     """
     Upload one or more documents.
     Unsupported formats are skipped.
-    Files are queued for background processing.
+    Files are queued for background processing, small files are grouped into batch jobs.
     """
     supported_formats = settings.data.supported_file_types
     skipped_files, processed_jobs = [], []
 
     start_time = datetime.now()
-    user_dir = os.path.join(settings.data.documents_dir, str(current_user.id))
-    os.makedirs(user_dir, exist_ok=True)
 
     document_handler = DocumentHandler(db)
 
+    batch_max_file_bytes = settings.data.batch_max_file_mb * 1024 * 1024
+    batch_max_bytes = settings.data.batch_max_mb * 1024 * 1024
+    pending_batch = []  # (filename, file_path, document_id, size)
+
+    def enqueue_document(filename: str, file_path: str, document_id):
+        document_job = queue.enqueue(
+            process_document_task,
+            args=(file_path, current_user.id, document_id),
+            retry=Retry(max=3, interval=[10, 30, 60]),
+        )
+        document_handler.update(document_id, DocumentUpdate(job_id=document_job.id))
+        processed_jobs.append({
+            "file": filename,
+            "job_id": document_job.id,
+        })
+
+    def enqueue_batch():
+        if len(pending_batch) == 1:
+            filename, file_path, document_id, _ = pending_batch[0]
+            enqueue_document(filename, file_path, document_id)
+        elif pending_batch:
+            batch_job = queue.enqueue(
+                process_document_batch_task,
+                args=([(file_path, document_id) for _, file_path, document_id, _ in pending_batch], current_user.id),
+                retry=Retry(max=3, interval=[10, 30, 60]),
+            )
+            for filename, _, document_id, _ in pending_batch:
+                document_handler.update(document_id, DocumentUpdate(job_id=batch_job.id))
+                processed_jobs.append({
+                    "file": filename,
+                    "job_id": batch_job.id,
+                })
+        pending_batch.clear()
+
     for file in files:
         try:
             extension = file.filename.split(".")[-1].lower()
@@ -57,11 +103,8 @@ async def upload_document(
                 logger.warning(f"Skipping unsupported file: {file.filename}")
                 continue
 
-            file_path = os.path.join(user_dir, file.filename)
-
-            async with aiofiles.open(file_path, "wb") as buffer:
-                while chunk := await file.read(1024 * 1024):
-                    await buffer.write(chunk)
+            # Hash while streaming, identical files share one blob on disk
+            file_path, content_hash = await save_upload(file, extension)
 
             # Attempt to create document record
             try:
@@ -71,11 +114,13 @@ async def upload_document(
                     file_path=file_path,
                     vector_collection=str(current_user.id),
                     status="processing",
+                    content_hash=content_hash,
                 ))
             except IntegrityError as e:
                 db.rollback()  # rollback the session
                 if "unique_filename_per_user" in str(e.orig):
                     logger.warning(f"Duplicate document upload: {file.filename}")
+                    enqueue_batch()  # files accepted so far must still be processed
                     return AppResponse(
                         status="error",
                         message="A document with same name already exists for this user.",
@@ -83,24 +128,23 @@ async def upload_document(
                     )
                 raise  # re-raise other DB errors
 
-            # Enqueue background job
-            document_job = queue.enqueue(
-                process_document_task,
-                args=(file_path, current_user.id, document.id),
-                retry=Retry(max=3, interval=[10, 30, 60]),
-            )
-
-            document_handler.update(document.id, DocumentUpdate(job_id=document_job.id))
-
-            processed_jobs.append({
-                "file": file.filename,
-                "job_id": document_job.id,
-            })
+            # Enqueue background job, small files share a batch job under a size/count budget
+            file_size = os.path.getsize(file_path)
+            if file_size > batch_max_file_bytes:
+                enqueue_document(file.filename, file_path, document.id)
+            else:
+                batch_size = sum(size for *_, size in pending_batch)
+                if (len(pending_batch) >= settings.data.batch_max_files
+                        or batch_size + file_size > batch_max_bytes):
+                    enqueue_batch()
+                pending_batch.append((file.filename, file_path, document.id, file_size))
 
         except Exception as e:
             logger.error(f"Error processing {file.filename}: {e}")
             skipped_files.append(file.filename)
 
+    enqueue_batch()
+
     time_taken = (datetime.now() - start_time).total_seconds()
     return AppResponse(
         status="success",
@@ -167,6 +211,66 @@ async def update_document(
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"Document not found: {str(e)}")
 
+@document_router.put("/{document_id}", response_model=AppResponse)
+async def replace_document(
+    document_id: str,
+    file: UploadFile = File(...),
+    current_user: UserResponse = Depends(get_current_user),
+    db: Session = Depends(get_global_db_session)
+):
+    """
+    Replace the contents of an existing document.
+    Only chunks that changed are re-embedded in the background.
+    """
+    document_handler = DocumentHandler(db)
+    try:
+        document = document_handler.read(document_id)
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=f"Document not found: {str(e)}")
+    # Documents live in their owner's collection; DocumentResponse carries no user_id
+    if document.vector_collection != str(current_user.id):
+        raise HTTPException(status_code=403, detail="Not allowed to replace this document")
+
+    extension = file.filename.split(".")[-1].lower()
+    if extension != document.filename.split(".")[-1].lower():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Replacement must be a .{document.filename.split('.')[-1]} file"
+        )
+
+    file_path, content_hash = await save_upload(file, extension)
+    if content_hash == document.content_hash:
+        return AppResponse(
+            status="success",
+            message="Document content is unchanged.",
+            data={"file": document.filename, "job_id": document.job_id}
+        )
+
+    # Written before enqueueing, so a fast worker's "completed" isn't overwritten
+    document_handler.update(document.id, DocumentContentUpdate(
+        status="processing",
+        file_path=file_path,
+        content_hash=content_hash
+    ))
+
+    reindex_job = queue.enqueue(
+        reindex_document_task,
+        args=(file_path, document.vector_collection, document.id),
+        retry=Retry(max=3, interval=[10, 30, 60]),
+    )
+    document_handler.update(document.id, DocumentUpdate(job_id=reindex_job.id))
+
+    # Cached answers drew on the old content
+    answer_cache = get_answer_cache()
+    if answer_cache is not None:
+        answer_cache.invalidate_document(document.content_hash)
+
+    return AppResponse(
+        status="success",
+        message="Document replaced and queued for re-indexing.",
+        data={"file": document.filename, "job_id": reindex_job.id}
+    )
+
 @document_router.delete("/{document_id}", response_model=AppResponse)
 async def delete_document(
     document_id: str,
@@ -175,8 +279,9 @@ async def delete_document(
     """Delete document by ID."""
     try:
         document_handler = DocumentHandler(db)
-        doc_name = document_handler.read(document_id).filename
-        collection_name = document_handler.read(document_id).vector_collection
+        document = document_handler.read(document_id)
+        doc_name = document.filename
+        collection_name = document.vector_collection
 
         document_delete_job = queue.enqueue(
             delete_document_task,
@@ -185,6 +290,10 @@ async def delete_document(
         )
         document_handler.delete(document_id)
 
+        answer_cache = get_answer_cache()
+        if answer_cache is not None:
+            answer_cache.invalidate_document(document.content_hash)
+
         return AppResponse(
             status="success",
             message="Document deleted successfully",
@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+
+from app.core.metrics import get_metrics
+from app.routes import AppResponse
+
+metrics_router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@metrics_router.get("/", response_model=AppResponse)
+def read_metrics():
+    """Get cache hit rates and other pipeline counters."""
+    return AppResponse(
+        status="success",
+        message="Metrics fetched successfully",
+        data=get_metrics()
+    )
@@ -0,0 +1,163 @@
+import asyncio
+import base64
+import hashlib
+import json
+import time
+from typing import Iterable, List, Optional
+
+import numpy as np
+from loguru import logger
+
+from app.core import metrics
+from app.core.redis import redis_conn
+from app.core.settings import settings
+
+SCOPE_KEY = "askdocs:answer_cache:scope:{scope}"
+DOCUMENT_KEY = "askdocs:answer_cache:document:{content_hash}"
+LRU_KEY = "askdocs:answer_cache:lru"
+
+
+def scope_id(content_hashes: Iterable[str]) -> str:
+    """Identifies a set of documents by content, so any change to one of them changes the scope."""
+    return hashlib.sha256("\n".join(sorted(content_hashes)).encode("utf-8")).hexdigest()
+
+
+def _normalize(vector: List[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm else array
+
+
+class SemanticAnswerCache:
+    """
+    Answers to earlier questions over the same set of documents, matched by cosine
+    similarity of the dense question embeddings. Entries live in one Redis hash per
+    scope (sorted document content hashes); a sorted set tracks last use across
+    scopes to cap the total number of entries.
+    """
+
+    def __init__(self, threshold: float, ttl: int, max_entries: int):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    def lookup(self, content_hashes: List[str], vector: List[float]) -> Optional[str]:
+        """Best cached answer above the similarity threshold, if any."""
+        scope = scope_id(content_hashes)
+        try:
+            entries = redis_conn.hgetall(SCOPE_KEY.format(scope=scope))
+        except Exception as e:
+            logger.warning(f"Answer cache lookup failed: {e}")
+            return None
+
+        query = _normalize(vector)
+        now = time.time()
+        best_id, best_answer, best_score = None, None, self.threshold
+        for entry_id, raw in entries.items():
+            entry = json.loads(raw)
+            if now - entry["created"] > self.ttl:
+                continue
+            cached = np.frombuffer(base64.b64decode(entry["vector"]), dtype=np.float32)
+            score = float(np.dot(query, cached))
+            if score >= best_score:
+                best_id, best_answer, best_score = entry_id.decode(), entry["answer"], score
+
+        if best_answer is None:
+            metrics.incr("answer_cache_misses")
+            return None
+
+        metrics.incr("answer_cache_hits")
+        try:
+            redis_conn.zadd(LRU_KEY, {f"{scope}:{best_id}": now})
+        except Exception as e:
+            logger.debug(f"Could not touch answer cache entry: {e}")
+        logger.info(f"Answer cache hit with similarity {best_score:.3f}")
+        return best_answer
+
+    def put(self, content_hashes: List[str], query: str, vector: List[float], answer: str):
+        """Store an answer for the question, then evict least recently used entries over the cap."""
+        scope = scope_id(content_hashes)
+        entry_id = hashlib.sha256(query.strip().lower().encode("utf-8")).hexdigest()[:16]
+        entry = {
+            "query": query,
+            "vector": base64.b64encode(_normalize(vector).tobytes()).decode("ascii"),
+            "answer": answer,
+            "created": time.time(),
+        }
+
+        try:
+            pipe = redis_conn.pipeline()
+            pipe.hset(SCOPE_KEY.format(scope=scope), entry_id, json.dumps(entry))
+            pipe.expire(SCOPE_KEY.format(scope=scope), self.ttl)
+            pipe.zadd(LRU_KEY, {f"{scope}:{entry_id}": entry["created"]})
+            # Reverse index, so a changed document can drop every scope it is part of
+            for content_hash in content_hashes:
+                pipe.sadd(DOCUMENT_KEY.format(content_hash=content_hash), scope)
+                pipe.expire(DOCUMENT_KEY.format(content_hash=content_hash), self.ttl)
+            pipe.execute()
+            self._evict()
+        except Exception as e:
+            logger.warning(f"Answer cache write failed: {e}")
+
+    def _evict(self):
+        excess = redis_conn.zcard(LRU_KEY) - self.max_entries
+        if excess <= 0:
+            return
+        pipe = redis_conn.pipeline()
+        for member, _ in redis_conn.zpopmin(LRU_KEY, excess):
+            scope, entry_id = member.decode().rsplit(":", 1)
+            pipe.hdel(SCOPE_KEY.format(scope=scope), entry_id)
+        pipe.execute()
+
+    def invalidate_document(self, content_hash: Optional[str]):
+        """Drop every cached answer that drew on a document's content."""
+        if not content_hash:
+            return
+        try:
+            document_key = DOCUMENT_KEY.format(content_hash=content_hash)
+            scopes = [scope.decode() for scope in redis_conn.smembers(document_key)]
+            pipe = redis_conn.pipeline()
+            for scope in scopes:
+                pipe.hkeys(SCOPE_KEY.format(scope=scope))
+            entry_ids = pipe.execute()
+
+            pipe = redis_conn.pipeline()
+            for scope, ids in zip(scopes, entry_ids):
+                pipe.delete(SCOPE_KEY.format(scope=scope))
+                # Drop their LRU members too, or they count against max_entries until evicted
+                if ids:
+                    pipe.zrem(LRU_KEY, *(f"{scope}:{entry_id.decode()}" for entry_id in ids))
+            pipe.delete(document_key)
+            pipe.execute()
+            if scopes:
+                logger.info(f"Invalidated {len(scopes)} answer cache scopes of document {content_hash}")
+        except Exception as e:
+            logger.warning(f"Answer cache invalidation failed: {e}")
+
+    # Redis round trips are short, async callers run them in a thread like the DB queries
+
+    async def alookup(self, content_hashes: List[str], vector: List[float]) -> Optional[str]:
+        return await asyncio.to_thread(self.lookup, content_hashes, vector)
+
+    async def aput(self, content_hashes: List[str], query: str, vector: List[float], answer: str):
+        await asyncio.to_thread(self.put, content_hashes, query, vector, answer)
+
+
+# -----------------------------
+# ✅ Singleton instance helper
+# -----------------------------
+
+_answer_cache: Optional[SemanticAnswerCache] = None
+
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """Return the global answer cache, or None when it is disabled."""
+    global _answer_cache
+    if not settings.answer_cache.enabled:
+        return None
+    if _answer_cache is None:
+        _answer_cache = SemanticAnswerCache(
+            threshold=settings.answer_cache.similarity_threshold,
+            ttl=settings.answer_cache.ttl,
+            max_entries=settings.answer_cache.max_entries,
+        )
+    return _answer_cache
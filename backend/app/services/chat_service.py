@@ -1,171 +1,282 @@
+import asyncio
+import time
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
 from loguru import logger
 from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain.chains import create_history_aware_retriever
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.language_models import BaseChatModel
+from langchain_core.retrievers import RetrieverLike
+from langchain_core.runnables import Runnable, RunnableLambda
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from qdrant_client import models
 
+from app.core import metrics
 from app.core.db import get_global_db_session_ctx
 from app.core.llm import llm
 from app.core.settings import settings
 from app.core.qdrant import get_qdrant_client
 from app.model_handlers.chat_message_handler import ChatMessageHandler
+from app.model_handlers.chat_summary_handler import ChatSummaryHandler
 from app.model_handlers.chat_session_documents_handler import ChatSessionDocumentHandler
 from app.model_handlers.document_handler import DocumentHandler
+from app.services.answer_cache import get_answer_cache
+from app.services.context_assembly import ContextAssembler, get_context_assembler, get_token_counter
+from app.services.conversation_summary import build_chat_history
+from app.services.query_rewrite import create_rewriting_retriever
+
+
+def build_rag_chain(
+    chat_model: BaseChatModel,
+    retriever: RetrieverLike,
+    context_assembler: Optional[ContextAssembler] = None
+) -> Runnable:
+    """Question rewrite, retrieval and answer chain over the given model and retriever."""
+    # Rephrase follow-ups into standalone questions, skipping the LLM call when it isn't needed
+    history_aware_retriever = create_rewriting_retriever(chat_model, retriever)
+    if context_assembler is not None:
+        # Merge overlapping chunks and fit them into the token budget before they reach the prompt
+        history_aware_retriever = history_aware_retriever | RunnableLambda(context_assembler.assemble)
+
+    qa_prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", settings.llm.system_prompt),
+            MessagesPlaceholder("chat_history"),
+            ("human", "{input}"),
+        ]
+    )
+    question_answer_chain = create_stuff_documents_chain(chat_model, qa_prompt)
+
+    return create_retrieval_chain(history_aware_retriever, question_answer_chain)
+
+
+class ChatTurn:
+    """
+    One question against the session documents: the chain inputs and run config,
+    plus the bookkeeping of its answer (time to first token, prompt size, answer text).
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        query: str,
+        chat_history: list,
+        config: dict,
+        cache_scope: Optional[List[str]],
+        count_tokens: Callable[[str], int],
+        start: float,
+    ):
+        self.session_id = session_id
+        self.query = query
+        self.chat_history = chat_history
+        self.config = config
+        self.cache_scope = cache_scope
+        self.count_tokens = count_tokens
+        self.start = start
+        self.query_vector: Optional[List[float]] = None
+        self.answer = ""
+
+    @property
+    def inputs(self) -> dict:
+        return {"chat_history": self.chat_history, "input": self.query}
+
+    @property
+    def cacheable(self) -> bool:
+        return self.cache_scope is not None and bool(self.answer)
+
+    def first_token(self) -> Dict[str, float]:
+        """Log time from the start of a streamed answer to its first token."""
+        ttft = time.perf_counter() - self.start
+        logger.info(f"Session {self.session_id} time to first token: {ttft:.3f}s")
+        return {"chat_ttft_seconds": ttft, "chat_streams": 1}
+
+    def prompt_tokens(self, context: list) -> Dict[str, float]:
+        """Log the size of the answer prompt: instructions, history, question and context."""
+        tokens = (
+            self.count_tokens(settings.llm.system_prompt)
+            + sum(self.count_tokens(message.content) for message in self.chat_history)
+            + self.count_tokens(self.query)
+            + sum(self.count_tokens(doc.page_content) for doc in context)
+        )
+        logger.info(f"Session {self.session_id} prompt tokens: {tokens}")
+        return {"chat_prompt_tokens": tokens}
+
+    def feed(self, chunk: dict) -> Tuple[str, Dict[str, float]]:
+        """Answer text of a streamed chain chunk, and the counters it completes."""
+        counters = {}
+        if "context" in chunk:
+            counters.update(self.prompt_tokens(chunk["context"]))
+        text = chunk.get("answer") or ""
+        if text:
+            if not self.answer:
+                counters.update(self.first_token())
+            self.answer += text
+        return text, counters
+
 
 class Chat:
-    def __init__(self):
-        self.chat_model = llm
+    """
+    Chat over the documents of a session. The RAG chain is built once; each request
+    only binds the user's collection, documents and k through the run config.
+    """
+
+    def __init__(self, chat_model: Optional[BaseChatModel] = None):
+        self.chat_model = chat_model or llm
         self.qdrant = get_qdrant_client()
+        self.answer_cache = get_answer_cache()
+        # Hybrid search over the session documents, fused server side in one request
+        self.rag_chain = build_rag_chain(
+            self.chat_model, self.qdrant.configurable_retriever(), get_context_assembler()
+        )
+        self.count_tokens = get_token_counter()
 
-    def get_document_names(self, session_id: str) -> list:
+    def get_documents(self, session_id: str) -> list:
         with get_global_db_session_ctx() as db:
             chat_session_document_handler = ChatSessionDocumentHandler(db)
             documents = chat_session_document_handler.get_by_session(session_id)
             doc_ids = [doc.document_id for doc in documents]
 
-            document_names = []
             document_handler = DocumentHandler(db)
-            for doc_id in doc_ids:
-                doc = document_handler.read(doc_id)
-                document_names.append(doc.filename)
-            return document_names
+            return [document_handler.read(doc_id) for doc_id in doc_ids]
 
-    def get_chat_history(self, session_id: str) -> list:
-        chat_history = []
-        with get_global_db_session_ctx() as db:
-            chat_message_handler = ChatMessageHandler(db)
-            messages = chat_message_handler.get_by_session(session_id)
-
-            for message in messages:
-                chat_history.append(HumanMessage(content=message.query))
-                chat_history.append(AIMessage(content=message.response))
-            return chat_history
-
-    def get_chat_response(self, user_id: str, session_id: str, query: str) -> str:
-        """Get chat response based on question and chat history."""
-
-        # Load chat history or initialize if not present
-        chat_history = self.get_chat_history(session_id)
+    def get_document_names(self, session_id: str) -> list:
+        return [doc.filename for doc in self.get_documents(session_id)]
 
-        document_names = self.get_document_names(session_id)
+    def _cache_scope(self, chat_history: list, documents: list) -> Optional[List[str]]:
+        """
+        Content hashes the answer cache is scoped to, or None when the answer can't be cached.
+        The cache is shared across users, so only answers built from the question and the
+        documents alone qualify: any history (earlier turns, the session summary) may shape
+        the answer. Documents still indexing may change.
+        """
+        if self.answer_cache is None or chat_history:
+            return None
+        if any(doc.status != "completed" for doc in documents):
+            return None
+        return [doc.content_hash or str(doc.id) for doc in documents]
 
-        if len(document_names) == 0:
+    def _chain_config(self, user_id: str, documents: list) -> dict:
+        if len(documents) == 0:
             raise ValueError("No documents found for session")
-
-        vector_store = self.qdrant._get_vector_store(collection_name=user_id)
-
-        # Build filter for a list of documents (sources)
-        filter_condition = models.Filter(
-            must=[
-                models.FieldCondition(
-                    key="metadata.source",
-                    match=models.MatchAny(any=document_names)
-                )
-            ]
-        )
-
-        retriever = vector_store.as_retriever(
-            search_kwargs={
+        return {
+            "configurable": {
+                "collection_name": user_id,
+                "documents": [doc.filename for doc in documents],
                 "k": settings.qdrant.search_limit,
-                "filter": filter_condition,
             }
+        }
+
+    def get_chat_history(self, session_id: str) -> list:
+        """Rolling summary of the session plus its latest turns, within chat_history.max_tokens."""
+        with get_global_db_session_ctx() as db:
+            summary = ChatSummaryHandler(db).get_by_session(session_id)
+            messages = ChatMessageHandler(db).get_by_session(session_id, limit=settings.chat_history.recent_turns)
+        return build_chat_history(
+            summary.summary if summary else None, messages, settings.chat_history.max_tokens
         )
-        # retriever = vector_store.as_retriever(search_kwargs={"k": settings.qdrant.search_limit})
-        
-        contextualize_q_prompt  = ChatPromptTemplate.from_messages(
-            [
-                ("system", settings.llm.retriever_prompt),
-                MessagesPlaceholder(variable_name="chat_history"),
-                ("human", "{input}"),
-            ]
+
+    def _start_turn(
+        self, user_id: str, session_id: str, query: str, chat_history: list, documents: list, start: float
+    ) -> ChatTurn:
+        return ChatTurn(
+            session_id=session_id,
+            query=query,
+            chat_history=chat_history,
+            config=self._chain_config(user_id, documents),
+            cache_scope=self._cache_scope(chat_history, documents),
+            count_tokens=self.count_tokens,
+            start=start,
         )
-        
-        history_aware_retriever = create_history_aware_retriever(
-            self.chat_model,
-            retriever,
-            contextualize_q_prompt
+
+    def _prepare_turn(self, user_id: str, session_id: str, query: str) -> ChatTurn:
+        start = time.perf_counter()
+        return self._start_turn(
+            user_id, session_id, query, self.get_chat_history(session_id), self.get_documents(session_id), start
         )
 
-        qa_prompt = ChatPromptTemplate.from_messages(
-            [
-                ("system", settings.llm.system_prompt),
-                MessagesPlaceholder("chat_history"),
-                ("human", "{input}"),
-            ]
+    async def _aprepare_turn(self, user_id: str, session_id: str, query: str) -> ChatTurn:
+        start = time.perf_counter()
+        # The database driver is synchronous, keep its queries off the event loop
+        chat_history, documents = await asyncio.gather(
+            asyncio.to_thread(self.get_chat_history, session_id),
+            asyncio.to_thread(self.get_documents, session_id),
         )
+        return self._start_turn(user_id, session_id, query, chat_history, documents, start)
 
-        question_answer_chain = create_stuff_documents_chain(self.chat_model, qa_prompt)
-        
-        rag_chain = create_retrieval_chain(history_aware_retriever, question_answer_chain)
+    def _cached_answer(self, turn: ChatTurn) -> Optional[str]:
+        """Cached answer for the turn; standalone questions over the same documents can reuse one."""
+        if turn.cache_scope is None:
+            return None
+        turn.query_vector = self.qdrant.embed_dense_query(turn.query)
+        return self.answer_cache.lookup(turn.cache_scope, turn.query_vector)
 
-        response = rag_chain.invoke({
-            "chat_history": chat_history,
-            "input": query
-        })
+    async def _acached_answer(self, turn: ChatTurn) -> Optional[str]:
+        if turn.cache_scope is None:
+            return None
+        turn.query_vector = await self.qdrant.aembed_dense_query(turn.query)
+        return await self.answer_cache.alookup(turn.cache_scope, turn.query_vector)
 
-        return response["answer"]
+    def get_chat_response(self, user_id: str, session_id: str, query: str) -> str:
+        """Get chat response based on question and chat history."""
+        turn = self._prepare_turn(user_id, session_id, query)
+        cached_answer = self._cached_answer(turn)
+        if cached_answer is not None:
+            return cached_answer
+
+        response = self.rag_chain.invoke(turn.inputs, config=turn.config)
+        metrics.incr_many(turn.prompt_tokens(response["context"]))
+        turn.answer = response["answer"]
+
+        if turn.cacheable:
+            self.answer_cache.put(turn.cache_scope, turn.query, turn.query_vector, turn.answer)
+        return turn.answer
 
-    def stream_chat_response(self, user_id: str, session_id: str, query: str):
+    def stream_chat_response(self, user_id: str, session_id: str, query: str) -> Iterator[str]:
         """Stream chat response based on question and chat history."""
+        turn = self._prepare_turn(user_id, session_id, query)
+        cached_answer = self._cached_answer(turn)
+        if cached_answer is not None:
+            metrics.incr_many(turn.first_token())
+            yield cached_answer
+            return
 
-        # Load chat history or initialize if not present
-        chat_history = self.get_chat_history(session_id)
+        for chunk in self.rag_chain.stream(turn.inputs, config=turn.config):
+            text, counters = turn.feed(chunk)
+            metrics.incr_many(counters)
+            if text:
+                yield text
 
-        document_names = self.get_document_names(session_id)
+        if turn.cacheable:
+            self.answer_cache.put(turn.cache_scope, turn.query, turn.query_vector, turn.answer)
 
-        if len(document_names) == 0:
-            raise ValueError("No documents found for session")
+    async def astream_chat_response(self, user_id: str, session_id: str, query: str) -> AsyncIterator[str]:
+        """Stream chat response without blocking the event loop."""
+        turn = await self._aprepare_turn(user_id, session_id, query)
+        cached_answer = await self._acached_answer(turn)
+        if cached_answer is not None:
+            await metrics.aincr_many(turn.first_token())
+            yield cached_answer
+            return
 
-        vector_store = self.qdrant._get_vector_store(collection_name=user_id)
+        async for chunk in self.rag_chain.astream(turn.inputs, config=turn.config):
+            text, counters = turn.feed(chunk)
+            await metrics.aincr_many(counters)
+            if text:
+                yield text
 
-        # Build filter for a list of documents (sources)
-        filter_condition = models.Filter(
-            must=[
-                models.FieldCondition(
-                    key="metadata.source",
-                    match=models.MatchAny(any=document_names)
-                )
-            ]
-        )
+        if turn.cacheable:
+            await self.answer_cache.aput(turn.cache_scope, turn.query, turn.query_vector, turn.answer)
 
-        retriever = vector_store.as_retriever(
-            search_kwargs={
-                "k": settings.qdrant.search_limit,
-                "filter": filter_condition,
-            }
-        )
-        
-        contextualize_q_prompt  = ChatPromptTemplate.from_messages(
-            [
-                ("system", settings.llm.retriever_prompt),
-                MessagesPlaceholder(variable_name="chat_history"),
-                ("human", "{input}"),
-            ]
-        )
-        
-        history_aware_retriever = create_history_aware_retriever(
-            self.chat_model,
-            retriever,
-            contextualize_q_prompt
-        )
 
-        qa_prompt = ChatPromptTemplate.from_messages(
-            [
-                ("system", settings.llm.system_prompt),
-                MessagesPlaceholder("chat_history"),
-                ("human", "{input}"),
-            ]
-        )
+# -----------------------------
+# ✅ Singleton instance helper
+# -----------------------------
 
-        question_answer_chain = create_stuff_documents_chain(self.chat_model, qa_prompt)
-        
-        rag_chain = create_retrieval_chain(history_aware_retriever, question_answer_chain)
+_chat: Optional[Chat] = None
 
-        for chunk in rag_chain.stream({
-            "chat_history": chat_history,
-            "input": query
-        }):
-            if "answer" in chunk:
-                yield chunk["answer"]
+def get_chat_service() -> Chat:
+    """Return the global chat service, so the chain is compiled once per process."""
+    global _chat
+    if _chat is None:
+        _chat = Chat()
+        logger.info("Initialized global chat service")
+    return _chat
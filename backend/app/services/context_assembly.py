@@ -0,0 +1,182 @@
+import re
+from typing import Callable, List, Optional
+
+from langchain_core.documents import Document
+from loguru import logger
+
+from app.core import metrics
+from app.core.settings import settings
+
+# Overlaps shorter than this are coincidental (a shared word or two), not splitter overlap
+MIN_OVERLAP_CHARS = 20
+# A truncated block shorter than this isn't worth its place in the prompt
+MIN_BLOCK_TOKENS = 50
+
+
+def create_token_counter(model_provider: str, model: str, chars_per_token: float = 4.0) -> Callable[[str], int]:
+    """
+    Token counter for the configured chat model: tiktoken for OpenAI models, a
+    characters-per-token estimate otherwise (counting Gemini tokens is an API call).
+    """
+    if model_provider == "openai":
+        try:
+            import tiktoken
+
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding("o200k_base")
+            return lambda text: len(encoding.encode(text, disallowed_special=()))
+        except ImportError:
+            logger.warning("tiktoken is not installed, estimating prompt tokens from characters")
+    return lambda text: int(len(text) / chars_per_token) + 1
+
+
+def merge_overlapping(first: str, second: str, max_overlap: int) -> str:
+    """Join two consecutive chunks, keeping the text they share only once."""
+    for size in range(min(max_overlap, len(first), len(second)), MIN_OVERLAP_CHARS - 1, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return f"{first}\n{second}"
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = re.findall(r"\w+", text.lower())
+    return {" ".join(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))}
+
+
+class ContextAssembler:
+    """
+    Turns retrieved chunks into the prompt context: consecutive chunks of the same
+    page are merged into one block without their splitter overlap, near-duplicate
+    blocks are dropped, and blocks are added in rank order up to a token budget.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        duplicate_threshold: float,
+        max_overlap: int,
+        count_tokens: Callable[[str], int],
+    ):
+        self.max_tokens = max_tokens
+        self.duplicate_threshold = duplicate_threshold
+        self.max_overlap = max_overlap
+        self.count_tokens = count_tokens
+
+    def _merge(self, documents: List[Document]) -> List[Document]:
+        """Blocks of consecutive chunks per (source, page), ordered by their best ranked chunk."""
+        pages = {}
+        for rank, document in enumerate(documents):
+            key = (document.metadata.get("source"), document.metadata.get("page_number"))
+            pages.setdefault(key, []).append((document.metadata.get("chunk_index"), rank, document))
+
+        blocks = []
+        for hits in pages.values():
+            hits.sort(key=lambda hit: (hit[0] is None, hit[0] or 0))
+            current = None
+            for chunk_index, rank, document in hits:
+                if current is not None and chunk_index is not None and chunk_index == current["last"] + 1:
+                    current["text"] = merge_overlapping(current["text"], document.page_content, self.max_overlap)
+                    current["chunks"].append(chunk_index)
+                    current["last"], current["rank"] = chunk_index, min(current["rank"], rank)
+                    continue
+                if current is not None and chunk_index is not None and chunk_index == current["last"]:
+                    # The same chunk twice, e.g. from copies of a document
+                    current["rank"] = min(current["rank"], rank)
+                    continue
+                current = {
+                    "text": document.page_content,
+                    "metadata": document.metadata,
+                    "chunks": [chunk_index],
+                    "last": chunk_index if chunk_index is not None else -2,
+                    "rank": rank,
+                }
+                blocks.append(current)
+
+        blocks.sort(key=lambda block: block["rank"])
+        return [
+            Document(page_content=block["text"], metadata={**block["metadata"], "chunk_indexes": block["chunks"]})
+            for block in blocks
+        ]
+
+    def _drop_duplicates(self, blocks: List[Document]) -> List[Document]:
+        kept, kept_shingles = [], []
+        for block in blocks:
+            shingles = _shingles(block.page_content)
+            duplicate = any(
+                len(shingles & other) / len(shingles | other) >= self.duplicate_threshold
+                or shingles <= other
+                for other in kept_shingles
+            )
+            if not duplicate:
+                kept.append(block)
+                kept_shingles.append(shingles)
+        return kept
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        """Cut text to roughly max_tokens at a word boundary."""
+        tokens = self.count_tokens(text)
+        cut = text[:int(len(text) * max_tokens / tokens)]
+        return cut.rsplit(" ", 1)[0] if " " in cut else cut
+
+    def assemble(self, documents: List[Document]) -> List[Document]:
+        """Prompt context for the retrieved chunks, in rank order and within the token budget."""
+        if not documents:
+            return documents
+        raw_tokens = sum(self.count_tokens(document.page_content) for document in documents)
+
+        context, used = [], 0
+        for block in self._drop_duplicates(self._merge(documents)):
+            tokens = self.count_tokens(block.page_content)
+            if used + tokens > self.max_tokens:
+                # Fill what is left of the budget with the start of the next block
+                remaining = self.max_tokens - used
+                if remaining >= MIN_BLOCK_TOKENS:
+                    block.page_content = self._truncate(block.page_content, remaining)
+                    context.append(block)
+                    used += self.count_tokens(block.page_content)
+                break
+            context.append(block)
+            used += tokens
+
+        logger.info(
+            f"Context: {len(documents)} chunks -> {len(context)} blocks, "
+            f"{used} tokens ({raw_tokens - used} saved)"
+        )
+        metrics.incr("chat_context_tokens", used)
+        metrics.incr("chat_context_tokens_saved", max(raw_tokens - used, 0))
+        return context
+
+
+# -----------------------------
+# ✅ Singleton instance helper
+# -----------------------------
+
+_context_assembler: Optional[ContextAssembler] = None
+
+def get_context_assembler() -> Optional[ContextAssembler]:
+    """Return the global context assembler, or None when chunks go into the prompt as retrieved."""
+    global _context_assembler
+    if not settings.context.enabled:
+        return None
+    if _context_assembler is None:
+        _context_assembler = ContextAssembler(
+            max_tokens=settings.context.max_tokens,
+            duplicate_threshold=settings.context.duplicate_threshold,
+            max_overlap=settings.data.chunk_overlap,
+            count_tokens=get_token_counter(),
+        )
+    return _context_assembler
+
+
+_token_counter: Optional[Callable[[str], int]] = None
+
+def get_token_counter() -> Callable[[str], int]:
+    """Token counter for the configured chat model."""
+    global _token_counter
+    if _token_counter is None:
+        _token_counter = create_token_counter(
+            settings.llm.model_provider, settings.llm.model, settings.context.chars_per_token
+        )
+    return _token_counter
@@ -0,0 +1,148 @@
+from typing import List, Optional, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from loguru import logger
+
+from app.core import metrics
+from app.core.db import get_global_db_session_ctx
+from app.core.llm import llm
+from app.core.redis import redis_conn
+from app.core.settings import settings
+from app.model_handlers.chat_message_handler import ChatMessageHandler, ChatMessageResponse
+from app.model_handlers.chat_summary_handler import ChatSummaryCreate, ChatSummaryHandler
+from app.services.context_assembly import get_token_counter
+
+SUMMARY_LOCK_KEY = "askdocs:chat_summary:lock:{session_id}"
+
+# How the summary enters the chat history: as an earlier exchange, since not every
+# provider accepts a system message after the first one
+SUMMARY_REQUEST = "Summarize our conversation so far."
+
+
+def _format_turns(messages: List[ChatMessageResponse]) -> str:
+    return "\n\n".join(f"User: {message.query}\nAssistant: {message.response}" for message in messages)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to roughly max_tokens at a word boundary."""
+    tokens = get_token_counter()(text)
+    if tokens <= max_tokens:
+        return text
+    cut = text[:int(len(text) * max_tokens / tokens)]
+    return cut.rsplit(" ", 1)[0] if " " in cut else cut
+
+
+def _fit_turn(human: HumanMessage, ai: AIMessage, budget: int) -> Optional[Tuple[HumanMessage, AIMessage]]:
+    """Cut a turn down to budget tokens: the answer first, then the question; None if nothing fits."""
+    count_tokens = get_token_counter()
+    question_tokens = count_tokens(human.content)
+    if question_tokens < budget:
+        return human, AIMessage(content=truncate_to_tokens(ai.content, budget - question_tokens))
+    question = truncate_to_tokens(human.content, budget) if budget > 0 else ""
+    return (HumanMessage(content=question), AIMessage(content="")) if question else None
+
+
+def build_chat_history(
+    summary: Optional[str], messages: List[ChatMessageResponse], max_tokens: int
+) -> List[BaseMessage]:
+    """
+    Prompt history: the rolling summary, then the most recent turns verbatim.
+    The oldest turns are dropped until everything fits into max_tokens; a latest
+    turn too long on its own is cut down instead.
+    """
+    count_tokens = get_token_counter()
+    turns = [
+        (HumanMessage(content=message.query), AIMessage(content=message.response or ""))
+        for message in messages
+    ]
+
+    budget = max_tokens
+    summary_messages = []
+    if summary:
+        summary_messages = [HumanMessage(content=SUMMARY_REQUEST), AIMessage(content=summary)]
+        budget -= count_tokens(SUMMARY_REQUEST) + count_tokens(summary)
+
+    kept = []
+    for human, ai in reversed(turns):
+        tokens = count_tokens(human.content) + count_tokens(ai.content)
+        if tokens > budget:
+            if not kept:
+                fitted = _fit_turn(human, ai, budget)
+                if fitted is not None:
+                    kept.append(fitted)
+            break
+        kept.append((human, ai))
+        budget -= tokens
+    kept.reverse()
+
+    return summary_messages + [message for turn in kept for message in turn]
+
+
+class ConversationSummarizer:
+    """Folds the turns that left the prompt's recent window into a per-session rolling summary."""
+
+    def __init__(self, chat_model: BaseChatModel):
+        prompt = ChatPromptTemplate.from_messages(
+            [
+                ("system", settings.llm.summary_prompt),
+                ("human", "Current summary:\n{summary}\n\nNew exchanges:\n{turns}"),
+            ]
+        )
+        self.chain = prompt | chat_model | StrOutputParser()
+
+    def summarize(self, session_id: str) -> bool:
+        """Update the session summary with unsummarized turns; False if there was nothing to fold."""
+        # Jobs of one session run one at a time, each picks up where the previous stopped
+        with redis_conn.lock(SUMMARY_LOCK_KEY.format(session_id=session_id), timeout=300, blocking_timeout=300):
+            with get_global_db_session_ctx() as db:
+                summary = ChatSummaryHandler(db).get_by_session(session_id)
+                messages = ChatMessageHandler(db).get_unsummarized(
+                    session_id,
+                    summary.summarized_until if summary else None,
+                    keep_recent=settings.chat_history.recent_turns,
+                )
+            if not messages:
+                return False
+
+            text = summary.summary if summary else ""
+            count = summary.message_count if summary else 0
+            batch_size = settings.chat_history.summarize_batch
+            for start in range(0, len(messages), batch_size):
+                batch = messages[start:start + batch_size]
+                text = self.chain.invoke({
+                    "summary": text or "(none)",
+                    "turns": _format_turns(batch),
+                    "max_words": int(settings.chat_history.summary_max_tokens * 0.75),
+                }).strip()
+                text = truncate_to_tokens(text, settings.chat_history.summary_max_tokens)
+                count += len(batch)
+
+                # Saved per batch, so a failed job keeps what it already folded
+                with get_global_db_session_ctx() as db:
+                    ChatSummaryHandler(db).upsert(ChatSummaryCreate(
+                        session_id=session_id,
+                        summary=text,
+                        summarized_until=batch[-1].created_at,
+                        message_count=count,
+                    ))
+
+        metrics.incr("chat_summaries")
+        logger.info(f"Session {session_id} summary now covers {count} messages")
+        return True
+
+
+# -----------------------------
+# ✅ Singleton instance helper
+# -----------------------------
+
+_summarizer: Optional[ConversationSummarizer] = None
+
+def get_conversation_summarizer() -> ConversationSummarizer:
+    """Return the global summarizer over the configured chat model."""
+    global _summarizer
+    if _summarizer is None:
+        _summarizer = ConversationSummarizer(llm)
+    return _summarizer
@@ -1,56 +1,255 @@
 from pathlib import Path
-from typing import List, Union
+from typing import Dict, Iterator, List, Optional, Union
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import deque
+import multiprocessing
+import math
+import os
 import io
 from langchain_core.documents import Document
 from loguru import logger
 import fitz  # PyMuPDF
 import docx2txt
 from pptx import Presentation
-from PIL import Image
-import pytesseract
+from PIL import Image, ImageStat
+
+from app.core.ocr_cache import OcrCache
+from app.services.ocr import OcrBackend, create_ocr_backend
+
+# Loader of a PDF worker process, built once so its OCR engine and cache connection
+# are reused by every page range the process handles
+_worker_loader: Optional["UniversalDocumentLoader"] = None
+
+
+def _init_pdf_worker(loader_kwargs: dict):
+    global _worker_loader
+    _worker_loader = UniversalDocumentLoader(**loader_kwargs)
+
+
+def _load_pdf_page_range(file_path: str, start: int, end: int, ocr_plan: Dict[int, dict]) -> List[Document]:
+    """Extract pages [start, end) of a PDF inside a worker process."""
+    # Each worker opens its own handle, fitz documents can't be shared across processes
+    with fitz.open(file_path) as doc:
+        return _worker_loader._load_pdf_pages(doc, Path(file_path), range(start, end), ocr_plan)
+
 
 class UniversalDocumentLoader:
-    def __init__(self, min_text_len=20):
+    def __init__(
+        self,
+        min_text_len=20,
+        pdf_workers=1,
+        pdf_pages_per_task=8,
+        ocr_lang="eng",
+        ocr_config="",
+        ocr_backend="pytesseract",
+        ocr_pool_size=0,
+        ocr_cache: Optional[OcrCache] = None,
+        ocr_min_image_area=4096,
+        ocr_uniform_stddev=4.0,
+        ocr_scanned_page_coverage=0.6,
+        ocr_render_dpi=200,
+    ):
         self.min_text_len = min_text_len
+        # 0 means "use every core"
+        self.pdf_workers = pdf_workers or os.cpu_count() or 1
+        self.pdf_pages_per_task = max(1, pdf_pages_per_task)
+        self.ocr_lang = ocr_lang
+        self.ocr_config = ocr_config
+        self.ocr_backend_name = ocr_backend
+        self.ocr_pool_size = ocr_pool_size
+        self.ocr_cache = ocr_cache
+        self.ocr_min_image_area = ocr_min_image_area
+        self.ocr_uniform_stddev = ocr_uniform_stddev
+        self.ocr_scanned_page_coverage = ocr_scanned_page_coverage
+        self.ocr_render_dpi = ocr_render_dpi
+
+    def _worker_kwargs(self) -> dict:
+        """Settings a PDF worker process needs to rebuild this loader."""
+        return {
+            "min_text_len": self.min_text_len,
+            "ocr_lang": self.ocr_lang,
+            "ocr_config": self.ocr_config,
+            "ocr_backend": self.ocr_backend_name,
+            # PDF workers already run one per core, a single engine each avoids oversubscription
+            "ocr_pool_size": 1,
+            "ocr_cache": self.ocr_cache,
+            "ocr_uniform_stddev": self.ocr_uniform_stddev,
+            "ocr_render_dpi": self.ocr_render_dpi,
+        }
+
+    @property
+    def ocr(self) -> OcrBackend:
+        """OCR engine, created on first use so idle loaders and workers don't start one."""
+        if getattr(self, "_ocr", None) is None:
+            self._ocr = create_ocr_backend(
+                self.ocr_backend_name, self.ocr_lang, self.ocr_config, self.ocr_pool_size
+            )
+        return self._ocr
+
+    def _process_images(self, images: List[bytes]) -> List[str]:
+        """OCR several images, in parallel when the backend has more than one engine."""
+        if len(images) <= 1 or self.ocr.concurrency <= 1:
+            return [self._process_image(image_bytes) for image_bytes in images]
+
+        if getattr(self, "_ocr_executor", None) is None:
+            self._ocr_executor = ThreadPoolExecutor(max_workers=self.ocr.concurrency)
+        return list(self._ocr_executor.map(self._process_image, images))
 
     def _process_image(self, image_bytes: bytes) -> str:
         """Extract text from image using OCR."""
         try:
+            cache_key = None
+            if self.ocr_cache is not None:
+                cache_key = OcrCache.make_key(image_bytes, self.ocr.name, self.ocr_lang, self.ocr_config)
+                cached_text = self.ocr_cache.get(cache_key)
+                if cached_text is not None:
+                    return cached_text
+
             image = Image.open(io.BytesIO(image_bytes))
-            text = pytesseract.image_to_string(image)
-            return text.strip()
+            if self._is_near_uniform(image):
+                # Backgrounds, rules and spacer bitmaps: nothing for tesseract to read
+                text = ""
+            else:
+                text = self.ocr.image_to_string(image).strip()
+
+            # Empty results are cached too, most repeated images are logos with no text
+            if cache_key is not None:
+                self.ocr_cache.put(cache_key, text)
+            return text
         except Exception as e:
             logger.error(f"Error processing image with OCR: {e}")
             return ""
 
+    def _is_near_uniform(self, image: Image.Image) -> bool:
+        """True when the image is (almost) a single flat colour."""
+        preview = image.convert("L")
+        preview.thumbnail((64, 64))
+        return ImageStat.Stat(preview).stddev[0] < self.ocr_uniform_stddev
+
     def load(self, input_path: Union[str, Path]) -> List[Document]:
+        return list(self.iter_load(input_path))
+
+    def iter_load(self, input_path: Union[str, Path], start_page: int = 0) -> Iterator[Document]:
+        """
+        Yield documents page by page instead of materializing the whole file.
+        Pages up to start_page (1-based, inclusive) are skipped, for resuming a job.
+        """
         path = Path(input_path)
         files = [path] if path.is_file() else list(path.rglob("*.*"))
-        all_docs = []
 
         for file in files:
             try:
                 ext = file.suffix.lower()
                 if ext == ".pdf":
-                    all_docs.extend(self._load_pdf(file))
+                    yield from self._load_pdf(file, start_page)
                 elif ext in [".jpg", ".jpeg", ".png"]:
-                    all_docs.extend(self._load_image(file))
+                    yield from self._load_image(file)
                 elif ext == ".docx":
-                    all_docs.extend(self._load_docx(file))
+                    yield from self._load_docx(file)
                 elif ext == ".pptx":
-                    all_docs.extend(self._load_pptx(file))
+                    yield from self._load_pptx(file, start_page)
             except Exception as e:
                 logger.error(f"Error loading file {file}: {e}")
 
-        return all_docs
+    def _plan_pdf_ocr(self, doc, file: Path, start_page: int = 0) -> Dict[int, dict]:
+        """
+        Decide up front what to OCR on every page, so work is planned across the whole PDF:
+        each image xref is OCRed once (headers, watermarks and backgrounds repeat on
+        every page), tiny images are skipped, and pages that are really scans get
+        one full-page OCR instead of one per image.
+        On resume the pages before start_page are still walked, so images they
+        already OCRed aren't planned again, but only later pages get plan entries.
+        """
+        plan = {}
+        seen_xrefs = set()
+        skipped = duplicates = scanned = 0
 
-    def _load_pdf(self, file: Path) -> List[Document]:
+        for i in range(len(doc)):
+            page = doc.load_page(i)
+            image_list = page.get_images(full=True)
+
+            page_area = abs(page.rect) or 1
+            image_area = sum(
+                abs(rect & page.rect)
+                for img in image_list
+                for rect in page.get_image_rects(img[0])
+            )
+            if (image_list
+                    and len(page.get_text().strip()) < self.min_text_len
+                    and image_area / page_area >= self.ocr_scanned_page_coverage):
+                if i >= start_page:
+                    plan[i] = {"full_page": True, "images": []}
+                    scanned += 1
+                continue
+
+            images = []
+            for img_index, img in enumerate(image_list):
+                xref, width, height = img[0], img[2], img[3]
+                if width * height < self.ocr_min_image_area:
+                    skipped += 1
+                elif xref in seen_xrefs:
+                    duplicates += 1
+                else:
+                    seen_xrefs.add(xref)
+                    images.append((img_index, xref))
+            if i >= start_page:
+                plan[i] = {"full_page": False, "images": images}
+
+        logger.info(
+            f"OCR plan for {file}: {len(seen_xrefs)} unique images, {duplicates} repeated and "
+            f"{skipped} tiny images skipped, {scanned} scanned pages"
+        )
+        return plan
+
+    def _load_pdf(self, file: Path, start_page: int = 0) -> Iterator[Document]:
         doc = fitz.open(str(file))
+        page_count = len(doc)
+        ocr_plan = self._plan_pdf_ocr(doc, file, start_page)
+        workers = min(self.pdf_workers, math.ceil((page_count - start_page) / self.pdf_pages_per_task))
+
+        if workers <= 1:
+            with doc:
+                for i in range(start_page, page_count):
+                    yield from self._load_pdf_pages(doc, file, range(i, i + 1), ocr_plan)
+            return
+
+        doc.close()
+        yield from self._load_pdf_parallel(file, page_count, workers, ocr_plan, start_page)
+
+    def _load_pdf_parallel(
+        self, file: Path, page_count: int, workers: int, ocr_plan: Dict[int, dict], start_page: int = 0
+    ) -> Iterator[Document]:
+        """Split the page range across a process pool and yield results in page order."""
+        logger.info(f"Extracting pages {start_page + 1}-{page_count} of {file} with {workers} workers")
+
+        # spawn, not fork: the parent may already hold torch / tokenizer thread pools
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_pdf_worker,
+            initargs=(self._worker_kwargs(),),
+        ) as executor:
+            # Keep a bounded window of page ranges in flight so memory doesn't grow with the PDF
+            pending = deque()
+            for start in range(start_page, page_count, self.pdf_pages_per_task):
+                end = min(start + self.pdf_pages_per_task, page_count)
+                range_plan = {i: ocr_plan[i] for i in range(start, end) if i in ocr_plan}
+                pending.append(executor.submit(
+                    _load_pdf_page_range, str(file), start, end, range_plan
+                ))
+                if len(pending) >= workers * 2:
+                    yield from pending.popleft().result()
+
+            while pending:
+                yield from pending.popleft().result()
+
+    def _load_pdf_pages(self, doc, file: Path, page_numbers: range, ocr_plan: Dict[int, dict]) -> List[Document]:
         documents = []
 
-        for i in range(len(doc)):
+        for i in page_numbers:
             page = doc.load_page(i)
             text = page.get_text().strip()
+            page_plan = ocr_plan.get(i, {"full_page": False, "images": []})
 
             # If text is sufficient, use it
             if len(text) >= self.min_text_len:
@@ -63,33 +262,49 @@ class UniversalDocumentLoader:
                         "file_type": "pdf"
                     }
                 ))
-            
-            # Check for images on the page
-            image_list = page.get_images(full=True)
-            if image_list:
-                logger.info(f"Found {len(image_list)} images on page {i+1} of {file}")
-                for img_index, img in enumerate(image_list):
-                    try:
-                        xref = img[0]
-                        base_image = doc.extract_image(xref)
-                        image_bytes = base_image["image"]
-                        
-                        # Extract text from image with OCR
-                        ocr_text = self._process_image(image_bytes)
-                        
-                        if ocr_text:
-                            documents.append(Document(
-                                page_content=f"[Image OCR]: {ocr_text}",
-                                metadata={
-                                    "source": str(file.name),
-                                    "page_number": i + 1,
-                                    "content_category": "image",
-                                    "file_type": "pdf",
-                                    "image_index": img_index
-                                }
-                            ))
-                    except Exception as e:
-                        logger.error(f"Error extracting image {img_index} from PDF page {i+1}: {e}")
+
+            # Scanned page: render it once and OCR the whole thing
+            if page_plan["full_page"]:
+                try:
+                    image_bytes = page.get_pixmap(dpi=self.ocr_render_dpi).tobytes("png")
+                    ocr_text = self._process_image(image_bytes)
+                    if ocr_text:
+                        documents.append(Document(
+                            page_content=f"[Page OCR]: {ocr_text}",
+                            metadata={
+                                "source": str(file.name),
+                                "page_number": i + 1,
+                                "content_category": "image",
+                                "file_type": "pdf"
+                            }
+                        ))
+                except Exception as e:
+                    logger.error(f"Error rendering PDF page {i+1} for OCR: {e}")
+                continue
+
+            # Extract the images the plan kept for this page
+            images = []
+            for img_index, xref in page_plan["images"]:
+                try:
+                    base_image = doc.extract_image(xref)
+                    images.append((img_index, base_image["image"]))
+                except Exception as e:
+                    logger.error(f"Error extracting image {img_index} from PDF page {i+1}: {e}")
+
+            # Extract text from images with OCR
+            ocr_texts = self._process_images([image_bytes for _, image_bytes in images])
+            for (img_index, _), ocr_text in zip(images, ocr_texts):
+                if ocr_text:
+                    documents.append(Document(
+                        page_content=f"[Image OCR]: {ocr_text}",
+                        metadata={
+                            "source": str(file.name),
+                            "page_number": i + 1,
+                            "content_category": "image",
+                            "file_type": "pdf",
+                            "image_index": img_index
+                        }
+                    ))
 
         return documents
 
@@ -129,34 +344,39 @@ class UniversalDocumentLoader:
             from docx import Document as DocxDocument
             doc = DocxDocument(str(file))
             
-            for i, rel in enumerate(doc.part.rels.values()):
-                if "image" in rel.target_ref:
-                    image_part = rel.target_part
-                    image_bytes = image_part.blob
-                    
-                    ocr_text = self._process_image(image_bytes)
-                    if ocr_text:
-                        documents.append(Document(
-                            page_content=f"[Image OCR]: {ocr_text}",
-                            metadata={
-                                "source": str(file.name),
-                                "content_category": "image",
-                                "file_type": "docx",
-                                "page_number": 1, # DOCX doesn't have clear pages
-                                "image_index": i
-                            }
-                        ))
+            images = [
+                (i, rel.target_part.blob)
+                for i, rel in enumerate(doc.part.rels.values())
+                if "image" in rel.target_ref
+            ]
+
+            ocr_texts = self._process_images([image_bytes for _, image_bytes in images])
+            for (i, _), ocr_text in zip(images, ocr_texts):
+                if ocr_text:
+                    documents.append(Document(
+                        page_content=f"[Image OCR]: {ocr_text}",
+                        metadata={
+                            "source": str(file.name),
+                            "content_category": "image",
+                            "file_type": "docx",
+                            "page_number": 1, # DOCX doesn't have clear pages
+                            "image_index": i
+                        }
+                    ))
         except Exception as e:
             logger.error(f"Error extracting images from DOCX {file}: {e}")
             
         return documents
 
-    def _load_pptx(self, file: Path) -> List[Document]:
+    def _load_pptx(self, file: Path, start_page: int = 0) -> Iterator[Document]:
         prs = Presentation(str(file))
-        documents = []
 
         for i, slide in enumerate(prs.slides):
+            if i < start_page:
+                continue
+            documents = []
             text = []
+            images = []
             for shape in slide.shapes:
                 if hasattr(shape, "text"):
                     text.append(shape.text)
@@ -164,21 +384,22 @@ class UniversalDocumentLoader:
                 # Check for images
                 if hasattr(shape, "image"):
                     try:
-                        image_bytes = shape.image.blob
-                        ocr_text = self._process_image(image_bytes)
-                        if ocr_text:
-                            documents.append(Document(
-                                page_content=f"[Image OCR]: {ocr_text}",
-                                metadata={
-                                    "source": str(file.name),
-                                    "page_number": i + 1,
-                                    "content_category": "image",
-                                    "file_type": "pptx"
-                                }
-                            ))
+                        images.append(shape.image.blob)
                     except Exception as e:
                         logger.error(f"Error processing image in PPTX {file} slide {i+1}: {e}")
 
+            for ocr_text in self._process_images(images):
+                if ocr_text:
+                    documents.append(Document(
+                        page_content=f"[Image OCR]: {ocr_text}",
+                        metadata={
+                            "source": str(file.name),
+                            "page_number": i + 1,
+                            "content_category": "image",
+                            "file_type": "pptx"
+                        }
+                    ))
+
             full_text = "\n".join(text).strip()
             if full_text:
                 documents.append(Document(
@@ -190,4 +411,4 @@ class UniversalDocumentLoader:
                         "file_type": "pptx"
                     }
                 ))
-        return documents
+            yield from documents
@@ -1,13 +1,20 @@
 from loguru import logger
+from typing import Iterator, List, Optional, Tuple
 import os
+from langchain_core.documents import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 from app.core.settings import settings
 from app.core.qdrant import get_qdrant_client
+from app.core.ocr_cache import OcrCache
+from app.core.redis import redis_conn
 from app.services.document_loader import UniversalDocumentLoader
 from app.model_handlers.document_handler import DocumentHandler, DocumentUpdate
 from app.core.db import get_global_db_session
 
+CHECKPOINT_KEY = "askdocs:ingest:checkpoint:{document_id}"
+CHECKPOINT_TTL_SECONDS = 24 * 60 * 60
+
 class DocumentProcessor:
     def __init__(self):
         self.text_splitter = RecursiveCharacterTextSplitter(
@@ -18,34 +25,122 @@ class DocumentProcessor:
         # Initialize embeddings model
         self.qdrant = get_qdrant_client()
         
+        # Initialize OCR cache shared by every job
+        ocr_cache = None
+        if settings.ocr.cache_enabled:
+            ocr_cache = OcrCache(
+                path=settings.ocr.cache_path,
+                max_bytes=settings.ocr.cache_max_mb * 1024 * 1024
+            )
+
         # Initialize document loader
-        self.document_loader = UniversalDocumentLoader()
+        self.document_loader = UniversalDocumentLoader(
+            pdf_workers=settings.data.pdf_workers,
+            pdf_pages_per_task=settings.data.pdf_pages_per_task,
+            ocr_lang=settings.ocr.lang,
+            ocr_config=settings.ocr.config,
+            ocr_backend=settings.ocr.backend,
+            ocr_pool_size=settings.ocr.pool_size,
+            ocr_cache=ocr_cache,
+            ocr_min_image_area=settings.ocr.min_image_area,
+            ocr_uniform_stddev=settings.ocr.uniform_stddev,
+            ocr_scanned_page_coverage=settings.ocr.scanned_page_coverage,
+            ocr_render_dpi=settings.ocr.render_dpi
+        )
         
         # Create required directories
         os.makedirs(settings.data.documents_dir, exist_ok=True)
 
+    def iter_chunks(self, file_path: str, start_page: int = 0) -> Iterator[Document]:
+        """
+        Lazily load the document page by page and split each page into chunks.
+        Chunks are numbered per page so their point IDs don't shift when a job resumes.
+        """
+        current_page, chunk_index = None, 0
+        for page in self.document_loader.iter_load(file_path, start_page=start_page):
+            page_number = page.metadata.get("page_number", 1)
+            if page_number != current_page:
+                current_page, chunk_index = page_number, 0
+
+            for chunk in self.text_splitter.split_documents([page]):
+                chunk.metadata["chunk_index"] = chunk_index
+                chunk_index += 1
+                yield chunk
+
+    def _get_checkpoint(self, document_id: str) -> int:
+        """Last page whose chunks were all upserted by a previous attempt."""
+        checkpoint = redis_conn.get(CHECKPOINT_KEY.format(document_id=document_id))
+        return int(checkpoint) if checkpoint else 0
+
+    def _save_checkpoint(self, document_id: str, batch: List[Document]):
+        # Pages arrive in order, so every page before the batch's last one is complete
+        completed_page = batch[-1].metadata.get("page_number", 1) - 1
+        if completed_page > 0:
+            redis_conn.set(
+                CHECKPOINT_KEY.format(document_id=document_id),
+                completed_page,
+                ex=CHECKPOINT_TTL_SECONDS
+            )
+
+    def _clear_checkpoint(self, document_id: str):
+        redis_conn.delete(CHECKPOINT_KEY.format(document_id=document_id))
+
+    def _copy_duplicate(self, document_handler: DocumentHandler, document, collection_name: str) -> bool:
+        """Reuse the points of a completed document with the same content hash, if any."""
+        if not document.content_hash:
+            return False
+
+        duplicate = document_handler.get_completed_by_content_hash(
+            document.content_hash, exclude_id=document.id
+        )
+        if not duplicate:
+            return False
+
+        logger.info(f"{document.filename} matches already indexed document {duplicate.id}, copying its vectors")
+        copied = self.qdrant.copy_document(
+            source_collection=duplicate.vector_collection,
+            source_document_id=str(duplicate.id),
+            collection_name=collection_name,
+            source=document.filename,
+            document_id=str(document.id)
+        )
+        # Documents indexed before point metadata carried a document_id have nothing to copy
+        return copied > 0
+
     def process_document(self, file_path: str, user_id: str, document_id: str):
-        """Process a document and return its text chunks."""
+        """Process a document and store its chunks in Qdrant."""
+        document_id = str(document_id)
 
         logger.info(f"Processing document: {file_path} for user: {user_id}")
 
         with next(get_global_db_session()) as db:
-            collection_name = user_id
+            collection_name = str(user_id)
             document_handler = DocumentHandler(db)
             try:
-                # Load document
-                logger.info(f"Loading document: {file_path} for user: {user_id}")
-                documents = self.document_loader.load(file_path)
+                document = document_handler.read(document_id)
 
-                # Split into chunks
-                text_chunks = self.text_splitter.split_documents(documents)
+                # Identical content was already indexed: copy its vectors instead of rebuilding them
+                if self._copy_duplicate(document_handler, document, collection_name):
+                    document_handler.update(document_id, DocumentUpdate(
+                        status="completed"
+                    ))
+                    return
 
-                # Add documents to qdrant
+                # Resume after the last fully upserted page of a failed attempt
+                start_page = self._get_checkpoint(document_id)
+                if start_page:
+                    logger.info(f"Resuming {file_path} after page {start_page}")
+
+                # Stream pages -> chunks -> batched embedding and upsert
+                logger.info(f"Loading document: {file_path} for user: {user_id}")
                 self.qdrant.add_document(
-                    text_chunks=text_chunks,
+                    text_chunks=self.iter_chunks(file_path, start_page=start_page),
                     collection_name=collection_name,
-                    file_path=file_path
+                    source=document.filename,
+                    document_id=document_id,
+                    on_batch_upserted=lambda batch: self._save_checkpoint(document_id, batch)
                 )
+                self._clear_checkpoint(document_id)
 
                 # Create document record
                 document_handler.update(document_id, DocumentUpdate(
@@ -58,4 +153,107 @@ class DocumentProcessor:
                     status="failed",
                     error_message=str(e)
                 ))
-                raise
\ No newline at end of file
+                raise
+
+    def process_document_batch(self, items: List[Tuple[str, str]], user_id: str):
+        """
+        Process many small files of one user in a single job.
+        Chunks of all files are embedded and upserted together, while every
+        document's status is still tracked individually.
+        """
+        logger.info(f"Processing batch of {len(items)} documents for user: {user_id}")
+
+        with next(get_global_db_session()) as db:
+            collection_name = str(user_id)
+            document_handler = DocumentHandler(db)
+
+            prepared_chunks, loaded_ids = [], []
+            for file_path, document_id in items:
+                document_id = str(document_id)
+                try:
+                    document = document_handler.read(document_id)
+                    if self._copy_duplicate(document_handler, document, collection_name):
+                        document_handler.update(document_id, DocumentUpdate(status="completed"))
+                        continue
+
+                    # Files are small by construction, so holding the whole batch is bounded
+                    prepared_chunks.extend(
+                        self.qdrant.prepare_chunk(chunk, collection_name, document.filename, document_id)
+                        for chunk in self.iter_chunks(file_path)
+                    )
+                    loaded_ids.append(document_id)
+                except Exception as e:
+                    logger.error(f"Error processing document {file_path}: {str(e)}")
+                    document_handler.update(document_id, DocumentUpdate(
+                        status="failed",
+                        error_message=str(e)
+                    ))
+
+            try:
+                total = self.qdrant.upsert_chunks(prepared_chunks, collection_name)
+                logger.info(f"Upserted {total} points for {len(loaded_ids)} documents")
+            except Exception as e:
+                logger.error(f"Error upserting batch for user {user_id}: {str(e)}")
+                for document_id in loaded_ids:
+                    document_handler.update(document_id, DocumentUpdate(
+                        status="failed",
+                        error_message=str(e)
+                    ))
+                raise
+
+            for document_id in loaded_ids:
+                document_handler.update(document_id, DocumentUpdate(
+                    status="completed"
+                ))
+
+    def reindex_document(self, file_path: str, user_id: str, document_id: str):
+        """Re-extract a replaced document and only embed the chunks that changed."""
+        document_id = str(document_id)
+
+        logger.info(f"Re-indexing document: {file_path} for user: {user_id}")
+
+        with next(get_global_db_session()) as db:
+            collection_name = str(user_id)
+            document_handler = DocumentHandler(db)
+            try:
+                document = document_handler.read(document_id)
+
+                # A stale checkpoint from the previous version must not skip pages
+                self._clear_checkpoint(document_id)
+
+                self.qdrant.replace_document(
+                    text_chunks=self.iter_chunks(file_path),
+                    collection_name=collection_name,
+                    source=document.filename,
+                    document_id=document_id
+                )
+
+                document_handler.update(document_id, DocumentUpdate(
+                    status="completed"
+                ))
+
+            except Exception as e:
+                logger.error(f"Error re-indexing document {file_path}: {str(e)}")
+                document_handler.update(document_id, DocumentUpdate(
+                    status="failed",
+                    error_message=str(e)
+                ))
+                raise
+
+
+# -----------------------------
+# ✅ Singleton instance helper
+# -----------------------------
+
+_document_processor: Optional[DocumentProcessor] = None
+
+def get_document_processor() -> DocumentProcessor:
+    """
+    Lazily initialize and return a single DocumentProcessor per process.
+    The AskDocs worker builds it before forking so every job reuses the loaded models.
+    """
+    global _document_processor
+    if _document_processor is None:
+        _document_processor = DocumentProcessor()
+        logger.info("Initialized global DocumentProcessor")
+    return _document_processor
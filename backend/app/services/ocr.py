@@ -0,0 +1,104 @@
+import abc
+import os
+import queue
+import shlex
+import threading
+from typing import Dict, Tuple
+
+from loguru import logger
+from PIL import Image
+import pytesseract
+
+
+class OcrBackend(abc.ABC):
+    """Turns a PIL image into text. `concurrency` is how many images it can OCR at once."""
+
+    name = "base"
+    concurrency = 1
+
+    @abc.abstractmethod
+    def image_to_string(self, image: Image.Image) -> str:
+        ...
+
+
+class PytesseractBackend(OcrBackend):
+    """Spawns a tesseract process per image and round-trips it through temp files."""
+
+    name = "pytesseract"
+
+    def __init__(self, lang: str, config: str):
+        self.lang = lang
+        self.config = config
+
+    def image_to_string(self, image: Image.Image) -> str:
+        return pytesseract.image_to_string(image, lang=self.lang, config=self.config)
+
+
+def _parse_tesseract_config(config: str) -> Tuple[Dict[str, str], int]:
+    """Translate a pytesseract config string into (tesseract variables, page seg mode)."""
+    variables, psm = {}, None
+    args = shlex.split(config)
+    for i, arg in enumerate(args):
+        if arg == "--psm" and i + 1 < len(args):
+            psm = int(args[i + 1])
+        elif arg == "-c" and i + 1 < len(args) and "=" in args[i + 1]:
+            name, value = args[i + 1].split("=", 1)
+            variables[name] = value
+    return variables, psm
+
+
+class TesserocrBackend(OcrBackend):
+    """
+    Long-lived tesseract engines loaded in-process through the tesserocr binding
+    (the `ocr` extra, needs libtesseract-dev). Engines are pooled, created on
+    first use, and release the GIL while recognizing, so `concurrency` threads can
+    OCR in parallel without any process spawn or model reload.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, lang: str, config: str, pool_size: int):
+        import tesserocr
+
+        self._tesserocr = tesserocr
+        self.lang = lang
+        self.variables, self.psm = _parse_tesseract_config(config)
+        self.concurrency = pool_size
+        self._engines = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _new_engine(self):
+        engine = self._tesserocr.PyTessBaseAPI(lang=self.lang)
+        for name, value in self.variables.items():
+            engine.SetVariable(name, value)
+        if self.psm is not None:
+            engine.SetPageSegMode(self.psm)
+        return engine
+
+    def _acquire(self):
+        with self._lock:
+            if self._engines.empty() and self._created < self.concurrency:
+                self._created += 1
+                return self._new_engine()
+        return self._engines.get()
+
+    def image_to_string(self, image: Image.Image) -> str:
+        engine = self._acquire()
+        try:
+            engine.SetImage(image)
+            return engine.GetUTF8Text()
+        finally:
+            self._engines.put(engine)
+
+
+def create_ocr_backend(name: str, lang: str, config: str, pool_size: int = 0) -> OcrBackend:
+    """Build the configured OCR backend, falling back to pytesseract if tesserocr is missing."""
+    if name == "tesserocr":
+        try:
+            return TesserocrBackend(lang, config, pool_size or os.cpu_count() or 1)
+        except ImportError:
+            logger.warning("tesserocr is not installed, falling back to the pytesseract OCR backend")
+    elif name != "pytesseract":
+        raise ValueError(f"Unknown OCR backend: {name}")
+    return PytesseractBackend(lang, config)
@@ -0,0 +1,207 @@
+import hashlib
+import re
+from operator import itemgetter
+from typing import List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.retrievers import RetrieverLike
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda, RunnableParallel
+from loguru import logger
+
+from app.core import metrics
+from app.core.redis import async_redis_conn, redis_conn
+from app.core.retrieval_cache import normalize_query
+from app.core.settings import settings
+
+REWRITE_CACHE_KEY = "askdocs:rewrite:{key}"
+
+# Words that point back at earlier turns
+REFERENCE_PATTERN = re.compile(
+    r"\b(it|its|they|them|their|theirs|he|him|his|she|her|this|that|these|those|"
+    r"former|latter|above|previous|earlier|same|again|else|another)\b",
+    re.IGNORECASE,
+)
+FOLLOW_UP_PREFIXES = ("and ", "but ", "also ", "so ", "then ", "what about", "how about", "what else")
+
+
+def needs_rewrite(query: str, chat_history: List[BaseMessage]) -> bool:
+    """
+    Cheap check for whether a question depends on the conversation so far.
+    False positives only cost a rewrite call; false negatives retrieve with
+    the question as asked.
+    """
+    if not chat_history:
+        return False
+    if not settings.query_rewrite.enabled:
+        return True
+
+    normalized = query.strip().lower()
+    if len(re.findall(r"\w+", normalized)) <= settings.query_rewrite.short_query_words:
+        return True
+    if normalized.startswith(FOLLOW_UP_PREFIXES):
+        return True
+    return REFERENCE_PATTERN.search(normalized) is not None
+
+
+class QueryRewriter:
+    """Rephrases follow-up questions into standalone ones, only when needed and once per context."""
+
+    def __init__(self, chat_model: BaseChatModel):
+        prompt = ChatPromptTemplate.from_messages(
+            [
+                ("system", settings.llm.retriever_prompt),
+                MessagesPlaceholder(variable_name="chat_history"),
+                ("human", "{input}"),
+            ]
+        )
+        self.chain = prompt | chat_model | StrOutputParser()
+
+    @staticmethod
+    def cache_key(query: str, chat_history: List[BaseMessage]) -> str:
+        turns = chat_history[-2 * settings.query_rewrite.history_turns:]
+        digest = hashlib.sha256()
+        for message in turns:
+            digest.update(f"{message.type}:{message.content}\x00".encode("utf-8"))
+        digest.update(query.strip().encode("utf-8"))
+        return REWRITE_CACHE_KEY.format(key=digest.hexdigest())
+
+    def rewrite(self, inputs: dict) -> str:
+        query, chat_history = inputs["input"], inputs.get("chat_history") or []
+        if not needs_rewrite(query, chat_history):
+            metrics.incr("query_rewrite_skipped")
+            return query
+
+        key = self.cache_key(query, chat_history)
+        try:
+            cached = redis_conn.get(key)
+        except Exception as e:
+            logger.warning(f"Query rewrite cache lookup failed: {e}")
+            cached = None
+        if cached is not None:
+            metrics.incr("query_rewrite_cache_hits")
+            return cached.decode("utf-8")
+
+        metrics.incr("query_rewrite_cache_misses")
+        rewritten = self.chain.invoke({"input": query, "chat_history": chat_history}).strip() or query
+        try:
+            redis_conn.set(key, rewritten, ex=settings.query_rewrite.cache_ttl)
+        except Exception as e:
+            logger.warning(f"Query rewrite cache write failed: {e}")
+        return rewritten
+
+    async def arewrite(self, inputs: dict) -> str:
+        query, chat_history = inputs["input"], inputs.get("chat_history") or []
+        if not needs_rewrite(query, chat_history):
+            await metrics.aincr("query_rewrite_skipped")
+            return query
+
+        key = self.cache_key(query, chat_history)
+        try:
+            cached = await async_redis_conn.get(key)
+        except Exception as e:
+            logger.warning(f"Query rewrite cache lookup failed: {e}")
+            cached = None
+        if cached is not None:
+            await metrics.aincr("query_rewrite_cache_hits")
+            return cached.decode("utf-8")
+
+        await metrics.aincr("query_rewrite_cache_misses")
+        rewritten = (await self.chain.ainvoke({"input": query, "chat_history": chat_history})).strip() or query
+        try:
+            await async_redis_conn.set(key, rewritten, ex=settings.query_rewrite.cache_ttl)
+        except Exception as e:
+            logger.warning(f"Query rewrite cache write failed: {e}")
+        return rewritten
+
+
+def is_trivial_rewrite(query: str, rewritten: str, threshold: float) -> bool:
+    """Whether the rewrite adds too little to the question to be worth a second search."""
+    query_words = set(re.findall(r"\w+", normalize_query(query)))
+    rewritten_words = set(re.findall(r"\w+", normalize_query(rewritten)))
+    if not query_words or not rewritten_words:
+        return True
+    return len(query_words & rewritten_words) / len(query_words | rewritten_words) >= threshold
+
+
+def fuse_results(*result_lists: List[Document], k: Optional[int] = None, rrf_k: int = 60) -> List[Document]:
+    """Reciprocal rank fusion of several result lists, the same chunk counted once."""
+    scores, documents = {}, {}
+    for results in result_lists:
+        for rank, document in enumerate(results):
+            metadata = document.metadata
+            key = (metadata.get("source"), metadata.get("page_number"), metadata.get("chunk_index"), document.page_content)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+            documents.setdefault(key, document)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    limit = k or max((len(results) for results in result_lists), default=0)
+    return [documents[key] for key in ranked[:limit]]
+
+
+class SpeculativeRetrieval:
+    """
+    Second half of the speculative chain: the raw question was already searched while
+    the rewrite ran. A trivial rewrite keeps those results; otherwise the rewritten
+    question is searched too and both result sets are fused.
+    """
+
+    def __init__(self, retriever: RetrieverLike, threshold: float):
+        self.retriever = retriever
+        self.threshold = threshold
+
+    def _keep_raw(self, inputs: dict) -> Tuple[bool, Optional[str]]:
+        """Whether the raw results are enough, and the metric to count it under."""
+        if inputs["rewritten"] == inputs["query"]:
+            # No rewrite was needed, the raw results are the results
+            return True, None
+        if is_trivial_rewrite(inputs["query"], inputs["rewritten"], self.threshold):
+            return True, "speculative_retrieval_hits"
+        return False, "speculative_retrieval_misses"
+
+    def select(self, inputs: dict, config: RunnableConfig) -> List[Document]:
+        keep_raw, metric = self._keep_raw(inputs)
+        if metric:
+            metrics.incr(metric)
+        if keep_raw:
+            return inputs["raw"]
+        return fuse_results(inputs["raw"], self.retriever.invoke(inputs["rewritten"], config=config))
+
+    async def aselect(self, inputs: dict, config: RunnableConfig) -> List[Document]:
+        keep_raw, metric = self._keep_raw(inputs)
+        if metric:
+            await metrics.aincr(metric)
+        if keep_raw:
+            return inputs["raw"]
+        return fuse_results(inputs["raw"], await self.retriever.ainvoke(inputs["rewritten"], config=config))
+
+
+def create_rewriting_retriever(
+    chat_model: BaseChatModel, retriever: RetrieverLike, speculative: Optional[bool] = None
+) -> Runnable:
+    """
+    Drop-in for create_history_aware_retriever: takes {"input", "chat_history"},
+    rewrites the question only when the policy says so, then retrieves.
+
+    Speculative mode searches the raw question at the same time as the rewrite
+    runs, so a rewrite that changes little costs no extra retrieval round trip.
+    """
+    rewriter = QueryRewriter(chat_model)
+    rewrite = RunnableLambda(rewriter.rewrite, afunc=rewriter.arewrite)
+    if speculative is None:
+        speculative = settings.query_rewrite.speculative
+
+    if not speculative:
+        return (rewrite | retriever).with_config(run_name="chat_retriever_chain")
+
+    retrieval = SpeculativeRetrieval(retriever, settings.query_rewrite.trivial_rewrite_similarity)
+    return (
+        RunnableParallel(
+            query=itemgetter("input"),
+            rewritten=rewrite,
+            raw=itemgetter("input") | retriever,
+        )
+        | RunnableLambda(retrieval.select, afunc=retrieval.aselect)
+    ).with_config(run_name="chat_retriever_chain")
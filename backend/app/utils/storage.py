@@ -0,0 +1,48 @@
+import hashlib
+import os
+import uuid
+from typing import Tuple
+
+import aiofiles
+from fastapi import UploadFile
+
+from app.core.settings import settings
+
+# ---------------------------
+# Content-addressed storage
+# ---------------------------
+def blob_path(content_hash: str, extension: str) -> str:
+    """Location of a stored file, identical content always maps to the same path."""
+    return os.path.join(
+        settings.data.documents_dir, "blobs", content_hash[:2], f"{content_hash}.{extension}"
+    )
+
+async def save_upload(file: UploadFile, extension: str) -> Tuple[str, str]:
+    """
+    Stream an upload to disk in 1 MB chunks while hashing it.
+    Returns (file_path, sha256); identical files are only kept once.
+    """
+    tmp_dir = os.path.join(settings.data.documents_dir, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, f"{uuid.uuid4()}.{extension}")
+
+    sha256 = hashlib.sha256()
+    try:
+        async with aiofiles.open(tmp_path, "wb") as buffer:
+            while chunk := await file.read(1024 * 1024):
+                sha256.update(chunk)
+                await buffer.write(chunk)
+
+        content_hash = sha256.hexdigest()
+        file_path = blob_path(content_hash, extension)
+        if os.path.exists(file_path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return file_path, content_hash
@@ -0,0 +1,50 @@
+"""
+AskDocs RQ worker that loads the embedding models once instead of once per job.
+
+fork mode (default) preloads before forking work horses, which share the models
+copy-on-write and keep per-job crash isolation. simple mode runs jobs in-process
+with no fork; max_jobs recycles it and the container restart policy revives it.
+
+Usage:
+    python -m app.worker [--mode fork|simple] [--max-jobs N] [queue ...]
+"""
+import argparse
+import os
+
+from loguru import logger
+from rq import SimpleWorker, Worker
+
+from app.core.redis import redis_conn
+from app.core.settings import settings
+from app.services.document_processor import get_document_processor
+
+os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+
+def preload():
+    """Load the embedding models and the document processor into this process."""
+    # Only load weights here, running inference before fork would start thread pools
+    # that forked work horses can't safely inherit
+    get_document_processor()
+    logger.info("Preloaded embedding models and document processor")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AskDocs RQ worker with preloaded models")
+    parser.add_argument("queues", nargs="*", default=list(settings.worker.queues))
+    parser.add_argument("--mode", choices=["fork", "simple"], default=settings.worker.mode)
+    parser.add_argument("--max-jobs", type=int, default=settings.worker.max_jobs)
+    args = parser.parse_args()
+
+    preload()
+
+    worker_class = SimpleWorker if args.mode == "simple" else Worker
+    worker = worker_class(args.queues, connection=redis_conn)
+    logger.info(f"Starting {args.mode} worker on queues: {', '.join(args.queues)}")
+
+    # The scheduler is what re-enqueues jobs retried with Retry(interval=...)
+    worker.work(with_scheduler=True, max_jobs=args.max_jobs or None)
+
+
+if __name__ == "__main__":
+    main()
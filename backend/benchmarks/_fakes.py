@@ -0,0 +1,67 @@
+"""Stand-ins for external services, so benchmarks run without API keys or network."""
+import asyncio
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+DEFAULT_ANSWER = (
+    "According to the contract the supplier must deliver the goods within thirty days "
+    "of the order and keep records of every delivery for seven years."
+)
+
+
+class FakeStreamingChatModel(BaseChatModel):
+    """Chat model that streams a canned answer with API-like latencies, sync and async."""
+
+    answer: str = DEFAULT_ANSWER
+    first_token_latency: float = 0.4
+    token_latency: float = 0.02
+    # Extra first-token delay per prompt token (~4 characters), like prompt processing
+    prompt_token_latency: float = 0.0
+    calls: int = 0
+
+    def __init__(self, **kwargs: Any):
+        # Never answer from the global Redis LLM cache
+        super().__init__(cache=False, **kwargs)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming"
+
+    def _first_token_delay(self, messages: List[BaseMessage]) -> float:
+        prompt_chars = sum(len(str(message.content)) for message in messages)
+        return self.first_token_latency + self.prompt_token_latency * prompt_chars / 4
+
+    def _tokens(self) -> List[str]:
+        return [f"{word} " for word in self.answer.split(" ")]
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        time.sleep(self._first_token_delay(messages) + self.token_latency * len(self._tokens()))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        await asyncio.sleep(self._first_token_delay(messages) + self.token_latency * len(self._tokens()))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        self.calls += 1
+        time.sleep(self._first_token_delay(messages))
+        for token in self._tokens():
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+            time.sleep(self.token_latency)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        self.calls += 1
+        await asyncio.sleep(self._first_token_delay(messages))
+        for token in self._tokens():
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+            await asyncio.sleep(self.token_latency)
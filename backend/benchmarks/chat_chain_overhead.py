@@ -0,0 +1,98 @@
+"""
+Per-request overhead of the chat RAG chain: rebuilt on every request vs built once.
+
+- rebuild: build_rag_chain with a retriever bound to the request, then invoke it
+           (what Chat did per request before the chain was shared)
+- reuse:   one chain over the configurable retriever, the request binds
+           collection, documents and k through config["configurable"]
+
+Retrieval returns fixed chunks and the LLM answers instantly, so the numbers are
+chain construction and LangChain plumbing only.
+
+Run from the backend directory:
+    python -m benchmarks.chat_chain_overhead --requests 500
+"""
+import argparse
+import statistics
+import time
+
+from langchain_core.documents import Document
+from langchain_core.runnables import ConfigurableField
+
+from app.core.qdrant import QdrantHybridRetriever
+from app.services.chat_service import build_rag_chain
+from benchmarks._fakes import FakeStreamingChatModel
+
+QUERY = "Which law governs the supply agreement?"
+DOCUMENTS = ["contract.pdf", "annex.pdf"]
+
+
+class FixedResults:
+    """Qdrant stand-in returning the same chunks for every search."""
+
+    def __init__(self, k: int):
+        self.results = [
+            Document(page_content=f"Clause {i}: the agreement is governed by Dutch law.", metadata={})
+            for i in range(k)
+        ]
+
+    def search_documents(self, query, collection_name, documents, limit):
+        return self.results[:limit]
+
+    def as_retriever(self, collection_name, documents, k=None):
+        return QdrantHybridRetriever(qdrant=self, collection_name=collection_name, documents=documents, k=k)
+
+
+def configurable_retriever(qdrant: FixedResults):
+    # Same fields as Qdrant.configurable_retriever, without loading the embedding models
+    return qdrant.as_retriever("", [], k=5).configurable_fields(
+        collection_name=ConfigurableField(id="collection_name"),
+        documents=ConfigurableField(id="documents"),
+        k=ConfigurableField(id="k"),
+    )
+
+
+def time_requests(run_request, requests: int) -> list:
+    run_request(0)
+    timings = []
+    for i in range(requests):
+        start = time.perf_counter()
+        run_request(i)
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    chat_model = FakeStreamingChatModel(first_token_latency=0, token_latency=0)
+    qdrant = FixedResults(args.k)
+    inputs = {"chat_history": [], "input": QUERY}
+
+    def rebuild(i: int):
+        chain = build_rag_chain(chat_model, qdrant.as_retriever(f"user-{i}", DOCUMENTS, k=args.k))
+        chain.invoke(inputs)
+
+    shared_chain = build_rag_chain(chat_model, configurable_retriever(qdrant))
+
+    def reuse(i: int):
+        shared_chain.invoke(inputs, config={
+            "configurable": {"collection_name": f"user-{i}", "documents": DOCUMENTS, "k": args.k}
+        })
+
+    def build_only(i: int):
+        build_rag_chain(chat_model, qdrant.as_retriever(f"user-{i}", DOCUMENTS, k=args.k))
+
+    print(f"{'mode':>10} {'mean ms':>8} {'median':>8} {'p95':>8}")
+    for mode, run_request in (("rebuild", rebuild), ("reuse", reuse), ("build only", build_only)):
+        timings = time_requests(run_request, args.requests)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        print(f"{mode:>10} {statistics.mean(timings) * 1000:>8.2f} {statistics.median(timings) * 1000:>8.2f} "
+              f"{p95 * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Throughput of simultaneous chat streams: the blocking pipeline vs the async one.
+
+Serves both variants of the /chat streaming loop from one uvicorn worker:
+- sync:  iterates Chat.stream_chat_response inside the async generator (the old route)
+- async: iterates Chat.astream_chat_response
+
+Retrieval runs against a throwaway user collection on the configured Qdrant
+server with the real embedding models. The LLM is a fake with API-like latency
+and the session documents / history are fixed, so no API key or Postgres is needed.
+
+Run from the backend directory (needs Qdrant, e.g. make up-deps):
+    python -m benchmarks.chat_concurrency --streams 50
+"""
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from langchain_core.documents import Document
+
+from app.services.chat_service import Chat
+from benchmarks._fakes import FakeStreamingChatModel
+
+SOURCE = "benchmark-contract.pdf"
+QUERY = "How long must the supplier keep delivery records?"
+
+
+class BenchmarkChat(Chat):
+    """Chat with a fixed session: one document, no history."""
+
+    def get_documents(self, session_id: str) -> list:
+        return [SimpleNamespace(id="benchmark", filename=SOURCE, status="completed", content_hash="benchmark")]
+
+    def get_chat_history(self, session_id: str) -> list:
+        return []
+
+
+def build_app(chat: Chat, user_id: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/sync")
+    async def sync_chat():
+        async def generate_response():
+            for chunk in chat.stream_chat_response(user_id=user_id, session_id="benchmark", query=QUERY):
+                yield chunk
+        return StreamingResponse(generate_response(), media_type="text/plain")
+
+    @app.get("/async")
+    async def async_chat():
+        async def generate_response():
+            async for chunk in chat.astream_chat_response(user_id=user_id, session_id="benchmark", query=QUERY):
+                yield chunk
+        return StreamingResponse(generate_response(), media_type="text/plain")
+
+    return app
+
+
+async def run_stream(client: httpx.AsyncClient, path: str) -> tuple:
+    start = time.perf_counter()
+    first_byte = None
+    async with client.stream("GET", path) as response:
+        async for _ in response.aiter_text():
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+    return first_byte or 0.0, time.perf_counter() - start
+
+
+async def run_mode(base_url: str, path: str, streams: int) -> dict:
+    async with httpx.AsyncClient(base_url=base_url, timeout=600) as client:
+        start = time.perf_counter()
+        results = await asyncio.gather(*[run_stream(client, path) for _ in range(streams)])
+        wall = time.perf_counter() - start
+    first_bytes = sorted(first_byte for first_byte, _ in results)
+    return {
+        "wall": wall,
+        "streams_per_sec": streams / wall,
+        "ttfb_mean": statistics.mean(first_bytes),
+        "ttfb_p95": first_bytes[int(len(first_bytes) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, default=50)
+    parser.add_argument("--chunks", type=int, default=500, help="Chunks in the benchmark collection")
+    parser.add_argument("--first-token-latency", type=float, default=0.4)
+    parser.add_argument("--token-latency", type=float, default=0.02)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    chat = BenchmarkChat(chat_model=FakeStreamingChatModel(
+        first_token_latency=args.first_token_latency, token_latency=args.token_latency
+    ))
+    # Every stream asks the same question, measure the pipeline rather than the answer cache
+    chat.answer_cache = None
+
+    user_id = f"benchmark-{uuid.uuid4()}"
+    chat.qdrant.add_document(
+        [
+            Document(
+                page_content=f"Clause {i}: the supplier keeps delivery records for {i % 10 + 1} years.",
+                metadata={"page_number": i // 20 + 1, "chunk_index": i % 20},
+            )
+            for i in range(args.chunks)
+        ],
+        collection_name=user_id,
+        source=SOURCE,
+        document_id=str(uuid.uuid4()),
+    )
+
+    server = uvicorn.Server(uvicorn.Config(build_app(chat, user_id), port=args.port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    try:
+        base_url = f"http://127.0.0.1:{args.port}"
+        print(f"{'mode':>6} {'wall s':>8} {'streams/s':>10} {'TTFB mean':>10} {'TTFB p95':>9}")
+        for mode in ("sync", "async"):
+            result = asyncio.run(run_mode(base_url, f"/{mode}", args.streams))
+            print(f"{mode:>6} {result['wall']:>8.2f} {result['streams_per_sec']:>10.2f} "
+                  f"{result['ttfb_mean']:>10.2f} {result['ttfb_p95']:>9.2f}")
+    finally:
+        server.should_exit = True
+        thread.join()
+        chat.qdrant.delete_collection(user_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Recall, latency and memory of the Qdrant collection profiles in settings.qdrant.profiles.
+
+Each profile gets a throwaway collection filled with the same unit vectors,
+drawn around random centroids so they cluster like sentence embeddings.
+Recall@k is measured against exact float32 search on the same points.
+The memory column estimates the RAM held by dense vectors: the float32 originals
+when they aren't on disk, plus the quantized copy when it's kept in RAM.
+
+Needs a running Qdrant server (make up-deps). Run from the backend directory:
+    python -m benchmarks.collection_profiles --points 200000
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+from app.core.qdrant import get_collection_profile, quantization_config_for, search_params_for
+from app.core.settings import settings
+
+DIM = 384
+
+
+def make_vectors(count: int, clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((clusters, DIM), dtype=np.float32)
+    vectors = centroids[rng.integers(clusters, size=count)] + 0.6 * rng.standard_normal((count, DIM), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def estimate_ram_mb(profile: dict, points: int) -> float:
+    ram = 0 if profile.get("on_disk_vectors") else points * DIM * 4
+    quantization = profile.get("quantization", "none")
+    if quantization != "none" and profile.get("always_ram", True):
+        ram += points * DIM * (1 if quantization == "scalar" else 1 / 8)
+    return ram / 1024 ** 2
+
+
+def fill_collection(client: QdrantClient, collection_name: str, profile: dict, vectors: np.ndarray, batch_size: int):
+    if client.collection_exists(collection_name):
+        client.delete_collection(collection_name)
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config={
+            "dense": models.VectorParams(
+                size=DIM, distance=models.Distance.COSINE, on_disk=profile.get("on_disk_vectors", False)
+            )
+        },
+        quantization_config=quantization_config_for(profile),
+    )
+    for start in range(0, len(vectors), batch_size):
+        batch = vectors[start:start + batch_size]
+        client.upload_points(
+            collection_name=collection_name,
+            points=[
+                models.PointStruct(id=start + i, vector={"dense": vector.tolist()})
+                for i, vector in enumerate(batch)
+            ],
+            wait=True,
+        )
+
+    # Search only once every segment is indexed (and quantized)
+    while client.get_collection(collection_name).status != models.CollectionStatus.GREEN:
+        time.sleep(1)
+
+
+def search_ids(client: QdrantClient, collection_name: str, query: np.ndarray, k: int, params) -> list:
+    response = client.query_points(
+        collection_name=collection_name, query=query.tolist(), using="dense", limit=k, search_params=params
+    )
+    return [point.id for point in response.points]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=settings.qdrant.url)
+    parser.add_argument("--points", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=settings.qdrant.search_limit)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--profiles", nargs="*", default=list(settings.qdrant.profiles))
+    args = parser.parse_args()
+
+    client = QdrantClient(url=args.url, timeout=300)
+    vectors = make_vectors(args.points, clusters=max(args.points // 500, 1), seed=0)
+    # Queries near stored points, like questions close to a chunk
+    queries = vectors[np.random.default_rng(1).choice(args.points, args.queries, replace=False)] \
+        + 0.05 * np.random.default_rng(2).standard_normal((args.queries, DIM), dtype=np.float32)
+
+    print(f"{'profile':>10} {'recall@' + str(args.k):>10} {'mean ms':>8} {'p95 ms':>8} {'RAM MB':>8}")
+    for name in args.profiles:
+        profile = get_collection_profile(name)
+        collection_name = f"benchmark_profile_{name}"
+        fill_collection(client, collection_name, profile, vectors, args.batch_size)
+
+        try:
+            params = search_params_for(profile)
+            # Ground truth: brute force over the float32 originals
+            exact = models.SearchParams(exact=True, quantization=models.QuantizationSearchParams(ignore=True))
+            recalls, timings = [], []
+            for query in queries:
+                truth = set(search_ids(client, collection_name, query, args.k, exact))
+                start = time.perf_counter()
+                found = search_ids(client, collection_name, query, args.k, params)
+                timings.append(time.perf_counter() - start)
+                recalls.append(len(truth.intersection(found)) / args.k)
+
+            timings.sort()
+            print(f"{name:>10} {statistics.mean(recalls):>10.3f} {statistics.mean(timings) * 1000:>8.2f} "
+                  f"{timings[int(len(timings) * 0.95) - 1] * 1000:>8.2f} {estimate_ram_mb(profile, args.points):>8.1f}")
+        finally:
+            client.delete_collection(collection_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Prompt tokens and time to first token with the retrieved chunks pasted verbatim vs
+assembled by ContextAssembler (overlap merged, near-duplicates dropped, token budget).
+
+Pages of synthetic text are split with the ingestion splitter settings
+(data.chunk_size / chunk_overlap). Each request retrieves top-k hits the way
+hybrid search tends to return them: neighbouring chunks of one page, plus the same
+chunk from a second copy of the document. The LLM is a fake whose first-token
+latency grows with prompt length (--prompt-token-latency per token).
+
+Run from the backend directory:
+    python -m benchmarks.context_assembly --requests 50
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+from langchain_core.runnables import RunnableLambda
+
+from app.core.settings import settings
+from app.services.chat_service import build_rag_chain
+from app.services.context_assembly import ContextAssembler, get_token_counter
+from benchmarks._fakes import FakeStreamingChatModel
+
+WORDS = (
+    "supplier buyer delivery invoice payment warranty goods order notice period clause party "
+    "agreement liability damages termination schedule price quantity inspection defect days"
+).split()
+
+
+def make_pages(count: int, chars: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    pages = []
+    for _ in range(count):
+        sentences = []
+        while sum(len(sentence) for sentence in sentences) < chars:
+            sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20)))
+            sentences.append(sentence.capitalize() + ".")
+        pages.append(" ".join(sentences))
+    return pages
+
+
+def chunk_pages(pages: list, source: str) -> list:
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=settings.data.chunk_size, chunk_overlap=settings.data.chunk_overlap
+    )
+    pages_chunks = []
+    for page_number, text in enumerate(pages, start=1):
+        chunks = splitter.split_documents([Document(page_content=text, metadata={"page_number": page_number})])
+        for chunk_index, chunk in enumerate(chunks):
+            chunk.metadata.update({"source": source, "chunk_index": chunk_index})
+        pages_chunks.append(chunks)
+    return pages_chunks
+
+
+def make_hits(original: list, copy: list, k: int, rng: random.Random) -> list:
+    page = rng.randrange(len(original))
+    chunks = original[page]
+    start = rng.randrange(max(len(chunks) - k + 2, 1))
+    hits = chunks[start:start + k - 1]
+    # The best hit again, from a copy of the document
+    return hits[:1] + [copy[page][start]] + hits[1:]
+
+
+async def time_request(chain, query: str, hits: list) -> tuple:
+    start = time.perf_counter()
+    context = []
+    async for chunk in chain.astream({"chat_history": [], "input": query}, config={"configurable": {"hits": hits}}):
+        if "context" in chunk:
+            context = chunk["context"]
+        if "answer" in chunk:
+            return time.perf_counter() - start, context
+    return time.perf_counter() - start, context
+
+
+async def run(args):
+    count_tokens = get_token_counter()
+    pages = make_pages(args.pages, args.page_chars)
+    original, copy = chunk_pages(pages, "contract.pdf"), chunk_pages(pages, "contract (copy).pdf")
+
+    rng = random.Random(1)
+    requests = [make_hits(original, copy, args.k, rng) for _ in range(args.requests)]
+    query = "What does the agreement say about late delivery?"
+
+    async def retrieve(query: str, config) -> list:
+        return config["configurable"]["hits"]
+
+    assembler = ContextAssembler(
+        max_tokens=args.max_tokens,
+        duplicate_threshold=settings.context.duplicate_threshold,
+        max_overlap=settings.data.chunk_overlap,
+        count_tokens=count_tokens,
+    )
+
+    print(f"{'context':>10} {'prompt tokens':>14} {'context tokens':>15} {'TTFT mean':>10} {'TTFT p95':>9}")
+    for label, context_assembler in (("verbatim", None), ("assembled", assembler)):
+        chat_model = FakeStreamingChatModel(
+            first_token_latency=args.first_token_latency,
+            token_latency=args.token_latency,
+            prompt_token_latency=args.prompt_token_latency,
+        )
+        chain = build_rag_chain(chat_model, RunnableLambda(retrieve), context_assembler)
+
+        timings, prompt_tokens, context_tokens = [], [], []
+        for hits in requests:
+            ttft, context = await time_request(chain, query, hits)
+            context_size = sum(count_tokens(doc.page_content) for doc in context)
+            timings.append(ttft)
+            context_tokens.append(context_size)
+            prompt_tokens.append(count_tokens(settings.llm.system_prompt) + count_tokens(query) + context_size)
+
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        print(f"{label:>10} {statistics.mean(prompt_tokens):>14.0f} {statistics.mean(context_tokens):>15.0f} "
+              f"{statistics.mean(timings):>10.3f} {p95:>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--page-chars", type=int, default=3000)
+    parser.add_argument("-k", type=int, default=settings.qdrant.search_limit)
+    parser.add_argument("--max-tokens", type=int, default=settings.context.max_tokens)
+    parser.add_argument("--first-token-latency", type=float, default=0.3)
+    parser.add_argument("--token-latency", type=float, default=0.0)
+    parser.add_argument("--prompt-token-latency", type=float, default=0.0002,
+                        help="Seconds of first-token delay per prompt token")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Filtered search latency on a large collection, before and after the payload indexes.
+
+Fills a throwaway collection with random dense vectors whose payload mirrors
+chunk metadata, then times searches filtered the way chat retrieval filters
+(metadata.source MatchAny) and deletes filter (metadata.document_id).
+Sparse vectors are left out: the filter cost doesn't depend on them.
+
+Needs a running Qdrant server (make up-deps). Run from the backend directory:
+    python -m benchmarks.filtered_search --points 1000000
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+from app.core.qdrant import ensure_payload_indexes
+from app.core.settings import settings
+
+DIM = 384
+
+
+def fill_collection(client: QdrantClient, collection_name: str, points: int, sources: int, batch_size: int):
+    if client.collection_exists(collection_name):
+        client.delete_collection(collection_name)
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config={"dense": models.VectorParams(size=DIM, distance=models.Distance.COSINE)},
+        on_disk_payload=True,
+    )
+    rng = np.random.default_rng(0)
+    for start in range(0, points, batch_size):
+        count = min(batch_size, points - start)
+        vectors = rng.standard_normal((count, DIM), dtype=np.float32)
+        client.upload_points(
+            collection_name=collection_name,
+            points=[
+                models.PointStruct(
+                    id=start + i,
+                    vector={"dense": vectors[i].tolist()},
+                    payload={
+                        "page_content": f"chunk {start + i}",
+                        "metadata": {
+                            "source": f"document-{(start + i) % sources}.pdf",
+                            "user_id": "benchmark",
+                            "document_id": str(uuid.UUID(int=(start + i) % sources)),
+                        },
+                    },
+                )
+                for i in range(count)
+            ],
+            wait=True,
+        )
+        print(f"  uploaded {start + count}/{points}", end="\r")
+    print()
+
+
+def time_searches(client: QdrantClient, collection_name: str, sources: int, queries: int) -> dict:
+    rng = random.Random(0)
+    query_vectors = np.random.default_rng(1).standard_normal((queries, DIM), dtype=np.float32)
+    timings = {"source MatchAny": [], "document_id count": []}
+    for vector in query_vectors:
+        selected = [f"document-{rng.randrange(sources)}.pdf" for _ in range(3)]
+        start = time.perf_counter()
+        client.query_points(
+            collection_name=collection_name,
+            query=vector.tolist(),
+            using="dense",
+            limit=5,
+            query_filter=models.Filter(must=[
+                models.FieldCondition(key="metadata.source", match=models.MatchAny(any=selected))
+            ]),
+        )
+        timings["source MatchAny"].append(time.perf_counter() - start)
+
+        # Same filter shape as delete / re-index, without mutating the collection
+        start = time.perf_counter()
+        client.count(
+            collection_name=collection_name,
+            count_filter=models.Filter(must=[
+                models.FieldCondition(
+                    key="metadata.document_id",
+                    match=models.MatchValue(value=str(uuid.UUID(int=rng.randrange(sources))))
+                )
+            ]),
+            exact=True,
+        )
+        timings["document_id count"].append(time.perf_counter() - start)
+    return timings
+
+
+def report(label: str, timings: dict):
+    for name, values in timings.items():
+        values = sorted(values)
+        p95 = values[int(len(values) * 0.95) - 1]
+        print(f"{label:>10} {name:>18} {statistics.mean(values) * 1000:>9.1f} {statistics.median(values) * 1000:>8.1f} "
+              f"{p95 * 1000:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=settings.qdrant.url)
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--sources", type=int, default=2000, help="Distinct documents in the collection")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--collection", default="benchmark_filtered_search")
+    parser.add_argument("--keep", action="store_true", help="Keep the collection afterwards")
+    args = parser.parse_args()
+
+    client = QdrantClient(url=args.url, timeout=300)
+    print(f"Filling {args.collection} with {args.points} points")
+    fill_collection(client, args.collection, args.points, args.sources, args.batch_size)
+
+    try:
+        print(f"{'indexes':>10} {'query':>18} {'mean ms':>9} {'median':>8} {'p95':>8}")
+        report("none", time_searches(client, args.collection, args.sources, args.queries))
+
+        start = time.perf_counter()
+        ensure_payload_indexes(client, args.collection)
+        index_seconds = time.perf_counter() - start
+
+        report("keyword", time_searches(client, args.collection, args.sources, args.queries))
+        print(f"Building the payload indexes took {index_seconds:.1f}s")
+    finally:
+        if not args.keep:
+            client.delete_collection(args.collection)
+
+
+if __name__ == "__main__":
+    main()
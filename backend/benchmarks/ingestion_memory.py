@@ -0,0 +1,107 @@
+"""
+Peak RSS of the old list-based ingestion path vs the streaming pipeline.
+
+Each mode runs in a fresh process on the same synthetic PDF (2,000 pages by
+default) so ru_maxrss is not shared between them. Embedding is included unless
+--no-embed is passed; nothing is sent to Qdrant.
+
+Run from the backend directory:
+    python -m benchmarks.ingestion_memory --pages 2000
+"""
+import argparse
+import multiprocessing
+import resource
+import tempfile
+import time
+from itertools import batched
+from pathlib import Path
+
+import fitz  # PyMuPDF
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+
+from app.services.document_loader import UniversalDocumentLoader
+
+PARAGRAPH = (
+    "The supplier shall maintain records of all deliveries, inspections and "
+    "corrective actions for a period of no less than seven years. "
+)
+
+
+def build_text_pdf(path: Path, pages: int):
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        text = f"Section {i + 1}\n" + (PARAGRAPH * 25)
+        page.insert_textbox(fitz.Rect(36, 36, 560, 800), text, fontsize=9)
+    doc.save(str(path))
+    doc.close()
+
+
+def run_mode(mode: str, pdf_path: str, batch_size: int, embed: bool, result_queue):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    loader = UniversalDocumentLoader()
+    embeddings = None
+    if embed:
+        from langchain_huggingface import HuggingFaceEmbeddings
+        embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    chunk_count = 0
+
+    if mode == "eager":
+        # Previous behaviour: every page, every chunk and every metadata copy in memory at once
+        documents = loader.load(pdf_path)
+        chunks = splitter.split_documents(documents)
+        prepared = [Document(page_content=c.page_content, metadata=dict(c.metadata)) for c in chunks]
+        vectors = []
+        for batch in batched(prepared, batch_size):
+            if embeddings:
+                vectors.extend(embeddings.embed_documents([d.page_content for d in batch]))
+        chunk_count = len(prepared)
+    else:
+        def iter_chunks():
+            for page in loader.iter_load(pdf_path):
+                yield from splitter.split_documents([page])
+
+        for batch in batched(iter_chunks(), batch_size):
+            if embeddings:
+                embeddings.embed_documents([d.page_content for d in batch])
+            chunk_count += len(batch)
+
+    elapsed = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result_queue.put((mode, chunk_count, elapsed, baseline_rss, peak_rss))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--no-embed", action="store_true")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = Path(tmp) / "synthetic.pdf"
+        build_text_pdf(pdf_path, args.pages)
+        print(f"Synthetic PDF: {args.pages} pages, {pdf_path.stat().st_size / 1e6:.1f} MB")
+
+        print(f"{'mode':>10} {'chunks':>8} {'seconds':>9} {'peak RSS MB':>12} {'pipeline MB':>12}")
+        for mode in ("eager", "streaming"):
+            queue = ctx.Queue()
+            process = ctx.Process(
+                target=run_mode,
+                args=(mode, str(pdf_path), args.batch_size, not args.no_embed, queue)
+            )
+            process.start()
+            mode, chunk_count, elapsed, baseline_rss, peak_rss = queue.get()
+            process.join()
+            # ru_maxrss is reported in KB on Linux
+            print(f"{mode:>10} {chunk_count:>8} {elapsed:>9.2f} {peak_rss / 1024:>12.1f} "
+                  f"{(peak_rss - baseline_rss) / 1024:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
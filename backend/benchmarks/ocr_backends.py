@@ -0,0 +1,73 @@
+"""
+Images/sec of the OCR backends on synthetic text images.
+
+- pytesseract:        one tesseract process per image
+- tesserocr x1:       one long-lived in-process engine
+- tesserocr pooled:   a pool of engines OCRing images in parallel threads
+
+tesserocr rows are skipped when the binding isn't installed.
+
+Run from the backend directory:
+    python -m benchmarks.ocr_backends --images 100
+"""
+import argparse
+import io
+import os
+import time
+
+from PIL import Image, ImageDraw
+
+from app.services.document_loader import UniversalDocumentLoader
+
+
+def build_text_images(count: int) -> list:
+    """Render `count` distinct PNGs with a few lines of text each."""
+    images = []
+    for i in range(count):
+        image = Image.new("L", (900, 200), color=255)
+        draw = ImageDraw.Draw(image)
+        for line in range(4):
+            draw.text((20, 20 + line * 40), f"Invoice {i + 1} line {line + 1}: total amount due 1,{i:03d}.00 USD", fill=0)
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        images.append(buffer.getvalue())
+    return images
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=100)
+    parser.add_argument("--pool-size", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    images = build_text_images(args.images)
+    runs = (
+        ("pytesseract", "pytesseract", 0),
+        ("tesserocr x1", "tesserocr", 1),
+        (f"tesserocr x{args.pool_size}", "tesserocr", args.pool_size),
+    )
+
+    baseline = None
+    print(f"{'backend':>16} {'seconds':>9} {'images/sec':>11} {'speedup':>8}")
+    for label, backend, pool_size in runs:
+        # No OCR cache, every image must hit the engine
+        loader = UniversalDocumentLoader(ocr_backend=backend, ocr_pool_size=pool_size)
+        if loader.ocr.name != backend:
+            print(f"{label:>16}   skipped (tesserocr is not installed)")
+            continue
+
+        # Warm up so engine creation isn't counted against the first images
+        loader._process_images(images[:loader.ocr.concurrency])
+
+        start = time.perf_counter()
+        texts = loader._process_images(images)
+        elapsed = time.perf_counter() - start
+
+        images_per_sec = args.images / elapsed
+        baseline = baseline or images_per_sec
+        print(f"{label:>16} {elapsed:>9.2f} {images_per_sec:>11.2f} {images_per_sec / baseline:>7.2f}x"
+              f"  ({sum(1 for text in texts if text)} with text)")
+
+
+if __name__ == "__main__":
+    main()
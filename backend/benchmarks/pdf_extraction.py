@@ -0,0 +1,65 @@
+"""
+Pages/sec of UniversalDocumentLoader._load_pdf for an increasing number of workers.
+
+Run from the backend directory:
+    python -m benchmarks.pdf_extraction --pages 400
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import fitz  # PyMuPDF
+
+from app.services.document_loader import UniversalDocumentLoader
+
+
+def build_scanned_pdf(path: Path, pages: int):
+    """Write a synthetic PDF whose pages are a line of text plus a distinct rendered text image."""
+    doc = fitz.open()
+    for i in range(pages):
+        # Render a "scanned" clause per page; distinct images keep xref dedupe and caches out of the way
+        scan = fitz.open()
+        scan_page = scan.new_page()
+        scan_page.insert_text((72, 72), f"Scanned contract clause {i + 1}: the supplier shall deliver", fontsize=14)
+        image_bytes = scan_page.get_pixmap(dpi=150).tobytes("png")
+        scan.close()
+
+        page = doc.new_page()
+        page.insert_text((72, 40), f"Page {i + 1} of the benchmark contract document", fontsize=11)
+        page.insert_image(fitz.Rect(36, 60, 560, 800), stream=image_bytes)
+    doc.save(str(path))
+    doc.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--pages-per-task", type=int, default=8)
+    parser.add_argument("--workers", type=int, nargs="*", help="Worker counts to try (default: 1, 2, 4 ... cpu_count)")
+    args = parser.parse_args()
+
+    cpu_count = os.cpu_count() or 1
+    worker_counts = args.workers or sorted({1, *[2 ** i for i in range(1, cpu_count.bit_length()) if 2 ** i <= cpu_count], cpu_count})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = Path(tmp) / "benchmark.pdf"
+        build_scanned_pdf(pdf_path, args.pages)
+
+        baseline = None
+        print(f"{'workers':>8} {'seconds':>9} {'pages/sec':>10} {'speedup':>8}")
+        for workers in worker_counts:
+            loader = UniversalDocumentLoader(pdf_workers=workers, pdf_pages_per_task=args.pages_per_task)
+            start = time.perf_counter()
+            documents = loader.load(pdf_path)
+            elapsed = time.perf_counter() - start
+
+            pages_per_sec = args.pages / elapsed
+            baseline = baseline or pages_per_sec
+            print(f"{workers:>8} {elapsed:>9.2f} {pages_per_sec:>10.2f} {pages_per_sec / baseline:>7.2f}x"
+                  f"  ({len(documents)} documents)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Time to first token of a chat turn that has history, with and without the query rewrite policy.
+
+- always: create_history_aware_retriever, one rewrite LLM call per turn with history
+- policy: create_rewriting_retriever, self-contained questions skip the rewrite
+- cached:  the policy again on the same turns, follow-ups hit the rewrite cache
+
+The LLM is a fake with API-like latency and retrieval returns fixed chunks, so the
+difference is the rewrite round trip alone. The rewrite cache needs Redis; without
+it the cached row matches the policy row.
+
+Run from the backend directory:
+    python -m benchmarks.query_rewrite_ttft
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from langchain.chains import create_history_aware_retriever, create_retrieval_chain
+from langchain.chains.combine_documents import create_stuff_documents_chain
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import RunnableLambda
+
+from app.core.redis import async_redis_conn
+from app.core.settings import settings
+from app.services.query_rewrite import QueryRewriter, create_rewriting_retriever, needs_rewrite
+from benchmarks._fakes import FakeStreamingChatModel
+
+HISTORY = [
+    HumanMessage(content="What does the supply agreement say about delivery times?"),
+    AIMessage(content="The supplier must deliver within thirty days of each purchase order."),
+]
+
+QUERIES = [
+    # Self-contained
+    "What penalties apply when the supplier misses a delivery deadline?",
+    "Which law governs the supply agreement?",
+    "How many days notice are required to terminate the agreement?",
+    "Who pays for shipping insurance under the agreement?",
+    "What warranty period applies to delivered goods?",
+    # Follow-ups
+    "And for international orders?",
+    "What happens if they are late again?",
+    "Can that deadline be extended?",
+]
+
+CHUNKS = [
+    Document(page_content=f"Clause {i}: delivery obligations and remedies of the supplier.", metadata={})
+    for i in range(settings.qdrant.search_limit)
+]
+
+
+async def fake_retrieve(query: str) -> list:
+    await asyncio.sleep(0.03)
+    return CHUNKS
+
+
+def build_chain(chat_model, mode: str):
+    retriever = RunnableLambda(fake_retrieve)
+    if mode == "always":
+        contextualize_q_prompt = ChatPromptTemplate.from_messages(
+            [
+                ("system", settings.llm.retriever_prompt),
+                MessagesPlaceholder(variable_name="chat_history"),
+                ("human", "{input}"),
+            ]
+        )
+        history_aware_retriever = create_history_aware_retriever(chat_model, retriever, contextualize_q_prompt)
+    else:
+        history_aware_retriever = create_rewriting_retriever(chat_model, retriever)
+
+    qa_prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", settings.llm.system_prompt),
+            MessagesPlaceholder("chat_history"),
+            ("human", "{input}"),
+        ]
+    )
+    return create_retrieval_chain(history_aware_retriever, create_stuff_documents_chain(chat_model, qa_prompt))
+
+
+async def time_to_first_token(chain, query: str) -> float:
+    start = time.perf_counter()
+    async for chunk in chain.astream({"chat_history": HISTORY, "input": query}):
+        if "answer" in chunk:
+            return time.perf_counter() - start
+    return time.perf_counter() - start
+
+
+async def run(args):
+    print(f"{'mode':>7} {'mean TTFT':>10} {'median':>8} {'max':>8} {'LLM calls':>10}")
+    for mode in ("always", "policy", "cached"):
+        chat_model = FakeStreamingChatModel(
+            first_token_latency=args.first_token_latency, token_latency=args.token_latency
+        )
+        chain = build_chain(chat_model, "always" if mode == "always" else "policy")
+        if mode == "policy":
+            # Start cold, the cached mode reuses what this run stores
+            await clear_rewrite_cache()
+
+        timings = [await time_to_first_token(chain, query) for query in QUERIES]
+        print(f"{mode:>7} {statistics.mean(timings):>10.3f} {statistics.median(timings):>8.3f} "
+              f"{max(timings):>8.3f} {chat_model.calls:>10}")
+
+    rewritten = sum(needs_rewrite(query, HISTORY) for query in QUERIES)
+    print(f"Policy rewrites {rewritten}/{len(QUERIES)} questions")
+
+
+async def clear_rewrite_cache():
+    try:
+        await async_redis_conn.delete(*[QueryRewriter.cache_key(query, HISTORY) for query in QUERIES])
+    except Exception:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--first-token-latency", type=float, default=0.4)
+    parser.add_argument("--token-latency", type=float, default=0.02)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
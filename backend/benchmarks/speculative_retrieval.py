@@ -0,0 +1,154 @@
+"""
+Time to first token on multi-turn sessions, sequential vs speculative retrieval.
+
+- sequential:  rewrite (when the policy asks for it), then search the rewritten question
+- speculative: search the raw question while the rewrite runs; search again and fuse
+               only when the rewrite changes the question substantially
+
+Every turn after the first has history. Follow-ups come in two kinds: ones the
+rewrite leaves (nearly) unchanged and ones it expands. The rewrite and answer LLMs
+are fakes with configurable latency and retrieval is a fixed delay, so no API key
+or Qdrant is needed. Each run tags its questions with a fresh suffix, so the
+rewrite cache never answers for the LLM.
+
+Run from the backend directory:
+    python -m benchmarks.speculative_retrieval --rewrite-latency 0.5 --retrieval-latency 0.15
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from typing import Any, List, Optional
+
+from langchain.chains import create_retrieval_chain
+from langchain.chains.combine_documents import create_stuff_documents_chain
+from langchain_core.documents import Document
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import RunnableLambda
+
+from app.core.settings import settings
+from app.services.query_rewrite import create_rewriting_retriever
+from benchmarks._fakes import FakeStreamingChatModel
+
+# (question, what the rewrite turns it into); None keeps the question as is
+SESSION = [
+    ("What does the supply agreement say about delivery times?", None),
+    ("Which penalties apply when those delivery times are missed?",
+     "Which penalties apply when the supply agreement delivery times are missed?"),
+    ("And for international orders?",
+     "What are the delivery times and penalties for international orders under the supply agreement?"),
+    ("Which law governs this agreement?", None),
+    ("Can that deadline be extended?",
+     "Can the delivery deadline in the supply agreement be extended, and under which conditions?"),
+    ("Who pays for shipping insurance under the same agreement?",
+     "Who pays for shipping insurance under the same supply agreement?"),
+]
+
+
+class FakeRewriteModel(BaseChatModel):
+    """Rewrite LLM stand-in: answers with the scripted rewrite of the last question after a delay."""
+
+    rewrites: dict
+    latency: float = 0.5
+    calls: int = 0
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(cache=False, **kwargs)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-rewrite"
+
+    def _rewrite(self, messages: List[BaseMessage]) -> ChatResult:
+        self.calls += 1
+        question = messages[-1].content
+        rewritten = self.rewrites.get(question) or question
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=rewritten))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return self._rewrite(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._rewrite(messages)
+
+
+def build_chain(rewrite_model, answer_model, retrieval_latency: float, speculative: bool, searches: list):
+    async def retrieve(query: str) -> list:
+        searches.append(query)
+        await asyncio.sleep(retrieval_latency)
+        return [
+            Document(page_content=f"Clause {i} on: {query}", metadata={"source": "contract.pdf", "chunk_index": i})
+            for i in range(settings.qdrant.search_limit)
+        ]
+
+    retriever = create_rewriting_retriever(rewrite_model, RunnableLambda(retrieve), speculative=speculative)
+    qa_prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", settings.llm.system_prompt),
+            MessagesPlaceholder("chat_history"),
+            ("human", "{input}"),
+        ]
+    )
+    return create_retrieval_chain(retriever, create_stuff_documents_chain(answer_model, qa_prompt))
+
+
+async def run_session(chain, session: list) -> list:
+    history, timings = [], []
+    for question in session:
+        start = time.perf_counter()
+        answer = ""
+        async for chunk in chain.astream({"chat_history": history, "input": question}):
+            if "answer" in chunk:
+                if not answer:
+                    timings.append(time.perf_counter() - start)
+                answer += chunk["answer"]
+        history += [HumanMessage(content=question), AIMessage(content=answer)]
+    return timings
+
+
+async def run(args):
+    print(f"{'mode':>11} {'TTFT mean':>10} {'follow-up mean':>15} {'p95':>7} {'searches':>9}")
+    for mode in ("sequential", "speculative"):
+        rewrite_model = FakeRewriteModel(rewrites={}, latency=args.rewrite_latency)
+        answer_model = FakeStreamingChatModel(
+            first_token_latency=args.first_token_latency, token_latency=args.token_latency
+        )
+        searches = []
+        chain = build_chain(rewrite_model, answer_model, args.retrieval_latency, mode == "speculative", searches)
+        timings = []
+        for _ in range(args.sessions):
+            # A per-session suffix keeps the rewrite cache cold
+            suffix = f" ({uuid.uuid4().hex[:6]})"
+            rewrite_model.rewrites.update({
+                question + suffix: (rewritten + suffix if rewritten else None) for question, rewritten in SESSION
+            })
+            timings += await run_session(chain, [question + suffix for question, _ in SESSION])
+
+        follow_ups = [timing for i, timing in enumerate(timings) if i % len(SESSION)]
+        ordered = sorted(timings)
+        p95 = ordered[int(len(ordered) * 0.95) - 1]
+        print(f"{mode:>11} {statistics.mean(timings):>10.3f} {statistics.mean(follow_ups):>15.3f} {p95:>7.3f} "
+              f"{len(searches):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=5)
+    parser.add_argument("--rewrite-latency", type=float, default=0.5)
+    parser.add_argument("--retrieval-latency", type=float, default=0.15)
+    parser.add_argument("--first-token-latency", type=float, default=0.4)
+    parser.add_argument("--token-latency", type=float, default=0.0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
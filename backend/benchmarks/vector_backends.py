@@ -0,0 +1,111 @@
+"""
+Ingestion time, hybrid query latency and result overlap of the vector store backends.
+
+Each backend gets the same synthetic chunks through Qdrant.add_document with the
+persistent embedding cache turned off, so every backend pays the same embedding
+cost and the numbers differ only in storage and search.
+Overlap@k is measured against the first backend given (remote by default), as
+the share of its top-k point IDs the other backend also returns. The retrieval
+cache is disabled so every query reaches the backend.
+
+The remote backend needs a running Qdrant server (make up-deps). Run from the
+backend directory:
+    python -m benchmarks.vector_backends --backends remote local numpy
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+
+from langchain_core.documents import Document
+
+from app.core.qdrant import Qdrant
+from app.core.settings import settings
+
+TOPICS = [
+    "payment terms", "delivery schedule", "warranty period", "termination notice",
+    "liability cap", "confidentiality", "governing law", "force majeure",
+    "intellectual property", "audit rights", "insurance", "subcontracting",
+]
+
+
+def make_chunks(count: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    chunks = []
+    for i in range(count):
+        topic, other = rng.sample(TOPICS, 2)
+        chunks.append(Document(
+            page_content=f"Section {i} covers {topic} and refers to {other}. "
+                         f"The parties agree that {topic} applies within {rng.randint(5, 90)} days.",
+            metadata={"page_number": i // 10 + 1, "chunk_index": i % 10},
+        ))
+    return chunks
+
+
+def make_queries(count: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    return [f"What does the agreement say about {rng.choice(TOPICS)}?" for _ in range(count)]
+
+
+def run_backend(backend: str, chunks: list, queries: list, args) -> dict:
+    qdrant = Qdrant(backend=backend)
+    qdrant.retrieval_cache = None
+    qdrant.delete_collection(args.collection)
+
+    start = time.perf_counter()
+    qdrant.add_document(iter(chunks), args.collection, args.source, str(uuid.uuid4()))
+    upsert_seconds = time.perf_counter() - start
+
+    # Warm up the query embedding models outside the timings
+    qdrant.search_documents(queries[0], args.collection, [args.source], args.k)
+
+    timings, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        documents = qdrant.search_documents(query, args.collection, [args.source], args.k)
+        timings.append(time.perf_counter() - start)
+        results.append([(doc.metadata.get("page_number"), doc.metadata.get("chunk_index")) for doc in documents])
+
+    if not args.keep:
+        qdrant.delete_collection(args.collection)
+    return {"upsert": upsert_seconds, "timings": sorted(timings), "results": results}
+
+
+def overlap(reference: list, results: list) -> float:
+    shares = [len(set(a) & set(b)) / len(a) for a, b in zip(reference, results) if a]
+    return statistics.mean(shares) if shares else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["remote", "local", "numpy"],
+                        choices=["remote", "local", "numpy"])
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--collection", default="benchmark_vector_backends")
+    parser.add_argument("--source", default="benchmark.pdf")
+    parser.add_argument("--keep", action="store_true", help="Keep the collections afterwards")
+    args = parser.parse_args()
+
+    # Otherwise the first backend embeds every chunk and the others hit the cache
+    settings.set("embedding_cache.enabled", False)
+
+    chunks, queries = make_chunks(args.chunks), make_queries(args.queries)
+    runs = {}
+    for backend in args.backends:
+        print(f"Ingesting {len(chunks)} chunks into {backend}")
+        runs[backend] = run_backend(backend, chunks, queries, args)
+
+    reference = runs[args.backends[0]]["results"]
+    print(f"{'backend':>8} {'upsert s':>9} {'mean ms':>8} {'median':>8} {'p95':>8} {f'overlap@{args.k}':>10}")
+    for backend, run in runs.items():
+        timings = run["timings"]
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        print(f"{backend:>8} {run['upsert']:>9.1f} {statistics.mean(timings) * 1000:>8.1f} "
+              f"{statistics.median(timings) * 1000:>8.1f} {p95 * 1000:>8.1f} {overlap(reference, run['results']):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Per-job overhead of the stock RQ worker vs the preloaded AskDocs worker.
+
+Every mode runs the same trivial job (embed one chunk) N times:
+- stock:     fork from a parent that never loaded the models (rq worker)
+- preloaded: fork from a parent that called app.worker.preload() (fork mode)
+- simple:    run in the preloaded process itself (simple mode)
+
+No Redis, Postgres or Qdrant server is needed.
+
+Run from the backend directory:
+    python -m benchmarks.worker_overhead --jobs 5
+"""
+import argparse
+import multiprocessing
+import statistics
+import time
+
+JOB_TEXT = "The supplier shall maintain records of all deliveries for seven years."
+
+
+def run_job():
+    from app.services.document_processor import get_document_processor
+    processor = get_document_processor()
+    processor.qdrant.dense_embeddings.embed_query(JOB_TEXT)
+
+
+def forked_job(result_queue):
+    start = time.perf_counter()
+    run_job()
+    result_queue.put(time.perf_counter() - start)
+
+
+def time_forked_jobs(jobs: int) -> list:
+    ctx = multiprocessing.get_context("fork")
+    timings = []
+    for _ in range(jobs):
+        result_queue = ctx.Queue()
+        start = time.perf_counter()
+        process = ctx.Process(target=forked_job, args=(result_queue,))
+        process.start()
+        result_queue.get()
+        process.join()
+        # Include fork and teardown, as a work horse would
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def stock_mode(jobs: int, result_queue):
+    result_queue.put(time_forked_jobs(jobs))
+
+
+def preloaded_mode(jobs: int, result_queue):
+    from app.worker import preload
+    preload()
+    result_queue.put(time_forked_jobs(jobs))
+
+
+def simple_mode(jobs: int, result_queue):
+    from app.worker import preload
+    preload()
+    timings = []
+    for _ in range(jobs):
+        start = time.perf_counter()
+        run_job()
+        timings.append(time.perf_counter() - start)
+    result_queue.put(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=5)
+    args = parser.parse_args()
+
+    # Each mode gets a pristine parent process so nothing is preloaded by accident
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{'mode':>10} {'mean s/job':>11} {'median':>8} {'max':>8}")
+    for name, target in (("stock", stock_mode), ("preloaded", preloaded_mode), ("simple", simple_mode)):
+        result_queue = ctx.Queue()
+        process = ctx.Process(target=target, args=(args.jobs, result_queue))
+        process.start()
+        timings = result_queue.get()
+        process.join()
+        print(f"{name:>10} {statistics.mean(timings):>11.3f} "
+              f"{statistics.median(timings):>8.3f} {max(timings):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
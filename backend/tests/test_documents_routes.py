@@ -0,0 +1,93 @@
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.db import get_global_db_session
+from app.dependencies.auth import get_current_user
+from app.model_handlers.document_handler import DocumentResponse
+from app.model_handlers.user_handler import UserResponse
+from app.routes import documents
+
+OWNER_ID = uuid.uuid4()
+
+
+def make_user(user_id: uuid.UUID) -> UserResponse:
+    return UserResponse(
+        id=user_id, email="owner@example.com", firstname="Ada", lastname="Lovelace", created_at=datetime.now()
+    )
+
+
+class FakeDocumentHandler:
+    """DocumentHandler over one stored document; records writes in `events`."""
+
+    def __init__(self, document: DocumentResponse, events: list):
+        self.document = document
+        self.events = events
+
+    def read(self, id: str) -> DocumentResponse:
+        return self.document
+
+    def update(self, id, obj_in):
+        self.events.append(("update", obj_in.model_dump(exclude_unset=True, exclude_none=True)))
+        return self.document
+
+
+@pytest.fixture
+def replace_client(monkeypatch):
+    events = []
+    document = DocumentResponse(
+        id=uuid.uuid4(),
+        filename="contract.pdf",
+        vector_collection=str(OWNER_ID),
+        status="completed",
+        content_hash="old-hash",
+        job_id="old-job",
+        created_at=datetime.now(),
+    )
+
+    async def save_upload(file, extension):
+        return f"/data/blobs/new-hash.{extension}", "new-hash"
+
+    def enqueue(func, args, retry):
+        events.append(("enqueue", func.__name__))
+        return SimpleNamespace(id="new-job")
+
+    monkeypatch.setattr(documents, "DocumentHandler", lambda db: FakeDocumentHandler(document, events))
+    monkeypatch.setattr(documents, "save_upload", save_upload)
+    monkeypatch.setattr(documents, "queue", SimpleNamespace(enqueue=enqueue))
+    monkeypatch.setattr(documents, "get_answer_cache", lambda: None)
+
+    app = FastAPI()
+    app.include_router(documents.document_router)
+    app.dependency_overrides[get_global_db_session] = lambda: None
+    client = TestClient(app)
+    return app, client, document, events
+
+
+def test_replace_document_marks_processing_before_enqueueing(replace_client):
+    app, client, document, events = replace_client
+    app.dependency_overrides[get_current_user] = lambda: make_user(OWNER_ID)
+
+    response = client.put(f"/documents/{document.id}", files={"file": ("contract.pdf", b"%PDF new", "application/pdf")})
+
+    assert response.status_code == 200
+    assert response.json()["data"]["job_id"] == "new-job"
+    assert events == [
+        ("update", {"status": "processing", "file_path": "/data/blobs/new-hash.pdf", "content_hash": "new-hash"}),
+        ("enqueue", "reindex_document_task"),
+        ("update", {"job_id": "new-job"}),
+    ]
+
+
+def test_replace_document_rejects_other_users(replace_client):
+    app, client, document, events = replace_client
+    app.dependency_overrides[get_current_user] = lambda: make_user(uuid.uuid4())
+
+    response = client.put(f"/documents/{document.id}", files={"file": ("contract.pdf", b"%PDF new", "application/pdf")})
+
+    assert response.status_code == 403
+    assert events == []
@@ -0,0 +1,68 @@
+import io
+import pickle
+import threading
+
+import pytest
+from PIL import Image, ImageDraw
+
+from app.core import metrics
+from app.core.ocr_cache import OcrCache
+from app.services.document_loader import UniversalDocumentLoader
+from app.services.ocr import OcrBackend
+
+
+class CountingBackend(OcrBackend):
+    """Pooled OCR stand-in that records which threads recognized images."""
+
+    name = "counting"
+    concurrency = 4
+
+    def __init__(self):
+        self.calls = 0
+        self.threads = set()
+        self._lock = threading.Lock()
+
+    def image_to_string(self, image: Image.Image) -> str:
+        with self._lock:
+            self.calls += 1
+            self.threads.add(threading.get_ident())
+        return f"text {image.size[0]}"
+
+
+def make_images(count: int) -> list:
+    images = []
+    for i in range(count):
+        image = Image.new("L", (200 + i, 60), color=255)
+        ImageDraw.Draw(image).text((10, 20), f"Invoice {i}", fill=0)
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        images.append(buffer.getvalue())
+    return images
+
+
+@pytest.fixture(autouse=True)
+def no_metrics(monkeypatch):
+    monkeypatch.setattr(metrics, "incr", lambda name, amount=1: None)
+
+
+def test_pooled_ocr_uses_the_cache(tmp_path):
+    cache = OcrCache(str(tmp_path / "ocr_cache.sqlite"), max_bytes=1024 * 1024)
+    loader = UniversalDocumentLoader(ocr_cache=cache)
+    loader._ocr = backend = CountingBackend()
+    images = make_images(16)
+
+    first = loader._process_images(images)
+    second = loader._process_images(images)
+
+    assert first == second == [f"text {200 + i}" for i in range(16)]
+    assert backend.calls == 16
+    assert cache.misses == 16 and cache.hits == 16
+    assert cache.stats()["entries"] == 16
+
+
+def test_cache_survives_pickling(tmp_path):
+    cache = OcrCache(str(tmp_path / "ocr_cache.sqlite"), max_bytes=1024 * 1024)
+    cache.put("key", "text")
+    copy = pickle.loads(pickle.dumps(cache))
+
+    assert copy.get("key") == "text"
@@ -19,6 +19,7 @@ CREATE TABLE IF NOT EXISTS documents (
     user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     filename TEXT NOT NULL,
     file_path TEXT NOT NULL,
+    content_hash TEXT,
     vector_collection TEXT NOT NULL,
     status TEXT,
     job_id TEXT,
@@ -28,6 +29,9 @@ CREATE TABLE IF NOT EXISTS documents (
     CONSTRAINT unique_filename_per_user UNIQUE (user_id, filename)
 );
 
+-- Databases created before upload deduplication
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
 -- CHAT_SESSIONS table
 CREATE TABLE IF NOT EXISTS chat_sessions (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -54,6 +58,21 @@ CREATE TABLE IF NOT EXISTS chat_messages (
     session_id UUID NOT NULL REFERENCES chat_sessions(id) ON DELETE CASCADE,
     query TEXT NOT NULL,
     response TEXT NOT NULL,
+    truncated BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Databases created before partial answers of disconnected clients were kept
+ALTER TABLE chat_messages ADD COLUMN IF NOT EXISTS truncated BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- CHAT_SUMMARIES table (rolling summary of the turns older than the prompt's recent window)
+CREATE TABLE IF NOT EXISTS chat_summaries (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    session_id UUID NOT NULL UNIQUE REFERENCES chat_sessions(id) ON DELETE CASCADE,
+    summary TEXT NOT NULL,
+    summarized_until TIMESTAMPTZ NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0,
     created_at TIMESTAMPTZ DEFAULT NOW(),
     updated_at TIMESTAMPTZ DEFAULT NOW()
 );
@@ -62,7 +81,9 @@ CREATE TABLE IF NOT EXISTS chat_messages (
 CREATE INDEX IF NOT EXISTS idx_documents_user_id ON documents(user_id);
 CREATE INDEX IF NOT EXISTS idx_documents_user_status ON documents(user_id, status);
 CREATE INDEX IF NOT EXISTS idx_documents_user_filename ON documents(user_id, filename);
+CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON documents(content_hash);
 CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_id ON chat_sessions(user_id);
 CREATE INDEX IF NOT EXISTS idx_chat_session_documents_session_id ON chat_session_documents(session_id);
 CREATE INDEX IF NOT EXISTS idx_chat_session_documents_document_id ON chat_session_documents(document_id);
 CREATE INDEX IF NOT EXISTS idx_chat_messages_session_id ON chat_messages(session_id);
+CREATE INDEX IF NOT EXISTS idx_chat_messages_session ON chat_messages(session_id, created_at);